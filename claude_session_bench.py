@@ -0,0 +1,655 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Claude 会话管理器 - 性能基准测试
+生成指定规模的模拟 ~/.claude 目录，逐项测量数据层操作的
+耗时、峰值内存、读写调用次数和 I/O 统计，结果以 JSON 输出，便于在版本之间对比
+
+用法示例:
+    python claude_session_bench.py --size small
+    python claude_session_bench.py --size medium --repeat 5 -o bench.json
+    python claude_session_bench.py --sessions 5000 --messages 200 --compare bench.json
+    python claude_session_bench.py --generate-only /tmp/fake_claude --size large
+    python claude_session_bench.py --strace --operations load_sessions
+
+每次测量在独立的子进程中进行（峰值内存互不影响），
+元数据缓存每次都使用新的临时目录（冷缓存）；
+删除和清理类操作在测试目录的副本上执行。
+峰值内存是子进程的 ru_maxrss，包含被测操作之前的准备工作（见 baseline_rss_kb）；
+--strace 时用 strace -c -f 统计子进程的全部系统调用（含解释器启动和准备工作）。
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import median
+
+from claude_session_data import SessionData
+
+BENCH_VERSION = 2  # 2: syscr/syscw 改名为 read_calls/write_calls，增加 getrusage 统计
+
+# 预设规模，可被命令行参数单独覆盖
+PRESETS = {
+    'small': {
+        'sessions': 200,
+        'history_lines': 3,
+        'messages': 20,
+        'message_bytes': 300,
+        'file_history_depth': 2,
+        'file_history_files': 3,
+        'snapshots': 50,
+        'orphan_ratio': 0.1,
+        'active_ratio': 0.02
+    },
+    'medium': {
+        'sessions': 2000,
+        'history_lines': 5,
+        'messages': 40,
+        'message_bytes': 400,
+        'file_history_depth': 3,
+        'file_history_files': 4,
+        'snapshots': 500,
+        'orphan_ratio': 0.1,
+        'active_ratio': 0.02
+    },
+    'large': {
+        'sessions': 10000,
+        'history_lines': 5,
+        'messages': 60,
+        'message_bytes': 500,
+        'file_history_depth': 4,
+        'file_history_files': 4,
+        'snapshots': 2000,
+        'orphan_ratio': 0.1,
+        'active_ratio': 0.01
+    },
+}
+
+DELETE_COUNT = 10  # delete_session 每次删除的会话数
+
+# ============ 模拟数据生成 ============
+
+
+def iso_timestamp(ts: float) -> str:
+    """秒级时间戳转为对话文件中的 ISO 格式"""
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def write_transcript(conv_file: Path, rng: random.Random, messages: int,
+                     message_bytes: int, start_ts: float, title: str = None):
+    """写入一个模拟对话文件（用户/助手消息交替）"""
+    filler = 'x' * max(0, message_bytes - 40)
+    with open(conv_file, 'w', encoding='utf-8') as f:
+        for k in range(messages):
+            ts = iso_timestamp(start_ts + k * 30)
+            if k % 2 == 0:
+                record = {
+                    'type': 'user',
+                    'userType': 'external',
+                    'timestamp': ts,
+                    'message': {
+                        'role': 'user',
+                        'content': f"question {k} {rng.random():.6f} {filler}"
+                    }
+                }
+            else:
+                record = {
+                    'type': 'assistant',
+                    'timestamp': ts,
+                    'message': {
+                        'role': 'assistant',
+                        'content': [{
+                            'type': 'text',
+                            'text': f"answer {k} {filler}"
+                        }, {
+                            'type': 'tool_use',
+                            'name': 'Bash'
+                        }]
+                    }
+                }
+            f.write(json.dumps(record) + '\n')
+        if title:
+            f.write(json.dumps({'type': 'custom-title',
+                                'customTitle': title}) + '\n')
+
+
+def write_session_files(claude_dir: Path, session_id: str, project: str,
+                        rng: random.Random, config: dict, start_ts: float,
+                        title: str = None):
+    """写入一个会话的对话、debug、session-env、file-history 和 todo 文件"""
+    project_dir = claude_dir / 'projects' / project.replace('/', '-')
+    project_dir.mkdir(parents=True, exist_ok=True)
+    write_transcript(project_dir / f"{session_id}.jsonl", rng,
+                     config['messages'], config['message_bytes'], start_ts,
+                     title)
+
+    with open(claude_dir / 'debug' / f"{session_id}.txt", 'w') as f:
+        for j in range(50):
+            level = 'ERROR' if j % 17 == 0 else 'WARN' if j % 7 == 0 else 'DEBUG'
+            f.write(f"{iso_timestamp(start_ts + j)} [{level}] line {j}\n")
+
+    env_dir = claude_dir / 'session-env' / session_id
+    env_dir.mkdir()
+    (env_dir / 'env').write_text('x' * 100)
+
+    # file-history：depth 层嵌套目录，每层 files 个文件
+    current = claude_dir / 'file-history' / session_id
+    for depth in range(config['file_history_depth']):
+        current = current / f"d{depth}"
+        current.mkdir(parents=True)
+        for n in range(config['file_history_files']):
+            (current / f"f{n}@v1").write_bytes(b'y' * 1024)
+
+    (claude_dir / 'todos' /
+     f"{session_id}-agent-{session_id}.json").write_text('[]')
+
+
+def generate_tree(claude_dir: Path, config: dict, seed: int = 1) -> dict:
+    """生成模拟的 ~/.claude 目录，返回生成的统计信息
+
+    history 时间戳分布在最近 90 天内；active_ratio 比例的会话
+    文件修改时间为当前时间（会被检测为运行中），其余文件改为 2 天前。
+    """
+    rng = random.Random(seed)
+    for name in ('projects', 'debug', 'session-env', 'file-history', 'todos',
+                 'shell-snapshots'):
+        (claude_dir / name).mkdir(parents=True, exist_ok=True)
+
+    now = time.time()
+    old_ts = now - 2 * 86400
+    sessions = config['sessions']
+    project_count = max(1, sessions // 50)
+    active_count = int(sessions * config['active_ratio'])
+
+    history = []
+    active_ids = []
+    for i in range(sessions):
+        session_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        project = f"/bench/project{i % project_count}"
+        start_ts = now - rng.random() * 90 * 86400
+        is_active = i < active_count
+        if is_active:
+            start_ts = now - config['messages'] * 30
+            active_ids.append(session_id)
+        title = f"Session {i}" if i % 5 == 0 else None
+        write_session_files(claude_dir, session_id, project, rng, config,
+                            start_ts, title)
+        for k in range(config['history_lines']):
+            display = f"/cmd{i}" if i % 11 == 0 else f"prompt {i} {k}"
+            history.append({
+                'display': display,
+                'pastedContents': {},
+                'timestamp': int((start_ts + k * 60) * 1000),
+                'project': project,
+                'sessionId': session_id
+            })
+
+    # 无索引（孤立）会话：文件存在但 history 中没有记录
+    orphan_count = int(sessions * config['orphan_ratio'])
+    for i in range(orphan_count):
+        session_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        write_session_files(claude_dir, session_id, '/bench/orphans', rng,
+                            config, now - rng.random() * 90 * 86400)
+
+    history.sort(key=lambda h: h['timestamp'])
+    with open(claude_dir / 'history.jsonl', 'w', encoding='utf-8') as f:
+        for entry in history:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    for k in range(config['snapshots']):
+        shell = ('zsh', 'bash', 'fish')[k % 3]
+        ts_ms = int((now - rng.random() * 30 * 86400) * 1000)
+        (claude_dir / 'shell-snapshots' /
+         f"snapshot-{shell}-{ts_ms}-s{k:05d}.sh").write_text('s' * 2048)
+
+    # 把非活跃会话的文件时间改旧，活跃检测的 mtime 过滤才有代表性
+    active_set = set(active_ids)
+    file_count = 0
+    total_bytes = 0
+    for root, dirs, files in os.walk(claude_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            file_count += 1
+            total_bytes += os.path.getsize(path)
+            stem = name.split('.')[0]
+            if stem not in active_set:
+                os.utime(path, (old_ts, old_ts))
+
+    return {
+        'sessions': sessions,
+        'history_lines': len(history),
+        'orphan_sessions': orphan_count,
+        'active_sessions': len(active_ids),
+        'files': file_count,
+        'bytes': total_bytes
+    }
+
+
+# ============ 被测操作 ============
+# 每个 setup 函数做好前置准备（不计时），返回被测的无参函数，
+# 被测函数返回处理的条目数
+
+
+def setup_load_sessions(data: SessionData):
+    return lambda: len(data.load_sessions())
+
+
+def setup_get_active_sessions(data: SessionData):
+    return lambda: len(data.get_active_sessions(minutes=10))
+
+
+def setup_get_unique_sessions(data: SessionData):
+    data.load_sessions()
+    return lambda: len(data.get_unique_sessions())
+
+
+def setup_get_session_title(data: SessionData):
+    data.load_sessions()
+    sessions = data.get_unique_sessions()
+
+    def run():
+        for session in sessions:
+            data.get_session_title(session.get('sessionId'),
+                                   session.get('project', 'N/A'))
+        return len(sessions)
+
+    return run
+
+
+def setup_delete_session(data: SessionData):
+    data.load_sessions()
+    batch = [(s.get('sessionId'), s.get('project', 'N/A'))
+             for s in data.get_unique_sessions()[:DELETE_COUNT]]
+
+    def run():
+        for session_id, project in batch:
+            data.delete_session(session_id, project)
+        return len(batch)
+
+    return run
+
+
+def setup_cleanup_orphaned_files(data: SessionData):
+    data.load_sessions()
+
+    def run():
+        result = data.cleanup_orphaned_files()
+        return len(result.get('details', []))
+
+    return run
+
+
+def setup_cleanup_old_snapshots(data: SessionData):
+    data.load_sessions()
+    data.get_active_sessions(minutes=10)
+    return lambda: data.cleanup_old_snapshots(keep_count=5)[
+        'deleted_snapshots']
+
+
+OPERATIONS = {
+    'load_sessions': setup_load_sessions,
+    'get_active_sessions': setup_get_active_sessions,
+    'get_unique_sessions': setup_get_unique_sessions,
+    'get_session_title': setup_get_session_title,
+    'delete_session': setup_delete_session,
+    'cleanup_orphaned_files': setup_cleanup_orphaned_files,
+    'cleanup_old_snapshots': setup_cleanup_old_snapshots,
+}
+
+# 会修改测试目录的操作，每次在副本上执行
+DESTRUCTIVE = {'delete_session', 'cleanup_orphaned_files',
+               'cleanup_old_snapshots'}
+
+# 结果中各字段的说明（写入报告，避免误读）
+METRIC_NOTES = {
+    'peak_rss_kb': '子进程峰值 RSS，包含被测操作之前的准备工作（baseline_rss_kb 为准备后的峰值）',
+    'read_calls': '/proc/self/io syscr：read 类系统调用次数（不含 stat、open 等），仅 Linux',
+    'write_calls': '/proc/self/io syscw：write 类系统调用次数，仅 Linux',
+    'rchar': '/proc/self/io rchar：读取的字节数（含页缓存命中）',
+    'wchar': '/proc/self/io wchar：写入的字节数',
+    'block_in': 'getrusage ru_inblock：实际从块设备读入的次数',
+    'block_out': 'getrusage ru_oublock：实际写入块设备的次数',
+    'voluntary_switches': 'getrusage ru_nvcsw：主动让出 CPU（等待 I/O、锁）的次数',
+    'involuntary_switches': 'getrusage ru_nivcsw：被抢占的次数',
+    'syscalls': 'strace -c -f 统计的系统调用总数（仅 --strace），包含解释器启动和准备工作'
+}
+
+# getrusage 字段与结果字段的对应
+RUSAGE_FIELDS = {
+    'ru_inblock': 'block_in',
+    'ru_oublock': 'block_out',
+    'ru_nvcsw': 'voluntary_switches',
+    'ru_nivcsw': 'involuntary_switches'
+}
+
+# /proc/self/io 字段与结果字段的对应
+PROC_IO_FIELDS = {
+    'syscr': 'read_calls',
+    'syscw': 'write_calls',
+    'rchar': 'rchar',
+    'wchar': 'wchar'
+}
+
+# ============ 测量（子进程） ============
+
+
+def read_proc_io() -> dict:
+    """读取 /proc/self/io（仅 Linux），不可用时返回 None"""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            return {
+                key: int(value)
+                for key, value in (line.split(':', 1) for line in f)
+            }
+    except (OSError, ValueError):
+        return None
+
+
+def read_rusage():
+    """当前进程的 getrusage 结果，不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF)
+
+
+def peak_rss_kb() -> int:
+    """进程峰值常驻内存（KB），不支持的平台返回 None"""
+    usage = read_rusage()
+    if usage is None:
+        return None
+    # macOS 的 ru_maxrss 单位是字节，Linux 是 KB
+    peak = usage.ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def parse_strace_summary(text: str) -> int:
+    """从 strace -c 的汇总表中取出系统调用总数，解析失败返回 None
+
+    汇总表最后一行形如 "100.00  0.001234  5  250  10 total"（errors 列可能为空），
+    calls 为第 4 列。
+    """
+    for line in reversed(text.splitlines()):
+        parts = line.split()
+        if len(parts) >= 5 and parts[-1] == 'total':
+            try:
+                return int(parts[3])
+            except ValueError:
+                return None
+    return None
+
+
+def measure(operation: str, claude_dir: Path, cache_dir: Path) -> dict:
+    """在当前进程中测量一次操作"""
+    data = SessionData(claude_dir=claude_dir, cache_dir=cache_dir)
+    run = OPERATIONS[operation](data)
+
+    baseline_rss = peak_rss_kb()
+    usage_before = read_rusage()
+    io_before = read_proc_io()
+    start = time.perf_counter()
+    items = run()
+    wall_ms = (time.perf_counter() - start) * 1000
+    io_after = read_proc_io()
+    usage_after = read_rusage()
+
+    result = {
+        'wall_ms': wall_ms,
+        'items': items,
+        'baseline_rss_kb': baseline_rss,
+        'peak_rss_kb': peak_rss_kb()
+    }
+    for key in list(PROC_IO_FIELDS.values()) + list(RUSAGE_FIELDS.values()):
+        result[key] = None
+    if io_before and io_after:
+        for key, field in PROC_IO_FIELDS.items():
+            result[field] = io_after.get(key, 0) - io_before.get(key, 0)
+    if usage_before is not None and usage_after is not None:
+        for key, field in RUSAGE_FIELDS.items():
+            result[field] = getattr(usage_after, key) - getattr(
+                usage_before, key)
+    return result
+
+
+def run_child(operation: str, claude_dir: Path, use_strace: bool = False) -> dict:
+    """启动子进程测量一次操作（使用新的临时缓存目录）
+
+    use_strace 时在 strace -c -f 下运行子进程，结果附带 'syscalls'。
+    """
+    with tempfile.TemporaryDirectory(prefix='csm-bench-cache-') as cache_dir:
+        command = [
+            sys.executable,
+            os.path.abspath(__file__), '--child', operation,
+            str(claude_dir), cache_dir
+        ]
+        strace_file = os.path.join(cache_dir, 'strace.txt')
+        if use_strace:
+            command = ['strace', '-c', '-f', '-o', strace_file] + command
+        proc = subprocess.run(command, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{operation} 测量失败:\n{proc.stderr}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result['syscalls'] = None
+        if use_strace:
+            try:
+                with open(strace_file, 'r', encoding='utf-8') as f:
+                    result['syscalls'] = parse_strace_summary(f.read())
+            except OSError:
+                pass
+    return result
+
+
+# ============ 汇总与对比 ============
+
+
+def summarize(runs: list) -> dict:
+    """汇总多次测量"""
+    walls = [r['wall_ms'] for r in runs]
+
+    def peak(key):
+        values = [r[key] for r in runs if r.get(key) is not None]
+        return max(values) if values else None
+
+    return {
+        'runs': runs,
+        'wall_ms_min': min(walls),
+        'wall_ms_median': median(walls),
+        'peak_rss_kb': peak('peak_rss_kb'),
+        'read_calls': peak('read_calls'),
+        'write_calls': peak('write_calls'),
+        'block_in': peak('block_in'),
+        'voluntary_switches': peak('voluntary_switches'),
+        'syscalls': peak('syscalls'),
+        'items': runs[-1]['items']
+    }
+
+
+def print_table(report: dict, baseline: dict = None):
+    """输出可读的结果表格（有基线时附带中位数耗时之比）"""
+    out = sys.stderr
+    tree = report['tree']
+    out.write(f"规模: {report['size']} | 会话 {tree['sessions']} | "
+              f"history {tree['history_lines']} 行 | 文件 {tree['files']} 个 | "
+              f"{tree['bytes'] / 1024 / 1024:.1f} MB\n")
+    show_syscalls = any(summary.get('syscalls') is not None
+                        for summary in report['results'].values())
+    header = (f"{'操作':<24}{'中位数ms':>12}{'最小ms':>10}{'峰值RSS KB':>12}"
+              f"{'read':>10}{'write':>10}{'blk_in':>8}{'vcsw':>8}")
+    if show_syscalls:
+        header += f"{'syscalls':>10}"
+    if baseline:
+        header += f"{'对比基线':>12}"
+    out.write(header + "\n")
+
+    old_results = baseline.get('results', {}) if baseline else {}
+    for operation, summary in report['results'].items():
+        line = (f"{operation:<24}{summary['wall_ms_median']:>12.1f}"
+                f"{summary['wall_ms_min']:>10.1f}"
+                f"{summary['peak_rss_kb'] or 0:>12}"
+                f"{summary['read_calls'] or 0:>10}"
+                f"{summary['write_calls'] or 0:>10}"
+                f"{summary['block_in'] or 0:>8}"
+                f"{summary['voluntary_switches'] or 0:>8}")
+        if show_syscalls:
+            line += f"{summary['syscalls'] or 0:>10}"
+        old = old_results.get(operation)
+        if baseline:
+            if old and old.get('wall_ms_median'):
+                ratio = summary['wall_ms_median'] / old['wall_ms_median']
+                line += f"{ratio:>11.2f}x"
+            else:
+                line += f"{'-':>12}"
+        out.write(line + "\n")
+
+
+# ============ 入口 ============
+
+
+def build_config(args) -> dict:
+    """预设规模加上命令行覆盖的参数"""
+    config = dict(PRESETS[args.size])
+    for key in config:
+        value = getattr(args, key, None)
+        if value is not None:
+            config[key] = value
+    return config
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="claude_session_bench",
+        description="Claude 会话管理器数据层性能基准测试")
+    parser.add_argument("--size",
+                        choices=sorted(PRESETS),
+                        default="small",
+                        help="预设规模（默认 small）")
+    parser.add_argument("--sessions", type=int, help="会话数")
+    parser.add_argument("--history-lines",
+                        type=int,
+                        help="每个会话的 history 记录数")
+    parser.add_argument("--messages", type=int, help="每个对话文件的消息数")
+    parser.add_argument("--message-bytes", type=int, help="每条消息的大致字节数")
+    parser.add_argument("--file-history-depth",
+                        type=int,
+                        help="file-history 目录嵌套层数")
+    parser.add_argument("--file-history-files",
+                        type=int,
+                        help="file-history 每层的文件数")
+    parser.add_argument("--snapshots", type=int, help="shell-snapshot 数量")
+    parser.add_argument("--orphan-ratio",
+                        type=float,
+                        help="无索引会话占会话数的比例")
+    parser.add_argument("--active-ratio",
+                        type=float,
+                        help="运行中会话占会话数的比例")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    parser.add_argument("--repeat", type=int, default=3, help="每项操作的测量次数")
+    parser.add_argument("--operations",
+                        default=",".join(OPERATIONS),
+                        help="逗号分隔的操作列表（默认全部）")
+    parser.add_argument("-o", "--output", help="JSON 结果写入文件（默认输出到标准输出）")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--strace",
+                        action="store_true",
+                        help="用 strace -c -f 统计子进程的系统调用总数（需要 strace）")
+    parser.add_argument("--generate-only",
+                        metavar="DIR",
+                        help="只在 DIR 生成模拟数据，不测量")
+    return parser
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    # 子进程：测量单个操作
+    if argv and argv[0] == '--child':
+        operation, claude_dir, cache_dir = argv[1:4]
+        result = measure(operation, Path(claude_dir), Path(cache_dir))
+        print(json.dumps(result))
+        return 0
+
+    args = build_parser().parse_args(argv)
+    config = build_config(args)
+
+    if args.generate_only:
+        target = Path(args.generate_only)
+        if target.exists() and any(target.iterdir()):
+            print(f"❌ 目录非空: {target}", file=sys.stderr)
+            return 1
+        stats = generate_tree(target, config, args.seed)
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return 0
+
+    operations = [op.strip() for op in args.operations.split(",") if op.strip()]
+    unknown = [op for op in operations if op not in OPERATIONS]
+    if unknown:
+        print(f"❌ 未知操作: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    if args.strace and shutil.which('strace') is None:
+        print("❌ 未找到 strace", file=sys.stderr)
+        return 1
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix='csm-bench-') as work_dir:
+        base_tree = Path(work_dir) / 'base' / '.claude'
+        print(f"⏳ 生成模拟数据 ({args.size})...", file=sys.stderr)
+        tree_stats = generate_tree(base_tree, config, args.seed)
+
+        results = {}
+        for operation in operations:
+            runs = []
+            for _ in range(args.repeat):
+                if operation in DESTRUCTIVE:
+                    copy_dir = Path(work_dir) / 'copy' / '.claude'
+                    shutil.rmtree(copy_dir.parent, ignore_errors=True)
+                    shutil.copytree(base_tree, copy_dir)
+                    runs.append(run_child(operation, copy_dir, args.strace))
+                else:
+                    runs.append(run_child(operation, base_tree, args.strace))
+            results[operation] = summarize(runs)
+            print(f"  {operation}: {results[operation]['wall_ms_median']:.1f} ms",
+                  file=sys.stderr)
+
+    report = {
+        'bench_version': BENCH_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'size': args.size,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'config': config,
+        'tree': tree_stats,
+        'metrics': METRIC_NOTES,
+        'results': results
+    }
+
+    print_table(report, baseline)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Claude 会话管理器 - 命令行模式
+不依赖 tkinter，可在无图形界面的服务器上运行或由 cron 调用
+
+用法示例:
+    python claude_session_cli.py list
+    python claude_session_cli.py stats --json
+    python claude_session_cli.py delete <session_id> ... --dry-run
+    python claude_session_cli.py cleanup-orphans
+    python claude_session_cli.py cleanup-snapshots --keep 5
+    python claude_session_cli.py archive <session_id> ...
+    python claude_session_cli.py restore <session_id> ...
+    python claude_session_cli.py enforce-budget --max-size 2G --keep-days 30 --dry-run
+    python claude_session_cli.py list --claude-dir /home/a/.claude --claude-dir /backup/b/.claude
+
+指定多个 --claude-dir 时聚合显示，会话 ID 带有 "<目录名>:" 前缀；
+同一 sessionId 在多个目录中都存在时必须带前缀指定。
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from claude_session_data import (EvictionPolicy, SessionData,
+                                 SnapshotRetentionPolicy, StorageInventory,
+                                 create_session_data, parse_size)
+
+# ============ 输出 ============
+
+
+def print_json(payload):
+    """以 JSON 输出结果（路径等对象转为字符串）"""
+    json.dump(payload, sys.stdout, ensure_ascii=False, indent=2, default=str)
+    sys.stdout.write("\n")
+
+
+def truncate(text: str, width: int) -> str:
+    """截断过长的文本"""
+    text = text.replace("\n", " ")
+    if len(text) > width:
+        return text[:width - 3] + "..."
+    return text
+
+
+def load(data: SessionData) -> set:
+    """加载 history 并检测活跃会话"""
+    data.load_sessions()
+    return data.get_active_sessions(minutes=10)
+
+
+def find_sessions(data: SessionData, session_ids: list) -> tuple:
+    """按命令行给出的 ID 查找会话
+
+    返回 ([(ID, 会话记录)], 未找到的 ID, {不唯一的 ID: 说明})。
+    """
+    found = []
+    missing = []
+    ambiguous = {}
+    for sid in session_ids:
+        try:
+            session = data.get_session(sid)
+        except ValueError as e:
+            ambiguous[sid] = str(e)
+            continue
+        if session is None:
+            missing.append(sid)
+        else:
+            found.append((sid, session))
+    return found, missing, ambiguous
+
+
+def print_lookup_errors(missing: list, ambiguous: dict,
+                        label: str = "会话"):
+    """输出找不到或不唯一的会话 ID"""
+    for sid in missing:
+        print(f"❌ 未找到{label}: {sid}")
+    for sid, message in ambiguous.items():
+        print(f"❌ {sid}: {message}")
+
+
+# ============ 子命令 ============
+
+
+def cmd_list(data: SessionData, args) -> int:
+    """列出去重后的会话"""
+    active = load(data)
+    sessions = data.get_unique_sessions()
+    if args.limit:
+        sessions = sessions[:args.limit]
+
+    rows = []
+    for session in sessions:
+        sid = session.get('sessionId', '')
+        rows.append({
+            'session_id': sid,
+            'project': session.get('project', ''),
+            'display': session.get('display', ''),
+            'timestamp': session.get('timestamp', 0),
+            'size': data.get_file_info(sid)['size'],
+            'active': sid in active,
+            'archived': data.is_archived(sid)
+        })
+        if data.multi_root:
+            rows[-1]['root'] = session.get('root', '')
+
+    if args.json:
+        print_json(rows)
+        return 0
+
+    for row in rows:
+        status = "●" if row['active'] else ("A" if row['archived'] else " ")
+        if data.multi_root:
+            status += f" {truncate(row['root'], 12):<12}"
+        print(f"{status} {data.format_timestamp(row['timestamp'])}  "
+              f"{data.format_size(row['size']):>10}  {row['session_id']}  "
+              f"{truncate(row['project'], 40):<40}  "
+              f"{truncate(row['display'], 50)}")
+    print(f"\n共 {len(rows)} 个会话（● 运行中，A 已归档）")
+    return 0
+
+
+def cmd_stats(data: SessionData, args) -> int:
+    """统计会话数量和存储占用"""
+    active = load(data)
+    inventory = data.get_inventory()
+
+    kinds = {}
+    total_size = inventory.history_size
+    for kind in StorageInventory.KINDS:
+        count, size = inventory.get_kind_totals(kind)
+        kinds[kind] = {'count': count, 'size': size}
+        total_size += size
+
+    orphans = data.collect_orphaned_files(inventory)
+    stats = {
+        'history_entries': len(data.sessions),
+        'unique_sessions': len(data.get_unique_sessions()),
+        'active_sessions': len(active),
+        'history_size': inventory.history_size,
+        'kinds': kinds,
+        'orphans': {
+            'count': sum(len(items) for items in orphans.values()),
+            'size': sum(item['size'] for items in orphans.values()
+                        for item in items)
+        },
+        'total_size': total_size
+    }
+
+    if args.json:
+        print_json(stats)
+        return 0
+
+    print(f"📊 会话记录: {stats['history_entries']} 条 | "
+          f"🎯 独立会话: {stats['unique_sessions']} 个 | "
+          f"🟢 运行中: {stats['active_sessions']} 个")
+    print(f"history.jsonl: {data.format_size(stats['history_size'])}")
+    for kind, info in kinds.items():
+        print(f"{kind:<20} {info['count']:>8} 项  {data.format_size(info['size']):>10}")
+    print(f"无索引文件: {stats['orphans']['count']} 项 "
+          f"({data.format_size(stats['orphans']['size'])})")
+    print(f"💾 总存储: {data.format_size(total_size)}")
+    return 0
+
+
+def cmd_delete(data: SessionData, args) -> int:
+    """删除指定的会话（跳过不存在和运行中的会话）"""
+    active = load(data)
+
+    batch = []
+    skipped = []
+    found, missing, ambiguous = find_sessions(data, args.session_ids)
+    for sid, session in found:
+        # 多目录时 sessionId 为带目录前缀的会话键
+        key = session.get('sessionId')
+        if key in active:
+            skipped.append(sid)
+        else:
+            batch.append((key, session.get('project', 'N/A')))
+
+    payload = {
+        'missing': missing,
+        'ambiguous': ambiguous,
+        'active_skipped': skipped
+    }
+    if args.dry_run:
+        inventory = data.get_inventory()
+        previews = []
+        for sid, project in batch:
+            files = [{
+                'kind': kind,
+                'path': str(item['path']),
+                'size': item['size']
+            } for kind, items in inventory.get_artifacts(sid).items()
+                     for item in items]
+            previews.append({
+                'session_id': sid,
+                'project': project,
+                'files': files,
+                'total_size': sum(f['size'] for f in files)
+            })
+        payload['dry_run'] = True
+        payload['sessions'] = previews
+    elif batch:
+        payload.update(data.delete_sessions(batch))
+
+    if args.json:
+        print_json(payload)
+    else:
+        print_lookup_errors(missing, ambiguous)
+        for sid in skipped:
+            print(f"⚠️ 会话正在运行中，已跳过: {sid}")
+        if args.dry_run:
+            for preview in payload['sessions']:
+                print(f"[dry-run] {preview['session_id']} "
+                      f"({data.format_size(preview['total_size'])})")
+                for f in preview['files']:
+                    print(f"    {f['kind']:<20} {data.format_size(f['size']):>10}  {f['path']}")
+        elif batch:
+            print(f"成功删除: {payload['deleted']} 个")
+            if payload['failed']:
+                print(f"失败: {payload['failed']} 个")
+
+    failed = payload.get('failed', 0)
+    return 1 if missing or ambiguous or failed else 0
+
+
+def cmd_archive(data: SessionData, args) -> int:
+    """把会话压缩归档并删除原文件（跳过不存在、运行中和已归档的会话）"""
+    active = load(data)
+
+    batch = []
+    skipped = []
+    found, missing, ambiguous = find_sessions(data, args.session_ids)
+    for sid, session in found:
+        key = session.get('sessionId')
+        if key in active or data.is_archived(key):
+            skipped.append(sid)
+        else:
+            batch.append((key, session.get('project', 'N/A')))
+
+    payload = {'missing': missing, 'ambiguous': ambiguous, 'skipped': skipped}
+    if args.dry_run:
+        inventory = data.get_inventory()
+        payload['dry_run'] = True
+        payload['sessions'] = [{
+            'session_id': sid,
+            'project': project,
+            'size': sum(item['size']
+                        for items in inventory.get_artifacts(sid).values()
+                        for item in items)
+        } for sid, project in batch]
+    elif batch:
+        payload.update(data.archive_sessions(batch))
+
+    if args.json:
+        print_json(payload)
+    else:
+        print_lookup_errors(missing, ambiguous)
+        for sid in skipped:
+            print(f"⚠️ 会话正在运行中或已归档，已跳过: {sid}")
+        if args.dry_run:
+            for preview in payload['sessions']:
+                print(f"[dry-run] {preview['session_id']} "
+                      f"({data.format_size(preview['size'])})")
+        elif batch:
+            for sid, result in payload['sessions'].items():
+                if 'error' in result:
+                    print(f"❌ {sid}: {result['error']}")
+            print(f"成功归档: {payload['archived']} 个，"
+                  f"{data.format_size(payload['original_size'])} → "
+                  f"{data.format_size(payload['archive_size'])}")
+
+    failed = payload.get('failed', 0)
+    return 1 if missing or ambiguous or failed else 0
+
+
+def cmd_restore(data: SessionData, args) -> int:
+    """把已归档的会话解压回原位置"""
+    load(data)
+
+    keys = []
+    found, not_found, ambiguous = find_sessions(data, args.session_ids)
+    missing = []
+    for sid, session in found:
+        key = session.get('sessionId')
+        if data.is_archived(key):
+            keys.append(key)
+        else:
+            missing.append(sid)
+    for sid in not_found:
+        # history 中已没有记录的归档（只有单个目录时可以直接按 sessionId 查找）
+        if not data.multi_root and data.is_archived(sid):
+            keys.append(sid)
+        else:
+            missing.append(sid)
+
+    payload = {'missing': missing, 'ambiguous': ambiguous}
+    if keys:
+        payload.update(data.restore_sessions(keys))
+
+    if args.json:
+        print_json(payload)
+    else:
+        print_lookup_errors(missing, ambiguous, "归档")
+        for sid, result in payload.get('sessions', {}).items():
+            if 'error' in result:
+                print(f"❌ {sid}: {result['error']}")
+        if keys:
+            print(f"成功恢复: {payload['restored']} 个")
+
+    failed = payload.get('failed', 0)
+    return 1 if missing or ambiguous or failed else 0
+
+
+def cmd_cleanup_orphans(data: SessionData, args) -> int:
+    """清理无索引指向的文件"""
+    load(data)
+    inventory = data.scan_storage()
+
+    if args.dry_run:
+        orphans = data.collect_orphaned_files(inventory)
+        payload = {
+            'dry_run': True,
+            'orphans': {
+                kind: [{
+                    'session_id': item['session_id'],
+                    'path': str(item['path']),
+                    'size': item['size']
+                } for item in items]
+                for kind, items in orphans.items()
+            }
+        }
+        payload['total_size'] = sum(
+            item['size'] for items in orphans.values() for item in items)
+        if args.json:
+            print_json(payload)
+        else:
+            for kind, items in payload['orphans'].items():
+                for item in items:
+                    print(f"[dry-run] {kind:<20} {data.format_size(item['size']):>10}  {item['path']}")
+            print(f"共 {sum(len(i) for i in orphans.values())} 项，"
+                  f"{data.format_size(payload['total_size'])}")
+        return 0
+
+    result = data.cleanup_orphaned_files(inventory=inventory)
+    if args.json:
+        print_json(result)
+    else:
+        for detail in result['details']:
+            print(detail)
+        print(f"释放空间: {data.format_size(result['total_size_freed'])}")
+        if 'error' in result:
+            print(f"❌ 错误: {result['error']}")
+    return 1 if 'error' in result else 0
+
+
+def cmd_cleanup_snapshots(data: SessionData, args) -> int:
+    """按保留策略清理旧的 shell-snapshot"""
+    load(data)
+    policy = SnapshotRetentionPolicy(keep_count=args.keep,
+                                     max_age_days=args.max_age_days,
+                                     keep_per_shell=args.keep_per_shell,
+                                     max_total_size=args.max_size)
+    result = data.cleanup_old_snapshots(dry_run=args.dry_run, policy=policy)
+
+    if args.json:
+        print_json(result)
+    else:
+        prefix = "[dry-run] " if args.dry_run else ""
+        for f in result['deleted_files']:
+            print(f"{prefix}{f['date']}  {data.format_size(f['size']):>10}  "
+                  f"{f['name']}  ({f['reason']})")
+        print(f"共 {result['total_snapshots']} 个快照，"
+              f"{'将删除' if args.dry_run else '已删除'} {result['deleted_snapshots']} 个，"
+              f"保留 {result['kept_snapshots']} 个，"
+              f"释放 {data.format_size(result['total_size_freed'])}")
+        if 'error' in result:
+            print(f"❌ 错误: {result['error']}")
+    return 1 if 'error' in result else 0
+
+
+def cmd_enforce_budget(data: SessionData, args) -> int:
+    """把会话数据的总大小控制在预算以内（按策略删除或归档会话）"""
+    load(data)
+    policy = EvictionPolicy(max_total_size=args.max_size,
+                            min_age_days=args.keep_days,
+                            protect_titled=not args.include_titled,
+                            order=args.order,
+                            action=args.action)
+    plan = data.enforce_storage_budget(policy, dry_run=args.dry_run)
+
+    if args.json:
+        print_json(plan)
+    else:
+        prefix = "[dry-run] " if args.dry_run else ""
+        for item in plan['evicted']:
+            last_used = datetime.fromtimestamp(
+                item['last_used']).strftime('%Y-%m-%d %H:%M:%S')
+            line = (f"{prefix}{last_used}  {data.format_size(item['size']):>10}  "
+                    f"{item['session_id']}  {truncate(item['project'], 40)}")
+            if 'error' in item:
+                line += f"  ❌ {item['error']}"
+            elif 'skipped' in item:
+                reason = EvictionPolicy.REASON_LABELS.get(item['skipped'],
+                                                          item['skipped'])
+                line += f"  ⏭️ 已跳过（{reason}）"
+            print(line)
+
+        action = "归档" if plan['action'] == 'archive' else "删除"
+        protected = "，".join(
+            f"{EvictionPolicy.REASON_LABELS.get(reason, reason)} {count}"
+            for reason, count in plan['protected'].items())
+        budget = data.format_size(plan['budget'])
+        if data.multi_root:
+            budget += "/目录"
+        print(f"当前 {data.format_size(plan['total_size'])}，"
+              f"预算 {budget}，"
+              f"{'将' if args.dry_run else '已'}{action} "
+              f"{len(plan['evicted']) if args.dry_run else plan['done']} 个会话，"
+              f"预计降至 {data.format_size(plan['projected_size'])}")
+        print(f"保留 {plan['kept']} 个会话（{protected or '无'}）")
+        if not args.dry_run:
+            print(f"执行后: {data.format_size(plan['size_after'])}"
+                  + (f"，失败 {plan['failed']} 个" if plan['failed'] else "")
+                  + (f"，跳过 {plan['skipped']} 个（计算后有变化）"
+                     if plan['skipped'] else ""))
+        if not plan['reachable']:
+            print("⚠️ 受保护的会话较多，淘汰所有可淘汰的会话后仍超出预算")
+
+    return 1 if plan.get('failed') else 0
+
+
+# ============ 入口 ============
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="以 JSON 输出")
+    common.add_argument("--claude-dir",
+                        type=Path,
+                        action="append",
+                        help="Claude 数据目录（默认 ~/.claude，可重复指定多个）")
+
+    destructive = argparse.ArgumentParser(add_help=False)
+    destructive.add_argument("--dry-run",
+                             action="store_true",
+                             help="只显示将被删除的内容，不实际删除")
+
+    parser = argparse.ArgumentParser(
+        prog="claude_session_cli",
+        description="Claude 会话管理器（命令行模式）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list", parents=[common], help="列出会话")
+    p.add_argument("--limit", type=int, default=0, help="最多显示的会话数")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("stats", parents=[common], help="存储统计")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("delete",
+                       parents=[common, destructive],
+                       help="删除会话及其关联文件")
+    p.add_argument("session_ids", nargs="+", metavar="SESSION_ID")
+    p.set_defaults(func=cmd_delete)
+
+    p = sub.add_parser("archive",
+                       parents=[common, destructive],
+                       help="压缩归档会话（删除原文件，可恢复）")
+    p.add_argument("session_ids", nargs="+", metavar="SESSION_ID")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("restore", parents=[common], help="恢复已归档的会话")
+    p.add_argument("session_ids", nargs="+", metavar="SESSION_ID")
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser("cleanup-orphans",
+                       parents=[common, destructive],
+                       help="清理无索引数据")
+    p.set_defaults(func=cmd_cleanup_orphans)
+
+    p = sub.add_parser("cleanup-snapshots",
+                       parents=[common, destructive],
+                       help="清理旧快照")
+    p.add_argument("--keep", type=int, default=5, help="保留最新的快照数")
+    p.add_argument("--max-age-days",
+                   type=float,
+                   help="同时保留最近若干天内的快照")
+    p.add_argument("--keep-per-shell",
+                   type=int,
+                   help="每种 shell 至少保留最新的快照数")
+    p.add_argument("--max-size",
+                   type=parse_size,
+                   help="保留快照的总大小上限（如 50M），超出时从最旧的删起")
+    p.set_defaults(func=cmd_cleanup_snapshots)
+
+    p = sub.add_parser("enforce-budget",
+                       parents=[common, destructive],
+                       help="按存储预算淘汰会话（适合 cron 定时运行）")
+    p.add_argument("--max-size",
+                   type=parse_size,
+                   required=True,
+                   help="会话数据的总大小上限（如 2G），多个目录时对每个目录分别生效")
+    p.add_argument("--keep-days",
+                   type=float,
+                   help="保留最近若干天内用过的会话")
+    p.add_argument("--order",
+                   choices=EvictionPolicy.ORDERS,
+                   default="largest",
+                   help="淘汰顺序：largest 先淘汰最大的，lru 先淘汰最久未用的")
+    p.add_argument("--action",
+                   choices=EvictionPolicy.ACTIONS,
+                   default="delete",
+                   help="淘汰方式：delete 删除，archive 压缩归档")
+    p.add_argument("--include-titled",
+                   action="store_true",
+                   help="/rename 命名过的会话也可以淘汰（默认保留）")
+    p.set_defaults(func=cmd_enforce_budget)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    data = create_session_data(args.claude_dir)
+    try:
+        return args.func(data, args)
+    finally:
+        data.save_metadata_index()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
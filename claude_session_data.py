@@ -0,0 +1,3703 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Claude 会话管理器 - 数据层
+读取、统计和清理 ~/.claude 下的会话数据，不依赖 tkinter
+"""
+
+import hashlib
+import heapq
+import json
+import lzma
+import mmap
+import os
+import select
+import shutil
+import re
+import struct
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import sqlite3
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+
+# ============ 数据模型 ============
+
+# 归档目录（位于数据目录内，每个会话一个 xz 压缩的 tar 包和一个 JSON 清单）
+ARCHIVE_DIR_NAME = 'session-manager-archive'
+ARCHIVE_SUFFIX = '.tar.xz'
+# 查看归档对话时解压出的副本保存在缓存目录中，总大小超出上限时删除最久未用的
+ARCHIVE_VIEW_MAX_BYTES = 256 * 1024 * 1024
+
+# 续读只追加的文件时，校验上次偏移前的这么多字节
+RESUME_TAIL_BYTES = 64
+
+
+def get_cache_dir() -> Path:
+    """获取本程序的缓存目录（遵循 XDG_CACHE_HOME）"""
+    base = os.environ.get('XDG_CACHE_HOME')
+    base_dir = Path(base) if base else Path.home() / '.cache'
+    return base_dir / 'claude_session_manager'
+
+
+def get_root_cache_dir(claude_dir: Path) -> Path:
+    """获取某个 Claude 数据目录的缓存目录
+
+    默认的 ~/.claude 直接使用缓存根目录，其他数据目录按路径哈希分开缓存。
+    """
+    base = get_cache_dir()
+    claude_dir = Path(claude_dir).expanduser()
+    if claude_dir == Path.home() / '.claude':
+        return base
+    digest = hashlib.sha1(str(
+        claude_dir.resolve()).encode('utf-8')).hexdigest()[:16]
+    return base / 'roots' / digest
+
+
+def get_root_label(claude_dir: Path) -> str:
+    """数据目录的简短名称：xxx/.claude 取上级目录名，否则取目录名"""
+    claude_dir = Path(claude_dir).expanduser()
+    name = claude_dir.name
+    if name in ('.claude', '') and claude_dir.parent.name:
+        name = claude_dir.parent.name
+    # 名称用作会话键的前缀，不能包含分隔符
+    return name.replace(':', '_') or 'root'
+
+
+def parse_size(text: str) -> int:
+    """解析大小参数，支持 K/M/G 后缀（如 500M）"""
+    units = {'K': 1024, 'M': 1024**2, 'G': 1024**3}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def parse_iso_timestamp(ts_str: str) -> float:
+    """解析 ISO 格式时间戳，返回秒级时间戳（失败返回 0）"""
+    try:
+        return datetime.fromisoformat(ts_str.replace('Z', '+00:00')).timestamp()
+    except (ValueError, TypeError, AttributeError):
+        return 0
+
+
+def read_tail_records(file_path: Path, max_records: int = 5,
+                      block_size: int = 64 * 1024) -> list:
+    """从文件末尾向前读取，解析最后 N 条 JSON 记录（最新的在前）"""
+    records = []
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buffer = b''
+        while pos > 0 and len(records) < max_records:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            buffer = f.read(read_size) + buffer
+            lines = buffer.split(b'\n')
+            # 第一段可能是不完整的行，留到下一轮拼接
+            buffer = lines[0] if pos > 0 else b''
+            complete = lines[1:] if pos > 0 else lines
+            for line in reversed(complete):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                if len(records) >= max_records:
+                    break
+    return records
+
+
+def count_lines(file_path: Path) -> int:
+    """按块统计文件行数（只数换行符，不解码；最后一行没有换行符也算一行）"""
+    count = 0
+    last_byte = b'\n'
+    try:
+        with open(file_path, 'rb') as f:
+            while True:
+                block = f.read(1024 * 1024)
+                if not block:
+                    break
+                count += block.count(b'\n')
+                last_byte = block[-1:]
+    except OSError:
+        return 0
+    if last_byte != b'\n':
+        count += 1
+    return count
+
+
+def can_resume_append(f, st, state: dict) -> bool:
+    """判断只追加的文件能否从上次解析到的偏移继续
+
+    state 为上次解析时记录的 {'dev', 'ino', 'offset', 'tail'}，f 为以二进制
+    打开的同一文件，st 为它的 stat 结果。文件被替换（inode 变化）、截短，
+    或偏移前的最后几个字节变化（被原地重写成相同长度的前缀）时返回 False。
+    """
+    if not state:
+        return False
+    if state.get('dev') != st.st_dev or state.get('ino') != st.st_ino:
+        return False
+    offset = state.get('offset', 0)
+    if st.st_size < offset:
+        return False
+
+    tail = state.get('tail') or b''
+    if tail:
+        f.seek(offset - len(tail))
+        if f.read(len(tail)) != tail:
+            return False
+    return True
+
+
+# 命令相关的整块标签（连同内容一起移除），其余标签只移除标签本身
+_COMMAND_TAG_RE = re.compile(
+    r'<(local-command-caveat|command-name|command-message|command-args'
+    r'|local-command-stdout)>.*?</\1>'
+    r'|<[^>]+>', re.DOTALL)
+
+
+def clean_command_content(content: str, limit: int = None) -> str:
+    """清理命令内容中的 XML 标签
+
+    指定 limit 时只处理到输出超过 limit 个字符为止，截断后加 "..."（用于预览）。
+    """
+    if limit is None:
+        return _COMMAND_TAG_RE.sub('', content).strip()
+
+    pieces = []
+    length = 0
+    pos = 0
+    while length <= limit:
+        # 只在还需要的字符范围内查找下一个标签
+        lt = content.find('<', pos, pos + limit - length + 1)
+        if lt < 0:
+            pieces.append(content[pos:pos + limit - length + 1])
+            break
+        pieces.append(content[pos:lt])
+        length += lt - pos
+        match = _COMMAND_TAG_RE.match(content, lt)
+        if match:
+            pos = match.end()
+        else:
+            pieces.append('<')
+            length += 1
+            pos = lt + 1
+
+    content = ''.join(pieces)
+    if len(content) > limit:
+        content = content[:limit] + "..."
+    return content.strip()
+
+
+def extract_message_text(msg: dict, limit: int = None) -> tuple:
+    """按对话查看器的显示规则提取一条记录的文本
+
+    返回 (role, text)，role 为 'user'、'assistant' 或 'tool'；
+    没有可显示内容时返回 None。limit 传给 clean_command_content（用于预览）。
+    """
+    if not isinstance(msg, dict):
+        return None
+
+    msg_type = msg.get('type', 'unknown')
+    user_type = msg.get('userType', '')
+
+    # 跳过 snapshot 类型
+    if msg_type == 'file-history-snapshot':
+        return None
+
+    # 获取 message 字段
+    message_obj = msg.get('message', {})
+    if not message_obj or not isinstance(message_obj, dict):
+        return None
+
+    if user_type == 'external' and msg_type == 'user':
+        # 用户消息
+        content = message_obj.get('content', '')
+        if isinstance(content, str):
+            # 清理命令标签
+            content = clean_command_content(content, limit)
+            if content.strip():
+                return 'user', content
+
+    elif user_type == 'assistant' or msg_type == 'assistant':
+        # Assistant 消息
+        content = message_obj.get('content', [])
+        if isinstance(content, list):
+            # 遍历 content 数组（跳过 thinking）
+            text_parts = []
+            for part in content:
+                if not isinstance(part, dict):
+                    continue
+                part_type = part.get('type', '')
+                if part_type == 'text':
+                    text = part.get('text', '')
+                    if text:
+                        text_parts.append(text)
+                elif part_type == 'tool_use':
+                    # 工具调用
+                    tool_name = part.get('name', 'unknown')
+                    text_parts.append(f"[调用工具: {tool_name}]")
+
+            full_text = '\n'.join(text_parts)
+            if full_text.strip():
+                return 'assistant', full_text
+
+    elif msg_type == 'tool' or msg_type == 'tool_result':
+        # 工具结果
+        content = msg.get('content', '')
+        if content:
+            text = str(content)[:200]
+            if text.strip():
+                return 'tool', text
+
+    return None
+
+
+class FullTextIndex:
+    """全部对话文件的全文索引（SQLite FTS5）
+
+    索引用户消息和 Claude 回复的文本，按文件 (mtime, size) 增量更新；
+    对只追加的对话文件只索引新增的部分。
+    """
+
+    SCHEMA_VERSION = 2  # 2: files 表记录 dev 和 inode
+    INDEXED_ROLES = ('user', 'assistant')
+
+    def __init__(self, db_file: Path):
+        self.db_file = db_file
+        self.tokenizer = None
+
+    @staticmethod
+    def is_available() -> bool:
+        """当前 sqlite3 是否支持 FTS5"""
+        try:
+            conn = sqlite3.connect(':memory:')
+            try:
+                conn.execute('CREATE VIRTUAL TABLE t USING fts5(c)')
+            finally:
+                conn.close()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _pick_tokenizer(conn) -> str:
+        """优先使用 trigram 分词（支持中文子串匹配），旧版本 SQLite 回退到 unicode61"""
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE temp.probe USING fts5(c, tokenize='trigram')"
+            )
+            conn.execute('DROP TABLE temp.probe')
+            return 'trigram'
+        except sqlite3.Error:
+            return 'unicode61'
+
+    def _connect(self):
+        """打开数据库，必要时建表（表结构或分词器变化时重建）"""
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_file), timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, '
+                     'value TEXT)')
+        row = conn.execute("SELECT value FROM meta WHERE key='schema'").fetchone()
+        tokenizer = self._pick_tokenizer(conn)
+        schema = f"{self.SCHEMA_VERSION}:{tokenizer}"
+
+        if row is None or row[0] != schema:
+            with conn:
+                conn.execute('DROP TABLE IF EXISTS files')
+                conn.execute('DROP TABLE IF EXISTS messages')
+                conn.execute('CREATE TABLE files (path TEXT PRIMARY KEY, '
+                             'session_id TEXT, mtime INTEGER, size INTEGER, '
+                             'dev INTEGER, ino INTEGER, offset INTEGER, '
+                             'tail BLOB)')
+                conn.execute('CREATE VIRTUAL TABLE messages USING fts5('
+                             'content, session_id UNINDEXED, role UNINDEXED, '
+                             f"path UNINDEXED, tokenize='{tokenizer}')")
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema', ?)",
+                    (schema, ))
+        self.tokenizer = tokenizer
+        return conn
+
+    def update(self, projects_dir: Path, progress_callback=None) -> dict:
+        """按 mtime/size 增量更新索引
+
+        progress_callback(done, total) 在每个文件处理后调用。
+        返回 {'indexed': 重新索引的文件数, 'removed': 移除的文件数, 'total': 文件总数}
+        """
+        result = {'indexed': 0, 'removed': 0, 'total': 0}
+
+        # 1. 收集当前所有对话文件
+        current = {}
+        if projects_dir.exists():
+            with os.scandir(projects_dir) as it:
+                project_entries = [e for e in it if e.is_dir()]
+            for project_entry in project_entries:
+                try:
+                    with os.scandir(project_entry.path) as it:
+                        for entry in it:
+                            if entry.name.endswith('.jsonl') and entry.is_file():
+                                st = entry.stat()
+                                current[entry.path] = (st.st_mtime_ns,
+                                                       st.st_size)
+                except OSError:
+                    continue
+        result['total'] = len(current)
+
+        conn = self._connect()
+        try:
+            indexed = {
+                row[0]: row[1:]
+                for row in conn.execute('SELECT path, mtime, size, dev, ino, '
+                                        'offset, tail FROM files')
+            }
+
+            # 2. 移除已删除的文件
+            for path in set(indexed) - set(current):
+                with conn:
+                    conn.execute('DELETE FROM messages WHERE path = ?', (path, ))
+                    conn.execute('DELETE FROM files WHERE path = ?', (path, ))
+                result['removed'] += 1
+
+            # 3. 索引新增或变化的文件
+            for done, (path, (mtime, size)) in enumerate(current.items(), 1):
+                old = indexed.get(path)
+                if old is None or old[0] != mtime or old[1] != size:
+                    self._index_file(conn, Path(path), mtime, size, old)
+                    result['indexed'] += 1
+                if progress_callback:
+                    progress_callback(done, result['total'])
+        finally:
+            conn.close()
+
+        return result
+
+    def _index_file(self, conn, path: Path, mtime: int, size: int, old):
+        """索引单个文件；文件只是追加了内容时从上次的偏移继续
+
+        续读条件与 history.jsonl 相同（见 can_resume_append），
+        文件被替换或原地重写时删除旧记录完整重新索引。
+        """
+        session_id = path.stem
+        resumed = False
+        rows = []
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                offset = 0
+                tail = b''
+                # old = (mtime, size, dev, ino, offset, tail)
+                state = None
+                if old is not None:
+                    state = {
+                        'dev': old[2],
+                        'ino': old[3],
+                        'offset': old[4] or 0,
+                        'tail': old[5] or b''
+                    }
+                if can_resume_append(f, st, state):
+                    offset = state['offset']
+                    tail = state['tail']
+                    resumed = True
+                f.seek(offset)
+
+                for raw in f:
+                    # 末尾未写完的行留到下次
+                    if not raw.endswith(b'\n'):
+                        break
+                    offset += len(raw)
+                    tail = raw[-RESUME_TAIL_BYTES:]
+                    line = raw.strip()
+                    if not line:
+                        continue
+                    try:
+                        msg = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+                    extracted = extract_message_text(msg)
+                    if extracted and extracted[0] in self.INDEXED_ROLES:
+                        rows.append((extracted[1], session_id, extracted[0],
+                                     str(path)))
+        except OSError:
+            return
+
+        with conn:
+            if not resumed:
+                conn.execute('DELETE FROM messages WHERE path = ?',
+                             (str(path), ))
+            conn.executemany(
+                'INSERT INTO messages (content, session_id, role, path) '
+                'VALUES (?, ?, ?, ?)', rows)
+            conn.execute(
+                'INSERT OR REPLACE INTO files (path, session_id, mtime, size, '
+                'dev, ino, offset, tail) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (str(path), session_id, mtime, size, st.st_dev, st.st_ino,
+                 offset, tail))
+
+    def search(self, query: str, limit: int = 50) -> list:
+        """搜索关键词，按相关度返回会话命中列表
+
+        每个会话只保留最相关的一条片段：
+        [{'session_id', 'path', 'role', 'snippet', 'hits'}, ...]
+        """
+        query = query.strip()
+        if not query:
+            return []
+
+        conn = self._connect()
+        try:
+            if self.tokenizer == 'trigram' and len(query) < 3:
+                # trigram 无法匹配少于 3 个字符的查询，回退到子串扫描
+                rows = self._search_substring(conn, query)
+            else:
+                rows = conn.execute(
+                    "SELECT session_id, path, role, "
+                    "snippet(messages, 0, '【', '】', '…', 48) "
+                    "FROM messages WHERE messages MATCH ? "
+                    "ORDER BY bm25(messages) LIMIT 1000",
+                    (self._build_match_query(query), )).fetchall()
+        except sqlite3.Error:
+            rows = []
+        finally:
+            conn.close()
+
+        hits = {}
+        for session_id, path, role, snippet in rows:
+            hit = hits.get(session_id)
+            if hit is None:
+                if len(hits) >= limit:
+                    continue
+                hits[session_id] = {
+                    'session_id': session_id,
+                    'path': path,
+                    'role': role,
+                    'snippet': ' '.join(snippet.split()),
+                    'hits': 1
+                }
+            else:
+                hit['hits'] += 1
+        return list(hits.values())
+
+    def _build_match_query(self, query: str) -> str:
+        """把用户输入转换成 FTS5 查询（每个词作为短语，词之间为 AND）"""
+        if self.tokenizer == 'trigram':
+            terms = [query]
+        else:
+            terms = query.split()
+        return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    @staticmethod
+    def _search_substring(conn, query: str) -> list:
+        """不区分大小写的子串扫描，自行生成片段"""
+        rows = []
+        needle = query.lower()
+        for session_id, path, role, content in conn.execute(
+                'SELECT session_id, path, role, content FROM messages '
+                'WHERE instr(lower(content), ?) > 0 LIMIT 1000', (needle, )):
+            pos = content.lower().find(needle)
+            start = max(0, pos - 30)
+            end = pos + len(query) + 30
+            snippet = (('…' if start > 0 else '') + content[start:pos] + '【' +
+                       content[pos:pos + len(query)] + '】' +
+                       content[pos + len(query):end] +
+                       ('…' if end < len(content) else ''))
+            rows.append((session_id, path, role, snippet))
+        return rows
+
+
+class SessionMetadataIndex:
+    """会话元数据索引
+
+    持久化到磁盘，以 (path, mtime, size) 作为失效条件，
+    只有 stat 发生变化的对话文件才会被重新解析；
+    对话文件只追加，变长时只解析新追加的部分（与 history.jsonl 一样
+    校验 dev、inode 和上次末尾的字节，文件被替换或重写时完整重新解析）。
+    """
+
+    VERSION = 2  # 2: first_user_message 截断保存
+    # 首条用户消息只保存界面用到的前若干字符，避免索引文件随粘贴的长文本膨胀
+    MAX_MESSAGE_CHARS = 200
+
+    def __init__(self, index_file: Path):
+        self.index_file = index_file
+        self.entries = {}  # {path: entry}
+        self.loaded = False
+        self.dirty = False
+        # 后台加载线程和界面线程会同时访问索引
+        self.lock = threading.RLock()
+
+    def load(self):
+        """从磁盘加载索引（文件损坏或版本不符时忽略）"""
+        with self.lock:
+            self.loaded = True
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return
+            if isinstance(data, dict) and data.get('version') == self.VERSION:
+                entries = data.get('entries')
+                if isinstance(entries, dict):
+                    self.entries = entries
+
+    def save(self):
+        """写回磁盘（临时文件 + 原子重命名，仅在有变更时写入）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                self.index_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = self.index_file.with_suffix('.tmp')
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'version': self.VERSION,
+                        'entries': self.entries
+                    }, f, ensure_ascii=False)
+                os.replace(tmp_file, self.index_file)
+                self.dirty = False
+            except OSError:
+                pass
+
+    def get(self, conv_file: Path) -> dict:
+        """获取对话文件的元数据，文件不存在返回 None"""
+        if not self.loaded:
+            self.load()
+
+        try:
+            st = conv_file.stat()
+        except OSError:
+            return None
+
+        key = str(conv_file)
+        with self.lock:
+            entry = self.entries.get(key)
+        if (entry and entry.get('mtime') == st.st_mtime_ns
+                and entry.get('size') == st.st_size):
+            return entry
+
+        # 解析文件时不持有锁
+        try:
+            with open(conv_file, 'rb') as f:
+                if self._can_resume(f, st, entry):
+                    entry = self.scan_conversation(conv_file, dict(entry),
+                                                   entry['size'])
+                else:
+                    entry = self.scan_conversation(conv_file)
+                f.seek(max(0, st.st_size - RESUME_TAIL_BYTES))
+                tail = f.read(st.st_size - f.tell())
+        except OSError:
+            return None
+        entry['mtime'] = st.st_mtime_ns
+        entry['size'] = st.st_size
+        entry['dev'] = st.st_dev
+        entry['ino'] = st.st_ino
+        entry['tail'] = tail.hex()
+        with self.lock:
+            self.entries[key] = entry
+            self.dirty = True
+        return entry
+
+    @staticmethod
+    def _can_resume(f, st, entry: dict) -> bool:
+        """已有条目能否只解析追加的部分"""
+        if not entry or not 0 < entry.get('size', 0) < st.st_size:
+            return False
+        try:
+            tail = bytes.fromhex(entry.get('tail') or '')
+        except ValueError:
+            return False
+        # 上次解析到的位置必须在行边界上（最后一行当时已写完）
+        if not tail.endswith(b'\n'):
+            return False
+        return can_resume_append(f, st, {
+            'dev': entry.get('dev'),
+            'ino': entry.get('ino'),
+            'offset': entry['size'],
+            'tail': tail
+        })
+
+    def get_cached(self, conv_file: Path) -> dict:
+        """只返回仍然有效的已缓存条目，不解析文件（无缓存或已过期返回 None）"""
+        if not self.loaded:
+            self.load()
+
+        try:
+            st = conv_file.stat()
+        except OSError:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(str(conv_file))
+        if (entry and entry.get('mtime') == st.st_mtime_ns
+                and entry.get('size') == st.st_size):
+            return entry
+        return None
+
+    def discard(self, conv_file: Path):
+        """移除已删除文件的索引条目"""
+        with self.lock:
+            if self.entries.pop(str(conv_file), None) is not None:
+                self.dirty = True
+
+    @staticmethod
+    def scan_conversation(conv_file: Path,
+                          entry: dict = None,
+                          offset: int = 0) -> dict:
+        """解析对话文件，提取元数据
+
+        传入已有条目和偏移时从 offset 继续解析追加的部分，
+        调用方负责确认文件只是在 offset 之后追加了内容。
+        """
+        if entry is None or offset == 0:
+            entry = {
+                'title': None,
+                'first_user_message': None,
+                'message_count': 0,
+                'last_timestamp': 0
+            }
+
+        try:
+            with open(conv_file, 'r', encoding='utf-8') as f:
+                if offset:
+                    f.seek(offset)
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        msg = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if not isinstance(msg, dict):
+                        continue
+
+                    entry['message_count'] += 1
+
+                    # customTitle 以第一次出现的为准
+                    if entry['title'] is None and msg.get('customTitle'):
+                        entry['title'] = msg.get('customTitle')
+
+                    # 第一条用户消息
+                    if entry['first_user_message'] is None:
+                        if msg.get('type') == 'user' and msg.get(
+                                'userType') == 'external':
+                            message_obj = msg.get('message') or {}
+                            content = message_obj.get('content', '')
+                            if isinstance(content, str) and content.strip():
+                                entry['first_user_message'] = content.strip(
+                                )[:SessionMetadataIndex.MAX_MESSAGE_CHARS]
+
+                    # 最后一条消息时间
+                    ts_str = msg.get('timestamp')
+                    if ts_str:
+                        ts = parse_iso_timestamp(ts_str)
+                        if ts > entry['last_timestamp']:
+                            entry['last_timestamp'] = ts
+        except (OSError, UnicodeDecodeError):
+            pass
+
+        return entry
+
+
+class ConversationPager:
+    """对话文件的分页读取器
+
+    流式扫描一遍文件，只记录每条记录（行）的字节偏移，
+    需要显示某一页时再按偏移读取并解析该页的记录，
+    内存占用与文件大小无关（偏移数组每条记录 8 字节）。
+    """
+
+    def __init__(self, conv_file: Path, page_size: int = 200):
+        self.conv_file = conv_file
+        self.page_size = page_size
+        self.offsets = array('q')  # 每条非空记录的起始字节偏移
+        self.indexed_bytes = 0  # 已扫描到的字节位置
+        self.file_size = 0
+        self.complete = False
+        try:
+            self.file_size = conv_file.stat().st_size
+        except OSError:
+            self.complete = True
+
+    def index_more(self, max_bytes: int = None) -> bool:
+        """继续建立偏移索引，最多扫描 max_bytes 字节；返回是否已完成"""
+        if self.complete:
+            return True
+        try:
+            with open(self.conv_file, 'rb') as f:
+                f.seek(self.indexed_bytes)
+                offset = self.indexed_bytes
+                scanned = 0
+                for line in f:
+                    # 只索引打开时的文件大小以内的内容
+                    if offset >= self.file_size:
+                        break
+                    if line.strip():
+                        self.offsets.append(offset)
+                    offset += len(line)
+                    scanned += len(line)
+                    if max_bytes is not None and scanned >= max_bytes:
+                        break
+                self.indexed_bytes = offset
+        except OSError:
+            self.complete = True
+            return True
+
+        if self.indexed_bytes >= self.file_size:
+            self.complete = True
+        return self.complete
+
+    def get_record_count(self) -> int:
+        """已索引的记录数"""
+        return len(self.offsets)
+
+    def get_page_count(self) -> int:
+        """可以显示的页数（索引未完成时只算已满的页）"""
+        if self.complete:
+            return (len(self.offsets) + self.page_size - 1) // self.page_size
+        return len(self.offsets) // self.page_size
+
+    def iter_records(self, start: int, stop: int = None):
+        """按偏移读取第 start 到 stop 条记录，逐条返回 (序号, 记录)"""
+        if stop is None or stop > len(self.offsets):
+            stop = len(self.offsets)
+        if start >= stop:
+            return
+        try:
+            with open(self.conv_file, 'rb') as f:
+                f.seek(self.offsets[start])
+                index = start
+                for line in f:
+                    if index >= stop:
+                        break
+                    if not line.strip():
+                        continue
+                    try:
+                        msg = json.loads(line)
+                    except (ValueError, UnicodeDecodeError):
+                        msg = None
+                    yield index, msg
+                    index += 1
+        except OSError:
+            return
+
+    def read_page(self, page: int) -> list:
+        """读取一页记录（无法解析的记录跳过）"""
+        start = page * self.page_size
+        return [
+            msg for _, msg in self.iter_records(start, start + self.page_size)
+            if isinstance(msg, dict)
+        ]
+
+    def find(self, keyword: str, start: int = 0) -> int:
+        """从第 start 条记录开始查找显示文本包含关键词的记录，返回其序号
+
+        先对原始行做子串预筛（同时匹配 JSON 转义后的形式），
+        只有命中的行才解析。未找到返回 -1。
+        """
+        keyword = keyword.lower()
+        raw_keys = {
+            keyword,
+            json.dumps(keyword, ensure_ascii=False)[1:-1],
+            json.dumps(keyword)[1:-1]
+        }
+        if start >= len(self.offsets):
+            return -1
+        try:
+            with open(self.conv_file, 'rb') as f:
+                f.seek(self.offsets[start])
+                index = start
+                for line in f:
+                    if index >= len(self.offsets):
+                        break
+                    if not line.strip():
+                        continue
+                    lowered = line.decode('utf-8', 'replace').lower()
+                    if any(key in lowered for key in raw_keys):
+                        try:
+                            msg = json.loads(line)
+                        except (ValueError, UnicodeDecodeError):
+                            msg = None
+                        extracted = extract_message_text(msg)
+                        if extracted and keyword in extracted[1].lower():
+                            return index
+                    index += 1
+        except OSError:
+            pass
+        return -1
+
+
+class DebugLogIndex:
+    """基于 mmap 的调试日志索引
+
+    行偏移表按需分批建立；ERROR/WARN 行直接在映射的缓冲区上用 find 定位，
+    正则搜索也直接作用于映射的缓冲区，不需要把文件读入内存。
+    """
+
+    LEVELS = {'ERROR': b'[ERROR]', 'WARN': b'[WARN]'}
+
+    def __init__(self, log_file: Path):
+        self.log_file = log_file
+        self.file = None
+        self.buffer = None  # mmap 对象（空文件为 None）
+        self.size = 0
+        self.line_starts = array('q')  # 每行起始字节偏移
+        self.indexed_bytes = 0
+        self.complete = False
+        self.level_lines = {}  # {level: [行号]}
+
+    def open(self):
+        """打开并映射文件（文件不存在时抛出 OSError）"""
+        self.file = open(self.log_file, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        if self.size > 0:
+            self.buffer = mmap.mmap(self.file.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+        else:
+            self.complete = True
+
+    def close(self):
+        """释放映射和文件句柄"""
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def index_more(self, max_bytes: int = None) -> bool:
+        """继续建立行偏移表，最多扫描 max_bytes 字节；返回是否已完成"""
+        if self.complete:
+            return True
+        buffer = self.buffer
+        pos = self.indexed_bytes
+        stop = self.size if max_bytes is None else min(self.size,
+                                                       pos + max_bytes)
+        starts = self.line_starts
+        while pos < stop:
+            starts.append(pos)
+            newline = buffer.find(b'\n', pos)
+            if newline < 0:
+                pos = self.size
+                break
+            pos = newline + 1
+        self.indexed_bytes = pos
+        if pos >= self.size:
+            self.complete = True
+        return self.complete
+
+    def get_line_count(self) -> int:
+        """已索引的行数"""
+        return len(self.line_starts)
+
+    def get_level_lines(self, level: str) -> list:
+        """某个级别所有行的有序行号（首次调用时在缓冲区上 find，结果缓存）"""
+        if level in self.level_lines:
+            return self.level_lines[level]
+
+        self.index_more()
+        lines = []
+        if self.buffer is not None:
+            tag = self.LEVELS[level]
+            pos = self.buffer.find(tag)
+            while pos >= 0:
+                line_no = bisect_right(self.line_starts, pos) - 1
+                lines.append(line_no)
+                # 同一行只记录一次
+                if line_no + 1 >= len(self.line_starts):
+                    break
+                pos = self.buffer.find(tag, self.line_starts[line_no + 1])
+        self.level_lines[level] = lines
+        return lines
+
+    def get_line(self, line_no: int) -> str:
+        """读取一行（不含换行符）"""
+        start = self.line_starts[line_no]
+        if line_no + 1 < len(self.line_starts):
+            end = self.line_starts[line_no + 1]
+        else:
+            end = self.indexed_bytes
+        return self.buffer[start:end].rstrip(b'\r\n').decode('utf-8',
+                                                             'replace')
+
+    @staticmethod
+    def get_level(line: str) -> str:
+        """行的日志级别：'ERROR'、'WARN' 或 'DEBUG'"""
+        if '[ERROR]' in line:
+            return 'ERROR'
+        if '[WARN]' in line:
+            return 'WARN'
+        return 'DEBUG'
+
+    def search(self, pattern, start_line: int = 0) -> int:
+        """从 start_line 开始在映射缓冲区上做正则搜索，返回命中的行号，未找到返回 -1
+
+        pattern 为编译好的 bytes 正则。
+        """
+        self.index_more()
+        if self.buffer is None or start_line >= len(self.line_starts):
+            return -1
+        match = pattern.search(self.buffer, self.line_starts[start_line])
+        if not match:
+            return -1
+        return bisect_right(self.line_starts, match.start()) - 1
+
+
+_UUID_PREFIX_RE = re.compile(
+    r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+
+
+def parse_todo_session_id(stem: str) -> str:
+    """从 todo 文件名解析 sessionId（格式: <sessionId>-agent-<sessionId>）"""
+    match = _UUID_PREFIX_RE.match(stem)
+    if match:
+        return match.group(0)
+    return stem.split('-agent-')[0]
+
+
+class StorageInventory:
+    """~/.claude 存储清单
+
+    按 sessionId 归类每种关联文件的路径和大小，
+    文件种类与清理结果中的键保持一致。
+    """
+
+    KINDS = ('debug_files', 'conversation_files', 'session_envs',
+             'file_histories', 'todos', 'archives')
+    # 参与无索引清理的种类（归档是用户主动保留的数据，不当作垃圾清理）
+    ORPHAN_KINDS = KINDS[:-1]
+
+    def __init__(self):
+        self.history_size = 0
+        self.project_dirs = []
+        self.by_kind = {kind: [] for kind in self.KINDS}
+        self.by_session = {}  # {sid: {kind: [item, ...]}}
+        self.complete = True  # 扫描被取消时为 False
+
+    def add(self, kind: str, session_id: str, path: Path, size: int,
+            is_dir: bool = False) -> dict:
+        """登记一个文件或目录，返回登记的条目"""
+        item = {
+            'session_id': session_id,
+            'path': path,
+            'size': size,
+            'is_dir': is_dir
+        }
+        self.by_kind[kind].append(item)
+        self.by_session.setdefault(session_id, {}).setdefault(kind,
+                                                              []).append(item)
+        return item
+
+    def update(self, kind: str, session_id: str, path: Path, size: int):
+        """文件变化：更新已登记条目的大小，未登记时新增"""
+        for item in self.by_session.get(session_id, {}).get(kind, []):
+            if item['path'] == path:
+                item['size'] = size
+                return item
+        return self.add(kind, session_id, path, size)
+
+    def remove(self, kind: str, session_id: str, path: Path):
+        """文件被删除：移除登记的条目"""
+        items = self.by_session.get(session_id, {}).get(kind)
+        if not items:
+            return
+        self.by_session[session_id][kind] = [
+            item for item in items if item['path'] != path
+        ]
+        self.by_kind[kind] = [
+            item for item in self.by_kind[kind] if item['path'] != path
+        ]
+
+    def get_artifacts(self, session_id: str) -> dict:
+        """获取某个会话的所有关联文件 {kind: [item, ...]}"""
+        return self.by_session.get(session_id, {})
+
+    def get_kind_size(self, session_id: str, kind: str) -> int:
+        """获取某个会话某类文件的总大小"""
+        return sum(item['size']
+                   for item in self.get_artifacts(session_id).get(kind, []))
+
+    def get_session_size(self, session_id: str) -> int:
+        """获取某个会话所有关联文件的总大小"""
+        return sum(item['size']
+                   for items in self.get_artifacts(session_id).values()
+                   for item in items)
+
+    def get_total_size(self) -> int:
+        """history.jsonl 与所有会话文件的总大小"""
+        return self.history_size + sum(
+            item['size'] for items in self.by_kind.values() for item in items)
+
+    def get_kind_totals(self, kind: str) -> tuple:
+        """获取某类文件的 (数量, 总大小)"""
+        items = self.by_kind[kind]
+        return len(items), sum(item['size'] for item in items)
+
+    def get_orphans(self, valid_session_ids: set) -> dict:
+        """获取不在有效 sessionId 集合中的文件 {kind: [item, ...]}"""
+        return {
+            kind: [
+                item for item in items
+                if item['session_id'] not in valid_session_ids
+            ]
+            for kind, items in self.by_kind.items()
+            if kind in self.ORPHAN_KINDS
+        }
+
+
+class StorageScanner:
+    """基于 os.scandir 的存储扫描器，一次遍历 ~/.claude 生成存储清单
+
+    on_item(kind, item) 在每登记一个文件/目录时调用，
+    on_progress(done, total) 在每完成一个扫描单元时调用，
+    cancel_event 被设置后在下一个扫描单元前停止（清单标记为未完成）。
+    回调在扫描线程中执行。
+    """
+
+    def __init__(self,
+                 claude_dir: Path,
+                 on_item=None,
+                 on_progress=None,
+                 cancel_event: threading.Event = None):
+        self.claude_dir = claude_dir
+        self.on_item = on_item
+        self.on_progress = on_progress
+        self.cancel_event = cancel_event
+
+    def scan(self) -> StorageInventory:
+        """遍历一次 ~/.claude，每个条目只 stat 一次"""
+        inventory = StorageInventory()
+        try:
+            with os.scandir(self.claude_dir) as it:
+                entries = list(it)
+        except OSError:
+            return inventory
+
+        # 先列出扫描单元：每个项目目录、每个会话目录各算一个单元，
+        # 目录大小统计最耗时，按单元汇报进度和检查取消
+        units = []
+        for entry in entries:
+            name = entry.name
+            try:
+                if name == 'history.jsonl' and entry.is_file():
+                    inventory.history_size = entry.stat().st_size
+                elif not entry.is_dir():
+                    continue
+                elif name == 'projects':
+                    for project_path in self._list_dirs(entry.path):
+                        inventory.project_dirs.append(Path(project_path))
+                        units.append((self._scan_files, project_path,
+                                      '.jsonl', 'conversation_files'))
+                elif name == 'debug':
+                    units.append(
+                        (self._scan_files, entry.path, '.txt', 'debug_files'))
+                elif name == 'session-env':
+                    for dir_path in self._list_dirs(entry.path):
+                        units.append(
+                            (self._scan_session_dir, dir_path, 'session_envs'))
+                elif name == 'file-history':
+                    for dir_path in self._list_dirs(entry.path):
+                        units.append((self._scan_session_dir, dir_path,
+                                      'file_histories'))
+                elif name == 'todos':
+                    units.append(
+                        (self._scan_files, entry.path, '.json', 'todos'))
+                elif name == ARCHIVE_DIR_NAME:
+                    units.append((self._scan_files, entry.path,
+                                  ARCHIVE_SUFFIX, 'archives'))
+            except OSError:
+                continue
+
+        total = len(units)
+        for done, (func, *args) in enumerate(units, 1):
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                inventory.complete = False
+                break
+            try:
+                func(inventory, *args)
+            except OSError:
+                pass
+            if self.on_progress:
+                self.on_progress(done, total)
+
+        return inventory
+
+    @staticmethod
+    def _list_dirs(dir_path: str) -> list:
+        """列出目录下的子目录路径"""
+        paths = []
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        paths.append(entry.path)
+                except OSError:
+                    continue
+        return paths
+
+    def _add(self, inventory: StorageInventory, kind: str, session_id: str,
+             path: Path, size: int, is_dir: bool = False):
+        """登记到清单并通知 on_item"""
+        item = inventory.add(kind, session_id, path, size, is_dir)
+        if self.on_item:
+            self.on_item(kind, item)
+
+    def _scan_files(self, inventory: StorageInventory, dir_path: str,
+                    suffix: str, kind: str):
+        """扫描目录下以 suffix 结尾的文件"""
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if not entry.name.endswith(suffix):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    size = entry.stat().st_size
+                except OSError:
+                    continue
+                stem = entry.name[:-len(suffix)]
+                if kind == 'todos':
+                    if '-' not in stem:
+                        continue
+                    sid = parse_todo_session_id(stem)
+                else:
+                    sid = stem
+                self._add(inventory, kind, sid, Path(entry.path), size)
+
+    def _scan_session_dir(self, inventory: StorageInventory, dir_path: str,
+                          kind: str):
+        """登记以 sessionId 命名的子目录，并统计目录大小"""
+        self._add(inventory,
+                  kind,
+                  os.path.basename(dir_path),
+                  Path(dir_path),
+                  self.get_dir_size(dir_path),
+                  is_dir=True)
+
+    @staticmethod
+    def get_dir_size(dir_path: str) -> int:
+        """递归统计目录中所有文件的大小"""
+        total = 0
+        stack = [dir_path]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            else:
+                                total += entry.stat(
+                                    follow_symlinks=False).st_size
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return total
+
+
+# 快照文件名格式: snapshot-<shell>-<timestamp>-<random_id>.sh
+# 例如: snapshot-zsh-1770693564169-gre758.sh
+_SNAPSHOT_RE = re.compile(r'snapshot-([^-]+)-(\d+)-([^.]+)\.sh')
+
+
+class StorageWatcher:
+    """监视 ~/.claude 的变化，把文件事件批量交给回调
+
+    Linux 上通过 ctypes 调用 inotify，其他平台或 inotify 不可用
+    （如 watch 数量达到上限）时退回定时轮询 stat。
+    监视 history.jsonl、projects/*/、debug/ 和 shell-snapshots/，
+    callback(events) 在监视线程中调用，events 是 {(kind, path)} 集合，
+    kind 为 'history' / 'conversation' / 'debug' / 'snapshot'；
+    事件丢失（inotify 队列溢出）时为 ('overflow', None)，调用方应完整重新加载。
+    """
+
+    # inotify 常量（linux/inotify.h）
+    IN_MODIFY = 0x00000002
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = IN_MODIFY | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self,
+                 claude_dir: Path,
+                 callback,
+                 poll_interval: float = 2.0,
+                 debounce: float = 0.2,
+                 use_inotify: bool = True):
+        self.claude_dir = str(claude_dir)
+        self.projects_dir = os.path.join(self.claude_dir, 'projects')
+        self.debug_dir = os.path.join(self.claude_dir, 'debug')
+        self.snapshots_dir = os.path.join(self.claude_dir, 'shell-snapshots')
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.fd = None
+        self.libc = None
+        self.watches = {}  # {wd: 目录路径}
+        self.poll_state = None  # 轮询模式下 {path: (mtime_ns, size)}
+        if use_inotify:
+            self._init_inotify()
+
+    @property
+    def backend(self) -> str:
+        return 'inotify' if self.fd is not None else 'polling'
+
+    def start(self):
+        """启动监视线程"""
+        if self.thread is not None:
+            return
+        if self.fd is None:
+            self.poll_state = self._poll_snapshot()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止监视线程并释放 inotify"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.poll_interval + 1)
+            self.thread = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _run(self):
+        """监视线程：等待事件，合并短时间内的连续事件后回调"""
+        while not self.stop_event.is_set():
+            events = self._wait_events(self.poll_interval)
+            if not events:
+                continue
+            deadline = time.monotonic() + self.debounce
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.stop_event.is_set():
+                    break
+                events |= self._wait_events(remaining)
+            try:
+                self.callback(events)
+            except Exception:
+                pass
+
+    def _wait_events(self, timeout: float) -> set:
+        """等待最多 timeout 秒，返回期间发生的事件"""
+        if self.fd is not None:
+            return self._read_inotify(timeout)
+        if self.stop_event.wait(timeout):
+            return set()
+        return self._poll_changes()
+
+    def classify(self, path: str):
+        """根据路径判断事件类型，无关的文件返回 None"""
+        parent, name = os.path.split(path)
+        if parent == self.claude_dir:
+            return 'history' if name == 'history.jsonl' else None
+        if parent == self.debug_dir:
+            return 'debug' if name.endswith('.txt') else None
+        if parent == self.snapshots_dir:
+            return 'snapshot'
+        if os.path.dirname(parent) == self.projects_dir and name.endswith(
+                '.jsonl'):
+            return 'conversation'
+        return None
+
+    # ---------- inotify ----------
+
+    def _init_inotify(self):
+        """初始化 inotify 并监视所有目录，失败时保持轮询模式"""
+        if not sys.platform.startswith('linux'):
+            return
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or None,
+                               use_errno=True)
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        except (OSError, AttributeError, ImportError):
+            return
+        if fd < 0:
+            return
+        self.libc = libc
+        self.fd = fd
+        try:
+            self._watch_tree()
+        except OSError:
+            os.close(self.fd)
+            self.fd = None
+            self.watches = {}
+
+    def _add_watch(self, dir_path: str):
+        """监视一个目录（watch 数量达到上限时抛出 OSError）"""
+        import ctypes
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dir_path),
+                                         self.WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == 2:  # ENOENT：目录已被删除
+                return
+            raise OSError(err, os.strerror(err), dir_path)
+        self.watches[wd] = dir_path
+
+    def _watch_tree(self):
+        """监视 ~/.claude 及其下需要关注的目录"""
+        self._add_watch(self.claude_dir)
+        for dir_path in (self.projects_dir, self.debug_dir,
+                         self.snapshots_dir):
+            if os.path.isdir(dir_path):
+                self._add_watch(dir_path)
+        if os.path.isdir(self.projects_dir):
+            for project_path in StorageScanner._list_dirs(self.projects_dir):
+                self._add_watch(project_path)
+
+    def _read_inotify(self, timeout: float) -> set:
+        """读取并解析 inotify 事件"""
+        events = set()
+        try:
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+        except (OSError, ValueError):
+            return events
+        if not ready:
+            return events
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return events
+
+        pos = 0
+        header = self.EVENT_HEADER
+        while pos + header.size <= len(buffer):
+            wd, mask, _cookie, length = header.unpack_from(buffer, pos)
+            pos += header.size
+            name = os.fsdecode(buffer[pos:pos + length].rstrip(b'\0'))
+            pos += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                events.add(('overflow', None))
+                continue
+            if mask & self.IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            dir_path = self.watches.get(wd)
+            if dir_path is None or not name:
+                continue
+            path = os.path.join(dir_path, name)
+
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    events |= self._on_new_dir(path)
+                continue
+            kind = self.classify(path)
+            if kind:
+                events.add((kind, path))
+        return events
+
+    def _on_new_dir(self, path: str) -> set:
+        """新建的目录：加入监视，并把其中已有的文件作为事件上报"""
+        parent = os.path.dirname(path)
+        watched = (parent == self.projects_dir or path in (
+            self.projects_dir, self.debug_dir, self.snapshots_dir))
+        if not watched:
+            return set()
+        try:
+            self._add_watch(path)
+            if path == self.projects_dir:
+                for project_path in StorageScanner._list_dirs(path):
+                    self._add_watch(project_path)
+        except OSError:
+            # watch 数量达到上限，事件可能遗漏
+            return {('overflow', None)}
+
+        events = set()
+        for root, _dirs, files in os.walk(path):
+            for name in files:
+                file_path = os.path.join(root, name)
+                kind = self.classify(file_path)
+                if kind:
+                    events.add((kind, file_path))
+        return events
+
+    # ---------- 轮询 ----------
+
+    def _poll_snapshot(self) -> dict:
+        """记录所有被监视文件的 (mtime_ns, size)"""
+        state = {}
+
+        def record(dir_path, suffix):
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        if suffix and not entry.name.endswith(suffix):
+                            continue
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        state[entry.path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                pass
+
+        history_file = os.path.join(self.claude_dir, 'history.jsonl')
+        try:
+            st = os.stat(history_file)
+            state[history_file] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+        if os.path.isdir(self.projects_dir):
+            for project_path in StorageScanner._list_dirs(self.projects_dir):
+                record(project_path, '.jsonl')
+        record(self.debug_dir, '.txt')
+        record(self.snapshots_dir, None)
+        return state
+
+    def _poll_changes(self) -> set:
+        """与上次记录对比，返回新增、变化和删除的文件"""
+        state = self._poll_snapshot()
+        old = self.poll_state or {}
+        self.poll_state = state
+        events = set()
+        for path, stat in state.items():
+            if old.get(path) != stat:
+                events.add((self.classify(path), path))
+        for path in old.keys() - state.keys():
+            events.add((self.classify(path), path))
+        events.discard((None, None))
+        return {event for event in events if event[0]}
+
+
+class SnapshotRetentionPolicy:
+    """shell-snapshot 保留策略
+
+    - 活跃会话的快照（时间戳与活跃会话的 history 记录相差 30 秒内）始终保留
+    - 其余快照满足任一规则即保留：最新 keep_count 个、每种 shell 最新
+      keep_per_shell 个、max_age_days 天以内
+    - 设置 max_total_size 时，保留的快照总大小超出预算则从最旧的非活跃快照删起
+    为 None 的规则不生效。
+    """
+
+    MATCH_WINDOW_MS = 30000
+
+    def __init__(self,
+                 keep_count: int = 5,
+                 max_age_days: float = None,
+                 keep_per_shell: int = None,
+                 max_total_size: int = None):
+        self.keep_count = keep_count
+        self.max_age_days = max_age_days
+        self.keep_per_shell = keep_per_shell
+        self.max_total_size = max_total_size
+
+    def is_active(self, timestamp: int, active_timestamps: list) -> bool:
+        """在有序的活跃会话时间戳中二分查找 ±30 秒内的记录"""
+        window = self.MATCH_WINDOW_MS
+        i = bisect_right(active_timestamps, timestamp - window)
+        return (i < len(active_timestamps)
+                and active_timestamps[i] < timestamp + window)
+
+    def apply(self, snapshots: list, active_timestamps: list,
+              now_ms: int) -> tuple:
+        """计算保留和删除的快照
+
+        snapshots 为 [{'name', 'shell', 'timestamp', 'size', ...}, ...]，
+        active_timestamps 须已排序。返回 (kept, deleted)，均按时间从新到旧，
+        每项附带 'reason' 说明保留或删除的原因。
+        """
+        snapshots = sorted(snapshots, key=lambda x: x['timestamp'],
+                           reverse=True)
+        cutoff = None
+        if self.max_age_days is not None:
+            cutoff = now_ms - self.max_age_days * 86400 * 1000
+
+        kept = []
+        deleted = []
+        per_shell = {}  # {shell: 已保留的非活跃快照数}
+        other_rank = 0  # 非活跃快照按新旧排序的名次
+        for snap in snapshots:
+            if self.is_active(snap['timestamp'], active_timestamps):
+                reason = 'active'
+            else:
+                reason = None
+                shell_count = per_shell.get(snap['shell'], 0)
+                if self.keep_count is not None and other_rank < self.keep_count:
+                    reason = 'keep_count'
+                elif (self.keep_per_shell is not None
+                      and shell_count < self.keep_per_shell):
+                    reason = 'keep_per_shell'
+                elif cutoff is not None and snap['timestamp'] >= cutoff:
+                    reason = 'max_age'
+                other_rank += 1
+                if reason:
+                    per_shell[snap['shell']] = shell_count + 1
+
+            if reason:
+                kept.append(dict(snap, reason=reason))
+            else:
+                deleted.append(dict(snap, reason='expired'))
+
+        # 大小预算：从最旧的非活跃快照开始移出保留列表
+        if self.max_total_size is not None:
+            total = sum(snap['size'] for snap in kept)
+            for snap in reversed(kept):
+                if total <= self.max_total_size:
+                    break
+                if snap['reason'] == 'active':
+                    continue
+                snap['reason'] = 'over_budget'
+                total -= snap['size']
+            deleted.extend(s for s in kept if s['reason'] == 'over_budget')
+            kept = [s for s in kept if s['reason'] != 'over_budget']
+            deleted.sort(key=lambda x: x['timestamp'], reverse=True)
+
+        return kept, deleted
+
+
+class EvictionPolicy:
+    """会话存储预算策略
+
+    会话相关数据（history、对话、日志、环境、文件历史、todos、归档）的总大小
+    超出 max_total_size 时，用优先队列从可淘汰的会话中依次取出，直到回到预算以内：
+    - order='largest'：先淘汰占用最大的会话，淘汰的会话数最少
+    - order='lru'：先淘汰最久没有使用的会话
+    运行中的会话始终保留；protect_titled 时保留 /rename 命名过的会话；
+    min_age_days 不为 None 时保留这些天内用过的会话。
+    action='archive' 时淘汰即归档：已归档的会话不再参与，释放量按 ARCHIVE_RATIO 估算。
+    """
+
+    ORDERS = ('largest', 'lru')
+    ACTIONS = ('delete', 'archive')
+    ARCHIVE_RATIO = 0.2  # 估算的归档大小 / 原大小（对话文本的 xz 压缩率通常更高）
+    # 保留/淘汰原因的显示名称
+    REASON_LABELS = {
+        'active': '运行中',
+        'titled': '已命名',
+        'recent': '近期使用',
+        'archived': '已归档',
+        'empty': '无文件',
+        'within_budget': '预算以内',
+        'over_budget': '超出预算',
+        'changed': '文件已变化'
+    }
+
+    def __init__(self,
+                 max_total_size: int,
+                 min_age_days: float = None,
+                 protect_titled: bool = True,
+                 order: str = 'largest',
+                 action: str = 'delete'):
+        if order not in self.ORDERS:
+            raise ValueError(f"未知的淘汰顺序: {order}")
+        if action not in self.ACTIONS:
+            raise ValueError(f"未知的淘汰操作: {action}")
+        self.max_total_size = max_total_size
+        self.min_age_days = min_age_days
+        self.protect_titled = protect_titled
+        self.order = order
+        self.action = action
+
+    def estimate_freed(self, size: int) -> int:
+        """淘汰一个会话预计释放的空间"""
+        if self.action == 'archive':
+            return size - int(size * self.ARCHIVE_RATIO)
+        return size
+
+    def get_protect_reason(self, session: dict, cutoff: float) -> str:
+        """会话不可淘汰的原因，可以淘汰时返回 None"""
+        if session['active']:
+            return 'active'
+        if self.protect_titled and session['titled']:
+            return 'titled'
+        if cutoff is not None and session['last_used'] >= cutoff:
+            return 'recent'
+        if self.action == 'archive' and session['archived']:
+            return 'archived'
+        if session['size'] <= 0:
+            return 'empty'
+        return None
+
+    def apply(self, sessions: list, total_size: int, now: float) -> tuple:
+        """计算保留和淘汰的会话
+
+        sessions 为 [{'session_id', 'size', 'last_used', 'active', 'titled',
+        'archived', ...}, ...]，last_used 和 now 为秒级时间戳。
+        返回 (kept, evicted)，每项附带 'reason'；evicted 按淘汰顺序排列，
+        并附带预计释放的 'freed'。
+        """
+        cutoff = None
+        if self.min_age_days is not None:
+            cutoff = now - self.min_age_days * 86400
+
+        kept = []
+        heap = []  # (优先级, 序号, 会话)，优先级越小越先淘汰
+        for index, session in enumerate(sessions):
+            reason = self.get_protect_reason(session, cutoff)
+            if reason:
+                kept.append(dict(session, reason=reason))
+                continue
+            if self.order == 'largest':
+                priority = -session['size']
+            else:
+                priority = session['last_used']
+            heap.append((priority, index, session))
+
+        # 只弹出回到预算所需的会话：O(n + k log n)
+        heapq.heapify(heap)
+        evicted = []
+        while heap and total_size > self.max_total_size:
+            _, _, session = heapq.heappop(heap)
+            freed = self.estimate_freed(session['size'])
+            total_size -= freed
+            evicted.append(dict(session, reason='over_budget', freed=freed))
+
+        kept.extend(
+            dict(session, reason='within_budget') for _, _, session in heap)
+        return kept, evicted
+
+
+class ParallelRemover:
+    """并行删除执行器
+
+    用有界线程池同时删除多个文件/目录，让大目录（如 file-history）
+    的 I/O 等待相互重叠。
+    """
+
+    def __init__(self, max_workers: int = 8, progress_callback=None):
+        self.max_workers = max(1, max_workers)
+        # progress_callback(done, total, outcome)，在调用 run() 的线程中触发
+        self.progress_callback = progress_callback
+
+    def run(self, tasks: list) -> list:
+        """执行删除任务，返回与 tasks 顺序一致的结果列表
+
+        每个任务是包含 'path' 的字典（可附带 kind、session_id 等信息），
+        结果在任务字典的基础上附加 'ok'、'size' 和可能的 'error'。
+        """
+        outcomes = [None] * len(tasks)
+        if not tasks:
+            return outcomes
+
+        total = len(tasks)
+        done = 0
+        workers = min(self.max_workers, total)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._remove, task): i
+                for i, task in enumerate(tasks)
+            }
+            for future in as_completed(futures):
+                outcome = future.result()
+                outcomes[futures[future]] = outcome
+                done += 1
+                if self.progress_callback:
+                    self.progress_callback(done, total, outcome)
+
+        return outcomes
+
+    @staticmethod
+    def _remove(task: dict) -> dict:
+        """删除单个文件或目录（文件会先记录大小）"""
+        outcome = dict(task)
+        outcome['ok'] = False
+        outcome['size'] = 0
+        path = task['path']
+        try:
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                outcome['size'] = path.stat().st_size
+                path.unlink()
+            outcome['ok'] = True
+        except OSError as e:
+            outcome['error'] = str(e)
+        return outcome
+
+
+class SessionData:
+    """会话数据模型
+
+    claude_dir 默认为 ~/.claude，cache_dir 默认为 get_root_cache_dir(claude_dir)；
+    测试和基准测试可以指向其他目录，不影响真实数据和缓存。
+    同时管理多个数据目录时使用 MultiRootSessionData。
+    """
+
+    multi_root = False
+
+    def __init__(self, claude_dir: Path = None, cache_dir: Path = None):
+        self.claude_dir = (Path(claude_dir) if claude_dir is not None else
+                           Path.home() / '.claude')
+        self.history_file = self.claude_dir / 'history.jsonl'
+        self.projects_dir = self.claude_dir / 'projects'
+        self.debug_dir = self.claude_dir / 'debug'
+        self.session_env_dir = self.claude_dir / 'session-env'
+        self.file_history_dir = self.claude_dir / 'file-history'
+        self.todos_dir = self.claude_dir / 'todos'
+        self.shell_snapshots_dir = self.claude_dir / 'shell-snapshots'
+        self.archive_dir = self.claude_dir / ARCHIVE_DIR_NAME
+        self.max_delete_workers = 8  # 并行删除的线程数上限
+        # 并行压缩的线程数上限（lzma 压缩时释放 GIL）
+        self.max_archive_workers = min(4, os.cpu_count() or 1)
+        self.inventory = None  # 最近一次扫描得到的 StorageInventory
+        self.sessions = []
+        self._history_state = None  # 增量解析 history.jsonl 的状态
+        # 数据代数：history 变化、删除、清理时递增，用于缓存失效
+        self.generation = 0
+        self._unique_cache = None  # (generation, unique_sessions)
+        self.sessions_by_id = {}  # {session_id: 去重后的会话记录}
+        self.file_info = {}  # {session_id: {'has_file', 'size'}}
+        self.active_session_ids = set()
+        self.last_activity = {}  # {session_id: 最后活动时间（秒）}，用于活跃状态过期
+        self.active_minutes = 10
+        self._latest = {}  # get_unique_sessions 的去重中间结果，供增量合并
+        self.label = get_root_label(self.claude_dir)
+        self.cache_dir = (Path(cache_dir) if cache_dir is not None else
+                          get_root_cache_dir(self.claude_dir))
+        self.metadata_index = SessionMetadataIndex(self.cache_dir /
+                                                   'metadata_index.json')
+        self.fulltext_index = FullTextIndex(self.cache_dir /
+                                            'fulltext.sqlite3')
+
+    def load_sessions(self):
+        """加载所有会话记录
+
+        history.jsonl 只会追加，因此记住上次解析到的字节偏移和 inode，
+        只解析新追加的部分；文件被缩短或替换（如删除会话后重写）时才完整重新解析。
+        """
+        try:
+            st = self.history_file.stat()
+        except OSError:
+            if self.sessions:
+                self.invalidate_cache()
+            self.sessions = []
+            self._history_state = None
+            return self.sessions
+
+        old_count = len(self.sessions)
+        resumed = False
+
+        with open(self.history_file, 'rb') as f:
+            if can_resume_append(f, st, self._history_state):
+                offset = self._history_state['offset']
+                tail = self._history_state['tail']
+                resumed = True
+            else:
+                self.sessions = []
+                offset = 0
+                tail = b''
+
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    # 末尾没有换行的行可能还在写入，能完整解析才接收
+                    session = self._parse_history_line(raw)
+                    if session is None:
+                        break
+                else:
+                    session = self._parse_history_line(raw)
+                if session is not None:
+                    self.sessions.append(session)
+                offset += len(raw)
+                tail = raw[-RESUME_TAIL_BYTES:]
+
+        self._history_state = {
+            'dev': st.st_dev,
+            'ino': st.st_ino,
+            'offset': offset,
+            'tail': tail
+        }
+        if not resumed:
+            self.invalidate_cache()
+        elif len(self.sessions) != old_count:
+            self._merge_appended_sessions(old_count)
+        return self.sessions
+
+    def _merge_appended_sessions(self, start: int):
+        """history 追加了记录：只更新涉及的会话，不重新统计全部对话文件"""
+        cached = (self._unique_cache is not None
+                  and self._unique_cache[0] == self.generation)
+        self.invalidate_cache()
+        if not cached:
+            return
+
+        latest = self._latest
+        changed = set()
+        for index in range(start, len(self.sessions)):
+            session = self.sessions[index]
+            sid = session.get('sessionId')
+            if not sid:
+                continue
+            timestamp = session.get('timestamp', 0)
+            current = latest.get(sid)
+            if current is None or timestamp > current[0]:
+                latest[sid] = (timestamp, index, session)
+                changed.add(sid)
+
+        file_info = dict(self.file_info)
+        for sid in changed:
+            if sid not in file_info:
+                project = latest[sid][2].get('project', 'N/A')
+                size = self.get_session_data_size(sid, project)
+                file_info[sid] = {'has_file': size > 0, 'size': size}
+        self._build_unique(latest, file_info)
+
+    @staticmethod
+    def _parse_history_line(raw: bytes) -> dict:
+        """解析 history.jsonl 中的一行，无效行返回 None"""
+        line = raw.strip()
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+
+    def get_active_sessions(self, minutes: int = 10,
+                            mode: str = 'tail') -> set:
+        """获取最近 N 分钟内活跃的 Session ID
+
+        mode='tail'：先按文件 mtime 过滤，只对最近修改过的对话文件
+        从末尾读取最后几条记录；mode='full'：逐行解析全部对话文件。
+        """
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(minutes=minutes)
+        cutoff_ts = cutoff.timestamp()
+
+        active = set()
+        activity = {}
+
+        # 方法1: 检查 debug 文件修改时间
+        if self.debug_dir.exists():
+            for debug_file in self.debug_dir.glob("*.txt"):
+                try:
+                    mtime = debug_file.stat().st_mtime
+                    if mtime > cutoff_ts:
+                        sid = debug_file.stem
+                        active.add(sid)
+                        activity[sid] = max(mtime, activity.get(sid, 0))
+                except:
+                    pass
+
+        # 方法2: 检查对话文件最后消息时间
+        if self.projects_dir.exists():
+            for project_dir in self.projects_dir.iterdir():
+                if not project_dir.is_dir():
+                    continue
+                for conv_file in project_dir.glob("*.jsonl"):
+                    try:
+                        if mode == 'tail':
+                            last_ts = self._get_last_timestamp_tail(
+                                conv_file, cutoff_ts)
+                        else:
+                            last_ts = self._get_last_timestamp_full(conv_file)
+
+                        if last_ts > cutoff_ts:
+                            sid = conv_file.stem
+                            active.add(sid)
+                            activity[sid] = max(last_ts,
+                                                activity.get(sid, 0))
+                    except:
+                        pass
+
+        self.active_session_ids = active
+        self.last_activity = activity
+        self.active_minutes = minutes
+        return active
+
+    def refresh_active(self) -> set:
+        """按记录的最后活动时间重新计算活跃会话（不读文件），返回状态变化的会话"""
+        cutoff_ts = time.time() - self.active_minutes * 60
+        active = {
+            sid
+            for sid, ts in self.last_activity.items() if ts > cutoff_ts
+        }
+        changed = active ^ self.active_session_ids
+        self.active_session_ids = active
+        return changed
+
+    def apply_storage_events(self, events: set) -> dict:
+        """把 StorageWatcher 上报的文件事件增量应用到内存中的数据
+
+        返回 {'reload': 需要完整重新加载, 'sessions': 会话列表变化,
+        'meta': {sid: 对话元数据或 None}, 'active_changed': 活跃状态变化的会话,
+        'snapshots': 快照目录有变化}
+        """
+        changes = {
+            'reload': False,
+            'sessions': False,
+            'meta': {},
+            'active_changed': set(),
+            'snapshots': False
+        }
+        if any(kind == 'overflow' for kind, _ in events):
+            changes['reload'] = True
+            return changes
+
+        for kind, path in events:
+            if kind == 'history':
+                generation = self.generation
+                self.load_sessions()
+                changes['sessions'] = self.generation != generation
+            elif kind == 'snapshot':
+                changes['snapshots'] = True
+
+        for kind, path in events:
+            if kind == 'conversation':
+                self._apply_conversation_event(Path(path), changes)
+            elif kind == 'debug':
+                self._apply_debug_event(Path(path))
+
+        changes['active_changed'] = self.refresh_active()
+        return changes
+
+    def _apply_conversation_event(self, conv_file: Path, changes: dict):
+        """对话文件新增、追加或删除：更新大小、元数据和最后活动时间"""
+        sid = conv_file.stem
+        inv = self.inventory  # 只读取一次，其他线程可能同时把清单置空
+        try:
+            size = conv_file.stat().st_size
+        except OSError:
+            # 对话文件被删除（或归档后移除原文件）
+            self.metadata_index.discard(conv_file)
+            meta = self.get_archive_meta(sid)
+            if sid in self.file_info:
+                size = meta['size'] if meta else 0
+                self.file_info[sid] = {'has_file': size > 0, 'size': size}
+            if inv is not None:
+                inv.remove('conversation_files', sid, conv_file)
+            changes['meta'][sid] = meta
+            return
+
+        meta = self.metadata_index.get(conv_file)
+        if sid in self.file_info:
+            self.file_info[sid] = {'has_file': size > 0, 'size': size}
+        if inv is not None:
+            inv.update('conversation_files', sid, conv_file, size)
+        if meta and meta.get('last_timestamp'):
+            self.last_activity[sid] = max(meta['last_timestamp'],
+                                          self.last_activity.get(sid, 0))
+        changes['meta'][sid] = meta
+
+    def _apply_debug_event(self, debug_file: Path):
+        """debug 日志新增、追加或删除：更新清单和最后活动时间"""
+        sid = debug_file.stem
+        inv = self.inventory
+        try:
+            st = debug_file.stat()
+        except OSError:
+            if inv is not None:
+                inv.remove('debug_files', sid, debug_file)
+            return
+        if inv is not None:
+            inv.update('debug_files', sid, debug_file, st.st_size)
+        self.last_activity[sid] = max(st.st_mtime,
+                                      self.last_activity.get(sid, 0))
+
+    def _get_last_timestamp_tail(self, conv_file: Path,
+                                 cutoff_ts: float) -> float:
+        """先用 mtime 过滤，再从文件末尾读取最后几条记录的时间戳"""
+        # 文件最后一次写入早于 cutoff，其中的消息时间不可能晚于 cutoff
+        if conv_file.stat().st_mtime <= cutoff_ts:
+            return 0
+
+        last_ts = 0
+        for msg in read_tail_records(conv_file, max_records=5):
+            if not isinstance(msg, dict):
+                continue
+            ts = parse_iso_timestamp(msg.get('timestamp', ''))
+            if ts > last_ts:
+                last_ts = ts
+        return last_ts
+
+    def _get_last_timestamp_full(self, conv_file: Path) -> float:
+        """逐行解析整个对话文件，取最大的时间戳"""
+        last_ts = 0
+        with open(conv_file, 'r') as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        msg = json.loads(line)
+                        ts_str = msg.get('timestamp', '')
+                        if ts_str:
+                            dt = datetime.fromisoformat(
+                                ts_str.replace('Z', '+00:00'))
+                            ts = dt.timestamp()
+                            if ts > last_ts:
+                                last_ts = ts
+                    except:
+                        pass
+        return last_ts
+
+    def get_all_session_ids(self) -> set:
+        """从 history.jsonl 获取所有有效的 sessionId"""
+        session_ids = set()
+        for session in self.sessions:
+            sid = session.get('sessionId')
+            if sid:
+                session_ids.add(sid)
+        return session_ids
+
+    def get_conversation_file(self, session_id: str,
+                              project_path: str) -> Path:
+        """获取对话文件路径"""
+        # Claude 的目录命名规则：将 / 替换为 -
+        encoded_project = project_path.replace('/', '-')
+        project_dir = self.projects_dir / encoded_project
+        return project_dir / f"{session_id}.jsonl"
+
+    @property
+    def claude_dirs(self) -> list:
+        """管理的数据目录列表"""
+        return [self.claude_dir]
+
+    def get_debug_file(self, session_id: str) -> Path:
+        """获取 debug 日志路径"""
+        return self.debug_dir / f"{session_id}.txt"
+
+    def get_conversation_file_size(self, session_id: str,
+                                   project_path: str) -> int:
+        """获取对话文件大小"""
+        conv_file = self.get_conversation_file(session_id, project_path)
+        if conv_file.exists():
+            return conv_file.stat().st_size
+        return 0
+
+    def get_session_data_size(self, session_id: str,
+                              project_path: str) -> int:
+        """对话数据大小：对话文件不存在时取归档文件大小（用于排序和列表）"""
+        size = self.get_conversation_file_size(session_id, project_path)
+        if size == 0:
+            try:
+                size = self.get_archive_file(session_id).stat().st_size
+            except OSError:
+                pass
+        return size
+
+    def load_conversation(self, session_id: str, project_path: str) -> list:
+        """加载对话内容"""
+        return list(self.iter_conversation(session_id, project_path))
+
+    def iter_conversation(self, session_id: str, project_path: str):
+        """逐条解析对话记录（生成器，调用方可以随时停止读取）
+
+        已归档的会话从归档中流式解压读取。
+        """
+        conv_file = self.get_conversation_file(session_id, project_path)
+        if not conv_file.exists():
+            yield from self._parse_lines(
+                self._iter_archived_lines(session_id))
+            return
+
+        with open(conv_file, 'r', encoding='utf-8') as f:
+            yield from self._parse_lines(f)
+
+    @staticmethod
+    def _parse_lines(lines):
+        """逐行解析 JSON，跳过空行和无法解析的行"""
+        for line in lines:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def get_message_count(self, session_id: str, project_path: str) -> int:
+        """对话记录数：优先取元数据索引的缓存，否则按块统计换行数（不解析 JSON）"""
+        conv_file = self.get_conversation_file(session_id, project_path)
+        entry = self.metadata_index.get_cached(conv_file)
+        if entry is not None:
+            return entry.get('message_count', 0)
+        if not conv_file.exists():
+            meta = self.get_archive_meta(session_id)
+            return meta.get('message_count', 0) if meta else 0
+        return count_lines(conv_file)
+
+    def open_conversation(self, session_id: str,
+                          project_path: str) -> ConversationPager:
+        """打开对话文件的分页读取器（索引需调用 index_more 逐步建立）
+
+        已归档的会话会先解压（见 get_viewable_conversation_file），界面中应在后台线程调用。
+        """
+        return ConversationPager(
+            self.get_viewable_conversation_file(session_id, project_path))
+
+    def get_viewable_conversation_file(self, session_id: str,
+                                       project_path: str) -> Path:
+        """可供分页读取的对话文件
+
+        已归档的会话把对话流式解压到缓存目录，返回解压出的副本。
+        """
+        conv_file = self.get_conversation_file(session_id, project_path)
+        if not conv_file.exists() and self.is_archived(session_id):
+            view_file = self._extract_archived_conversation(session_id)
+            if view_file is not None:
+                conv_file = view_file
+        return conv_file
+
+    def open_debug_log(self, session_id: str) -> DebugLogIndex:
+        """获取调试日志的索引对象（需调用 open 后使用）"""
+        return DebugLogIndex(self.debug_dir / f"{session_id}.txt")
+
+    def get_session_meta(self, session_id: str, project_path: str) -> dict:
+        """获取会话元数据（标题、首条用户消息、消息数、最后消息时间、大小）
+
+        已归档的会话取归档清单中保存的元数据，大小为归档文件大小，并带有 archived=True。
+        """
+        conv_file = self.get_conversation_file(session_id, project_path)
+        meta = self.metadata_index.get(conv_file)
+        if meta is None:
+            meta = self.get_archive_meta(session_id)
+        return meta
+
+    def save_metadata_index(self):
+        """持久化元数据索引"""
+        self.metadata_index.save()
+
+    def update_fulltext_index(self, progress_callback=None) -> dict:
+        """增量更新全文索引（只处理 mtime/size 变化的对话文件）"""
+        return self.fulltext_index.update(self.projects_dir, progress_callback)
+
+    def search_fulltext(self, query: str, limit: int = 50) -> list:
+        """在所有对话中全文搜索，返回按相关度排序的会话命中"""
+        return self.fulltext_index.search(query, limit)
+
+    def get_session_title(self, session_id: str, project_path: str) -> str:
+        """获取会话名称（优先 customTitle，否则第一条用户消息）"""
+        meta = self.get_session_meta(session_id, project_path)
+        if not meta:
+            return None
+        return meta.get('title') or meta.get('first_user_message')
+
+    def format_size(self, size: int) -> str:
+        """格式化文件大小"""
+        if size < 1024:
+            return f"{size} B"
+        elif size < 1024 * 1024:
+            return f"{size / 1024:.1f} KB"
+        else:
+            return f"{size / (1024 * 1024):.1f} MB"
+
+    def format_timestamp(self, ts: int) -> str:
+        """格式化时间戳"""
+        return datetime.fromtimestamp(ts / 1000).strftime('%Y-%m-%d %H:%M:%S')
+
+    def delete_session(self, session_id: str, project_path: str,
+                       progress_callback=None) -> dict:
+        """删除会话的所有相关文件"""
+        batch_result = self.delete_sessions([(session_id, project_path)],
+                                            progress_callback)
+        return batch_result['sessions'][session_id]
+
+    def delete_sessions(self, batch: list, progress_callback=None) -> dict:
+        """批量删除会话
+
+        batch 为 [(session_id, project_path), ...]。
+        所有会话的关联文件交给同一个线程池并行删除，
+        history.jsonl 只在最后流式重写一次。
+        """
+        batch_result = {
+            'sessions': {},
+            'deleted': 0,
+            'failed': 0,
+            'history_entries': 0,
+            'success': False
+        }
+
+        # 1. 收集每个会话的关联文件
+        tasks = []
+        for session_id, project_path in batch:
+            batch_result['sessions'][session_id] = {
+                'conversation_file': False,
+                'debug_file': False,
+                'session_env': False,
+                'file_history': False,
+                'todos': False,
+                'archive': False,
+                'history_entries': 0,
+                'success': False
+            }
+            try:
+                tasks.extend(
+                    self._collect_session_artifacts(session_id, project_path))
+            except Exception as e:
+                batch_result['sessions'][session_id]['error'] = str(e)
+
+        # 2. 并行删除，结果合并回每个会话的结果字典
+        remover = ParallelRemover(self.max_delete_workers, progress_callback)
+        for outcome in remover.run(tasks):
+            result = batch_result['sessions'][outcome['session_id']]
+            kind = outcome['kind']
+            if kind == 'conversation_file':
+                self.metadata_index.discard(outcome['path'])
+            elif kind == 'archive':
+                self._discard_archive_view(outcome['session_id'])
+            if not outcome['ok']:
+                result.setdefault('error', outcome['error'])
+            elif kind == 'todos':
+                result['todos'] = (result['todos'] or 0) + 1
+            else:
+                result[kind] = True
+
+        # 3. 一次性从 history.jsonl 中删除所有条目
+        removable_ids = {
+            sid
+            for sid, result in batch_result['sessions'].items()
+            if 'error' not in result
+        }
+        try:
+            removed = self._remove_history_entries(removable_ids)
+            for session_id in removable_ids:
+                result = batch_result['sessions'][session_id]
+                result['history_entries'] = removed.get(session_id, 0)
+                result['success'] = True
+            batch_result['history_entries'] = sum(removed.values())
+            batch_result['success'] = True
+        except Exception as e:
+            batch_result['error'] = str(e)
+            for session_id in removable_ids:
+                batch_result['sessions'][session_id]['error'] = str(e)
+
+        for result in batch_result['sessions'].values():
+            if result['success']:
+                batch_result['deleted'] += 1
+            else:
+                batch_result['failed'] += 1
+
+        # 文件已变化，清单需要重新扫描
+        self.inventory = None
+        self.invalidate_cache()
+        return batch_result
+
+    def _collect_session_artifacts(self, session_id: str,
+                                   project_path: str) -> list:
+        """收集单个会话的对话、debug、session-env、file-history、todos 和归档文件"""
+        tasks = []
+
+        def add(kind, path):
+            tasks.append({'kind': kind, 'session_id': session_id, 'path': path})
+
+        # 1. 对话文件
+        conv_file = self.get_conversation_file(session_id, project_path)
+        if conv_file.exists():
+            add('conversation_file', conv_file)
+
+        # 2. debug 文件
+        debug_file = self.debug_dir / f"{session_id}.txt"
+        if debug_file.exists():
+            add('debug_file', debug_file)
+
+        # 3. session-env 目录
+        session_env = self.session_env_dir / session_id
+        if session_env.is_dir():
+            add('session_env', session_env)
+
+        # 4. file-history 目录
+        file_hist = self.file_history_dir / session_id
+        if file_hist.is_dir():
+            add('file_history', file_hist)
+
+        # 5. todos 文件
+        if self.todos_dir.exists():
+            for f in self.todos_dir.glob(f"{session_id}-*.json"):
+                add('todos', f)
+
+        # 6. 归档文件及其清单
+        for path in (self.get_archive_file(session_id),
+                     self.get_archive_manifest_file(session_id)):
+            if path.exists():
+                add('archive', path)
+
+        return tasks
+
+    def _remove_history_entries(self, session_ids: set) -> dict:
+        """流式重写 history.jsonl，删除属于 session_ids 的条目
+
+        按 sessionId 字段精确匹配，写入同目录下的临时文件后原子重命名。
+        返回 {session_id: 删除条数}。
+        """
+        removed = {}
+        if not session_ids or not self.history_file.exists():
+            return removed
+
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.history_file.parent),
+                                        prefix='.history.',
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out, open(self.history_file,
+                                                  'rb') as src:
+                for raw in src:
+                    session = self._parse_history_line(raw)
+                    sid = session.get('sessionId') if isinstance(
+                        session, dict) else None
+                    if sid in session_ids:
+                        removed[sid] = removed.get(sid, 0) + 1
+                        continue
+                    out.write(raw)
+            shutil.copymode(self.history_file, tmp_path)
+            os.replace(tmp_path, self.history_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        return removed
+
+    def get_archive_file(self, session_id: str) -> Path:
+        """获取会话归档文件路径"""
+        return self.archive_dir / f"{session_id}{ARCHIVE_SUFFIX}"
+
+    def get_archive_manifest_file(self, session_id: str) -> Path:
+        """获取会话归档清单路径"""
+        return self.archive_dir / f"{session_id}.json"
+
+    def is_archived(self, session_id: str) -> bool:
+        """会话是否已归档"""
+        return self.get_archive_file(session_id).exists()
+
+    def get_archive_manifest(self, session_id: str) -> dict:
+        """读取归档清单，未归档或清单损坏时返回 None"""
+        try:
+            with open(self.get_archive_manifest_file(session_id),
+                      'r',
+                      encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if isinstance(manifest, dict) else None
+
+    def get_archive_meta(self, session_id: str) -> dict:
+        """已归档会话的元数据（与 get_session_meta 格式相同），未归档返回 None"""
+        manifest = self.get_archive_manifest(session_id)
+        if manifest is None:
+            return None
+        try:
+            size = self.get_archive_file(session_id).stat().st_size
+        except OSError:
+            return None
+        meta = dict(manifest.get('meta') or {})
+        meta['size'] = size
+        meta['archived'] = True
+        return meta
+
+    def archive_sessions(self, batch: list, progress_callback=None) -> dict:
+        """把会话的所有关联文件压缩成归档，然后删除原文件
+
+        batch 为 [(session_id, project_path), ...]。每个会话打包为
+        <数据目录>/session-manager-archive/<sessionId>.tar.xz（lzma 流式压缩，
+        对话文件排在最前面，查看时只需解压开头），另存一份 JSON 清单保存
+        成员列表和元数据。history.jsonl 中的条目保留，会话仍显示在列表中。
+        各会话在线程池中并行压缩。
+        """
+        batch_result = {
+            'sessions': {},
+            'archived': 0,
+            'failed': 0,
+            'original_size': 0,
+            'archive_size': 0,
+            'success': True
+        }
+        if not batch:
+            return batch_result
+
+        total = len(batch)
+        workers = min(self.max_archive_workers, total)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._archive_session, session_id,
+                                project_path): session_id
+                for session_id, project_path in batch
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                session_id = futures[future]
+                result = future.result()
+                batch_result['sessions'][session_id] = result
+                if result['success']:
+                    batch_result['archived'] += 1
+                    batch_result['original_size'] += result['original_size']
+                    batch_result['archive_size'] += result['archive_size']
+                else:
+                    batch_result['failed'] += 1
+                    batch_result['success'] = False
+                if progress_callback:
+                    progress_callback(done, total, result)
+
+        # 文件已变化，清单需要重新扫描
+        self.inventory = None
+        self.invalidate_cache()
+        return batch_result
+
+    def _archive_session(self, session_id: str, project_path: str) -> dict:
+        """归档单个会话：写临时文件并校验，清单和归档就位后才删除原文件"""
+        result = {
+            'files': 0,
+            'original_size': 0,
+            'archive_size': 0,
+            'success': False
+        }
+        if self.is_archived(session_id):
+            result['error'] = "会话已归档"
+            return result
+
+        tasks = [
+            task
+            for task in self._collect_session_artifacts(
+                session_id, project_path) if task['kind'] != 'archive'
+        ]
+        if not tasks:
+            result['error'] = "没有可归档的文件"
+            return result
+
+        conv_file = self.get_conversation_file(session_id, project_path)
+        meta = self.metadata_index.get(conv_file) or {}
+        members = []
+
+        def record(info):
+            members.append(info.name)
+            if info.isfile():
+                result['files'] += 1
+                result['original_size'] += info.size
+            return info
+
+        tmp_path = None
+        try:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.archive_dir),
+                                            prefix=f".{session_id}.",
+                                            suffix='.tmp')
+            with os.fdopen(fd, 'wb') as out:
+                with tarfile.open(fileobj=out, mode='w:xz') as tar:
+                    # 对话文件是第一个任务，位于归档开头
+                    for task in tasks:
+                        arcname = task['path'].relative_to(
+                            self.claude_dir).as_posix()
+                        tar.add(str(task['path']),
+                                arcname=arcname,
+                                filter=record)
+
+            # 删除原文件前完整读一遍，确认归档可以解压
+            with tarfile.open(tmp_path, 'r|xz') as tar:
+                count = sum(1 for _ in tar)
+            if count != len(members):
+                raise tarfile.TarError("归档校验失败")
+
+            # 清单与元数据索引一样只保存截断后的首条消息
+            first_message = meta.get('first_user_message')
+            if first_message:
+                first_message = first_message[:SessionMetadataIndex.
+                                              MAX_MESSAGE_CHARS]
+            manifest = {
+                'version': 1,
+                'session_id': session_id,
+                'project': project_path,
+                'archived_at': datetime.now(timezone.utc).isoformat(),
+                'original_size': result['original_size'],
+                'conversation': (conv_file.relative_to(
+                    self.claude_dir).as_posix()
+                                 if tasks[0]['kind'] == 'conversation_file'
+                                 else None),
+                'members': members,
+                'meta': {
+                    'title': meta.get('title'),
+                    'first_user_message': first_message,
+                    'message_count': meta.get('message_count', 0),
+                    'last_timestamp': meta.get('last_timestamp', 0)
+                }
+            }
+            manifest_file = self.get_archive_manifest_file(session_id)
+            tmp_manifest = manifest_file.with_suffix('.json.tmp')
+            with open(tmp_manifest, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(tmp_manifest, manifest_file)
+            os.replace(tmp_path, self.get_archive_file(session_id))
+            tmp_path = None
+        except (OSError, ValueError, tarfile.TarError, lzma.LZMAError) as e:
+            result['error'] = str(e)
+            return result
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+        result['archive_size'] = self.get_archive_file(
+            session_id).stat().st_size
+
+        # 归档已就位，删除原文件（history 条目保留）
+        remover = ParallelRemover(self.max_delete_workers)
+        for outcome in remover.run(tasks):
+            if outcome['kind'] == 'conversation_file':
+                self.metadata_index.discard(outcome['path'])
+            if not outcome['ok']:
+                result.setdefault('error', outcome['error'])
+        result['success'] = 'error' not in result
+        return result
+
+    def restore_sessions(self, session_ids: list,
+                         progress_callback=None) -> dict:
+        """把归档的会话解压回原位置，成功后删除归档
+
+        目标位置已有同名文件时拒绝恢复该会话（不覆盖任何文件）。
+        """
+        batch_result = {
+            'sessions': {},
+            'restored': 0,
+            'failed': 0,
+            'success': True
+        }
+        total = len(session_ids)
+        for done, session_id in enumerate(session_ids, 1):
+            result = self._restore_session(session_id)
+            batch_result['sessions'][session_id] = result
+            if result['success']:
+                batch_result['restored'] += 1
+            else:
+                batch_result['failed'] += 1
+                batch_result['success'] = False
+            if progress_callback:
+                progress_callback(done, total, result)
+
+        self.inventory = None
+        self.invalidate_cache()
+        return batch_result
+
+    def _restore_session(self, session_id: str) -> dict:
+        """恢复单个会话：先检查冲突，再一次流式解压所有成员"""
+        result = {'files': 0, 'success': False}
+        archive_file = self.get_archive_file(session_id)
+        manifest = self.get_archive_manifest(session_id)
+        if manifest is None or not archive_file.exists():
+            result['error'] = "会话未归档"
+            return result
+
+        conflicts = []
+        for name in manifest.get('members', []):
+            target = self._archive_member_target(name)
+            if target is None:
+                result['error'] = f"归档成员路径无效: {name}"
+                return result
+            if target.exists() and not target.is_dir():
+                conflicts.append(str(target))
+        if conflicts:
+            result['error'] = f"目标文件已存在: {conflicts[0]}"
+            result['conflicts'] = conflicts
+            return result
+
+        created = []
+        created_dirs = []
+        try:
+            with tarfile.open(archive_file, 'r|xz') as tar:
+                for member in tar:
+                    target = self._archive_member_target(member.name)
+                    if target is None:
+                        raise ValueError(f"归档成员路径无效: {member.name}")
+                    if member.isdir():
+                        self._make_dirs(target, created_dirs)
+                        continue
+                    if not member.isfile():
+                        continue
+                    self._make_dirs(target.parent, created_dirs)
+                    with tar.extractfile(member) as src, open(target,
+                                                              'xb') as dst:
+                        created.append(target)
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                    os.chmod(target, member.mode & 0o777)
+                    # 保留原修改时间，恢复的旧会话不会被当成活跃会话
+                    os.utime(target, (member.mtime, member.mtime))
+                    result['files'] += 1
+        except (OSError, ValueError, tarfile.TarError, lzma.LZMAError) as e:
+            # 撤销已解压的文件和新建的目录（从最深的开始），归档保持不变
+            for path in created:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            for path in reversed(created_dirs):
+                try:
+                    path.rmdir()
+                except OSError:
+                    pass
+            result['error'] = str(e)
+            return result
+
+        for path in (archive_file, self.get_archive_manifest_file(session_id)):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        self._discard_archive_view(session_id)
+        result['success'] = True
+        return result
+
+    @staticmethod
+    def _make_dirs(path: Path, created_dirs: list):
+        """逐级创建目录，新建的目录按创建顺序记入 created_dirs"""
+        missing = []
+        while not path.exists():
+            missing.append(path)
+            path = path.parent
+        for directory in reversed(missing):
+            try:
+                directory.mkdir()
+            except FileExistsError:
+                continue  # 其他进程同时创建，不归本次恢复所有
+            created_dirs.append(directory)
+
+    def _archive_member_target(self, name: str) -> Path:
+        """归档成员的恢复位置；绝对路径或含 .. 的成员返回 None"""
+        parts = Path(name).parts
+        if not parts or Path(name).is_absolute() or '..' in parts:
+            return None
+        return self.claude_dir.joinpath(*parts)
+
+    def _iter_archived_lines(self, session_id: str):
+        """从归档中流式解压对话文件，逐行产出文本（对话文件位于归档开头）"""
+        manifest = self.get_archive_manifest(session_id)
+        if not manifest or not manifest.get('conversation'):
+            return
+        try:
+            with tarfile.open(self.get_archive_file(session_id),
+                              'r|xz') as tar:
+                for member in tar:
+                    if member.name == manifest['conversation']:
+                        stream = tar.extractfile(member)
+                        if stream is not None:
+                            # 流式模式的文件对象不支持 seekable，不能套 TextIOWrapper
+                            for raw in stream:
+                                yield raw.decode('utf-8')
+                        return
+        except (OSError, UnicodeDecodeError, tarfile.TarError,
+                lzma.LZMAError):
+            return
+
+    def _get_archive_view_file(self, session_id: str) -> Path:
+        return self.cache_dir / 'archive-view' / f"{session_id}.jsonl"
+
+    def _extract_archived_conversation(self, session_id: str) -> Path:
+        """把归档中的对话解压到缓存目录供分页查看，失败返回 None
+
+        已有比归档新的解压副本时直接复用（并更新其修改时间，作为最近使用时间）；
+        新解压后按 ARCHIVE_VIEW_MAX_BYTES 删除最久未用的副本。
+        """
+        view_file = self._get_archive_view_file(session_id)
+        try:
+            archive_mtime = self.get_archive_file(session_id).stat().st_mtime
+            if view_file.stat().st_mtime >= archive_mtime:
+                os.utime(view_file)
+                return view_file
+        except OSError:
+            pass
+
+        tmp_path = None
+        try:
+            view_file.parent.mkdir(parents=True, exist_ok=True)
+            # 多个查看窗口可能同时解压同一会话，各自写入独立的临时文件
+            fd, tmp_path = tempfile.mkstemp(dir=str(view_file.parent),
+                                            prefix=f".{session_id}.",
+                                            suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as out:
+                for line in self._iter_archived_lines(session_id):
+                    out.write(line)
+            os.replace(tmp_path, view_file)
+            tmp_path = None
+        except OSError:
+            return None
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+        self._prune_archive_views(view_file)
+        return view_file
+
+    def _prune_archive_views(self, keep: Path,
+                             max_bytes: int = ARCHIVE_VIEW_MAX_BYTES):
+        """解压副本总大小超出 max_bytes 时，从最久未用的开始删除（keep 除外）"""
+        files = []
+        try:
+            with os.scandir(keep.parent) as it:
+                for entry in it:
+                    if not entry.name.endswith('.jsonl'):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            return
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            if path == str(keep):
+                continue
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                continue
+
+    def _discard_archive_view(self, session_id: str):
+        """删除缓存目录中解压出的对话副本"""
+        try:
+            self._get_archive_view_file(session_id).unlink()
+        except OSError:
+            pass
+
+    def scan_storage(self,
+                     on_item=None,
+                     on_progress=None,
+                     cancel_event: threading.Event = None) -> StorageInventory:
+        """重新扫描 ~/.claude，更新存储清单
+
+        回调和取消参数见 StorageScanner；被取消的扫描结果不完整，
+        只返回给调用方，不替换已缓存的清单。
+        """
+        inventory = StorageScanner(self.claude_dir,
+                                   on_item=on_item,
+                                   on_progress=on_progress,
+                                   cancel_event=cancel_event).scan()
+        if inventory.complete:
+            self.inventory = inventory
+        return inventory
+
+    def get_inventory(self) -> StorageInventory:
+        """获取存储清单（尚未扫描时先扫描）"""
+        if self.inventory is None:
+            self.scan_storage()
+        return self.inventory
+
+    def collect_orphaned_files(self, inventory: StorageInventory = None) -> dict:
+        """从存储清单中找出无索引指向的文件 {kind: [item, ...]}"""
+        if inventory is None:
+            inventory = self.get_inventory()
+        return inventory.get_orphans(self.get_all_session_ids())
+
+    def cleanup_orphaned_files(self,
+                               progress_callback=None,
+                               inventory: StorageInventory = None) -> dict:
+        """清理无索引指向的文件（由线程池并行删除）
+
+        传入 inventory 时按该清单删除（与预览保持一致），否则重新扫描。
+        """
+        result = {
+            'debug_files': 0,
+            'session_envs': 0,
+            'conversation_files': 0,
+            'file_histories': 0,
+            'todos': 0,
+            'total_size_freed': 0,
+            'details': []
+        }
+
+        try:
+            if inventory is None:
+                inventory = self.scan_storage()
+            orphans = self.collect_orphaned_files(inventory)
+        except Exception as e:
+            result['error'] = str(e)
+            return result
+
+        tasks = []
+        for kind in ('debug_files', 'session_envs', 'conversation_files',
+                     'file_histories', 'todos'):
+            for item in orphans[kind]:
+                tasks.append({
+                    'kind': kind,
+                    'session_id': item['session_id'],
+                    'path': item['path']
+                })
+
+        # 并行删除，按收集顺序合并结果
+        detail_labels = {
+            'debug_files': 'debug',
+            'session_envs': 'session-env',
+            'conversation_files': 'conversation',
+            'file_histories': 'file-history',
+            'todos': 'todo'
+        }
+        remover = ParallelRemover(self.max_delete_workers, progress_callback)
+        for outcome in remover.run(tasks):
+            kind = outcome['kind']
+            sid = outcome['session_id']
+            if not outcome['ok']:
+                result.setdefault('error', outcome['error'])
+                continue
+            if kind == 'conversation_files':
+                self.metadata_index.discard(outcome['path'])
+
+            result[kind] += 1
+            detail = f"{detail_labels[kind]}: {sid[:8]}..."
+            if kind in ('debug_files', 'conversation_files'):
+                result['total_size_freed'] += outcome['size']
+                detail += f" ({self.format_size(outcome['size'])})"
+            result['details'].append(detail)
+
+        # 如果项目目录为空，删除它
+        for project_dir in inventory.project_dirs:
+            try:
+                if project_dir.exists() and not list(project_dir.iterdir()):
+                    project_dir.rmdir()
+                    result['details'].append(
+                        f"空项目目录已删除: {project_dir.name}")
+            except:
+                pass
+
+        # 文件已变化，清单需要重新扫描
+        self.inventory = None
+        self.invalidate_cache()
+        return result
+
+    def invalidate_cache(self):
+        """数据发生变化：递增代数，使 get_unique_sessions 等缓存失效"""
+        self.generation += 1
+
+    def get_unique_sessions(self) -> list:
+        """获取去重后的会话列表（按 sessionId，取最新的记录）
+
+        结果按代数缓存，数据未变化时直接返回同一个列表（调用方不要修改）。
+        """
+        if self._unique_cache is not None and self._unique_cache[
+                0] == self.generation:
+            return self._unique_cache[1]
+
+        # 按 sessionId 去重，保留时间戳最新的记录（相同时间戳取先出现的）
+        latest = {}  # {sid: (timestamp, index, session)}
+        for index, session in enumerate(self.sessions):
+            sid = session.get('sessionId')
+            if not sid:
+                continue
+            timestamp = session.get('timestamp', 0)
+            current = latest.get(sid)
+            if current is None or timestamp > current[0]:
+                latest[sid] = (timestamp, index, session)
+
+        # 计算每个会话是否有对话文件，用于排序（与结果一起缓存）
+        file_info = {}
+        for sid, (timestamp, index, session) in latest.items():
+            project = session.get('project', 'N/A')
+            size = self.get_session_data_size(sid, project)
+            file_info[sid] = {'has_file': size > 0, 'size': size}
+        return self._build_unique(latest, file_info)
+
+    def _build_unique(self, latest: dict, file_info: dict) -> list:
+        """按 has_file、本地命令、时间排序去重结果，并更新缓存"""
+        session_with_file_info = []
+        for sid, (timestamp, index, session) in latest.items():
+            size = file_info[sid]['size']
+            # 判断是否是本地命令
+            display = session.get('display', '')
+            is_local_cmd = display.startswith('/') if display else False
+
+            session_with_file_info.append({
+                'session': session,
+                'has_file': size > 0,
+                'timestamp': timestamp,
+                'index': index,
+                'is_local_cmd': is_local_cmd
+            })
+
+        # 排序：
+        # 1. 有数据文件的优先（has_file=True 排前面）
+        # 2. 本地命令放后面
+        # 3. 时间倒序（最新的在上面）
+        session_with_file_info.sort(key=lambda x: (
+            not x['has_file'],  # 有文件的优先
+            x['is_local_cmd'],  # 本地命令放后面
+            -x['timestamp'],  # 时间倒序（负号，大的在前）
+            x['index']  # 时间相同时保持 history 中的顺序
+        ))
+
+        unique = [s['session'] for s in session_with_file_info]
+        self._latest = latest
+        self.file_info = file_info
+        # 每次重新生成新字典，已交给界面的旧字典不会被修改
+        self.sessions_by_id = {s.get('sessionId'): s for s in unique}
+        self._unique_cache = (self.generation, unique)
+        return unique
+
+    def get_session(self, session_id: str):
+        """按 sessionId 获取去重后的会话记录，不存在时返回 None"""
+        self.get_unique_sessions()
+        return self.sessions_by_id.get(session_id)
+
+    def get_file_info(self, session_id: str) -> dict:
+        """获取 get_unique_sessions 缓存的对话文件信息 {'has_file', 'size'}"""
+        self.get_unique_sessions()
+        return self.file_info.get(session_id, {'has_file': False, 'size': 0})
+
+    def cleanup_old_snapshots(self,
+                              keep_count: int = 5,
+                              dry_run: bool = False,
+                              policy: SnapshotRetentionPolicy = None) -> dict:
+        """按保留策略清理旧的 shell-snapshot 文件（默认保留最新的 N 个）
+
+        dry_run 为 True 时只生成报告，不实际删除。
+        活跃会话需先由 get_active_sessions 检测。
+        """
+        if policy is None:
+            policy = SnapshotRetentionPolicy(keep_count=keep_count)
+
+        result = {
+            'total_snapshots': 0,
+            'deleted_snapshots': 0,
+            'kept_snapshots': 0,
+            'total_size_freed': 0,
+            'deleted_files': [],
+            'kept_files': [],
+            'active_preserved': [],
+            'dry_run': dry_run
+        }
+
+        if not self.shell_snapshots_dir.exists():
+            return result
+
+        # 收集所有 snapshot 文件及其信息
+        snapshots = []
+        for f in self.shell_snapshots_dir.glob("snapshot-*.sh"):
+            match = _SNAPSHOT_RE.search(f.name)
+            if match:
+                try:
+                    size = f.stat().st_size
+                except OSError:
+                    continue
+                snapshots.append({
+                    'file': f,
+                    'name': f.name,
+                    'shell': match.group(1),
+                    'timestamp': int(match.group(2)),
+                    'size': size
+                })
+
+        if not snapshots:
+            return result
+
+        result['total_snapshots'] = len(snapshots)
+
+        # 活跃会话的 history 时间戳排序后二分匹配，避免逐条比较
+        active_timestamps = sorted(
+            session.get('timestamp', 0) for session in self.sessions
+            if session.get('sessionId', '') in self.active_session_ids)
+        now_ms = int(datetime.now().timestamp() * 1000)
+        kept, to_delete = policy.apply(snapshots, active_timestamps, now_ms)
+
+        def describe(snap):
+            return {
+                'name': snap['name'],
+                'shell': snap['shell'],
+                'size': snap['size'],
+                'date': datetime.fromtimestamp(snap['timestamp'] / 1000).strftime('%Y-%m-%d %H:%M:%S'),
+                'reason': snap['reason']
+            }
+
+        for snap in kept:
+            result['kept_files'].append(describe(snap))
+            if snap['reason'] == 'active':
+                result['active_preserved'].append(snap['name'])
+        result['kept_snapshots'] = len(kept)
+
+        # 删除旧 snapshot
+        for snap in to_delete:
+            try:
+                if not dry_run:
+                    snap['file'].unlink()
+                result['deleted_snapshots'] += 1
+                result['total_size_freed'] += snap['size']
+                result['deleted_files'].append(describe(snap))
+            except Exception as e:
+                result['error'] = str(e)
+
+        return result
+
+    def plan_storage_budget(self, policy: EvictionPolicy) -> dict:
+        """按存储预算策略计算需要淘汰的会话（不修改任何文件）
+
+        重新扫描存储清单得到当前总大小；活跃会话需先由 get_active_sessions 检测。
+        返回的计划可交给 apply_eviction_plan 执行。
+        """
+        inventory = self.scan_storage()
+        total_size = inventory.get_total_size()
+
+        candidates = []
+        for session in self.get_unique_sessions():
+            sid = session.get('sessionId')
+            project = session.get('project', 'N/A')
+            meta = self.get_session_meta(sid, project) or {}
+            # 最近使用时间：history 记录和对话最后一条消息中较晚的
+            last_used = max(session.get('timestamp', 0) / 1000,
+                            meta.get('last_timestamp', 0))
+            candidates.append({
+                'session_id': sid,
+                'project': project,
+                'size': inventory.get_session_size(sid),
+                'last_used': last_used,
+                'active': sid in self.active_session_ids,
+                'titled': bool(meta.get('title')),
+                'archived': bool(meta.get('archived'))
+            })
+
+        kept, evicted = policy.apply(candidates, total_size, time.time())
+        return self._build_eviction_plan(policy, total_size, kept, evicted)
+
+    @staticmethod
+    def _build_eviction_plan(policy: EvictionPolicy, total_size: int,
+                             kept: list, evicted: list) -> dict:
+        """把策略计算结果整理为计划字典"""
+        protected = {}
+        for session in kept:
+            protected[session['reason']] = protected.get(session['reason'],
+                                                         0) + 1
+        projected = total_size - sum(s['freed'] for s in evicted)
+        fields = ('session_id', 'project', 'size', 'freed', 'last_used',
+                  'reason')
+        return {
+            'dry_run': True,
+            'action': policy.action,
+            'order': policy.order,
+            'budget': policy.max_total_size,
+            'total_size': total_size,
+            'projected_size': projected,
+            # 受保护的会话太多时，淘汰全部候选也可能回不到预算以内
+            'reachable': projected <= policy.max_total_size,
+            'evicted': [{field: s[field] for field in fields} for s in evicted],
+            'kept': len(kept),
+            'protected': protected
+        }
+
+    def apply_eviction_plan(self, plan: dict, progress_callback=None) -> dict:
+        """执行 plan_storage_budget 得到的计划（删除或归档），返回附带结果的计划
+
+        计划可能是预览时算出的：执行前重新检测活跃会话并重新扫描存储，
+        之后变为运行中、或文件大小已变化（包括已被删除）的会话不再处理，
+        在条目中记录 'skipped' 原因。
+        """
+        plan = dict(plan, dry_run=False, done=0, failed=0, skipped=0)
+        active = self.get_active_sessions()
+        inventory = self.scan_storage()
+
+        evicted = []
+        batch = []
+        for item in plan['evicted']:
+            item = dict(item)
+            sid = item['session_id']
+            if sid in active:
+                item['skipped'] = 'active'
+            elif inventory.get_session_size(sid) != item['size']:
+                item['skipped'] = 'changed'
+            else:
+                batch.append((sid, item['project']))
+            evicted.append(item)
+
+        outcome = {'sessions': {}}
+        if batch:
+            if plan['action'] == 'archive':
+                outcome = self.archive_sessions(batch, progress_callback)
+            else:
+                outcome = self.delete_sessions(batch, progress_callback)
+        for item in evicted:
+            if 'skipped' in item:
+                plan['skipped'] += 1
+                continue
+            result = outcome['sessions'].get(item['session_id'], {})
+            if result.get('success'):
+                plan['done'] += 1
+            else:
+                plan['failed'] += 1
+                item['error'] = result.get('error', outcome.get('error'))
+        plan['evicted'] = evicted
+        plan['size_after'] = self.scan_storage().get_total_size()
+        return plan
+
+    def enforce_storage_budget(self,
+                               policy: EvictionPolicy,
+                               dry_run: bool = False,
+                               progress_callback=None) -> dict:
+        """计算并执行存储预算（dry_run 时只返回计划）"""
+        plan = self.plan_storage_budget(policy)
+        if dry_run:
+            return plan
+        return self.apply_eviction_plan(plan, progress_callback)
+
+
+# ============ 多数据目录 ============
+
+
+class MultiRootSessionData:
+    """把多个 Claude 数据目录聚合成一个视图
+
+    每个数据目录由独立的 SessionData 管理（各自的缓存和增量状态），
+    加载和扫描在线程池中并发执行。会话键为 "<目录名>:<sessionId>"，
+    会话记录带有 'root' 字段标明来源；接口与 SessionData 一致，
+    界面和命令行把会话键当作 sessionId 使用即可。
+    """
+
+    multi_root = True
+    KEY_SEP = ':'
+
+    def __init__(self, claude_dirs: list):
+        self.roots = {}  # {label: SessionData}
+        for claude_dir in claude_dirs:
+            data = SessionData(claude_dir=claude_dir)
+            label = data.label
+            suffix = 2
+            while label in self.roots:
+                label = f"{data.label}-{suffix}"
+                suffix += 1
+            data.label = label
+            self.roots[label] = data
+        self.executor = ThreadPoolExecutor(max_workers=len(self.roots))
+        self.active_session_ids = set()
+        self.sessions_by_id = {}
+        self.file_info = {}
+        self._unique_cache = None  # (各目录代数, unique_sessions)
+        self._inventory = None
+
+    # ---------- 会话键 ----------
+
+    def make_key(self, label: str, session_id: str) -> str:
+        return f"{label}{self.KEY_SEP}{session_id}"
+
+    def _ambiguous_error(self, session_id: str, labels: list) -> ValueError:
+        return ValueError(f"会话 ID 不唯一，{', '.join(labels)} 中都存在，"
+                          f"请使用 <目录名>{self.KEY_SEP}<id> 指定，"
+                          f"如 {self.make_key(labels[0], session_id)}")
+
+    def resolve(self, key: str) -> tuple:
+        """会话键 -> (SessionData, sessionId)
+
+        不带目录前缀的 sessionId 必须恰好在一个目录中存在，
+        找不到或在多个目录中都存在时抛出 ValueError。
+        """
+        label, sep, session_id = key.partition(self.KEY_SEP)
+        if sep and label in self.roots:
+            return self.roots[label], session_id
+        labels = [
+            label for label, data in self.roots.items()
+            if data.get_session(key) is not None
+        ]
+        if len(labels) > 1:
+            raise self._ambiguous_error(key, labels)
+        if not labels:
+            raise ValueError(f"未找到会话: {key}")
+        return self.roots[labels[0]], key
+
+    def _map(self, func) -> dict:
+        """在线程池中对每个目录并发执行 func(data)，返回 {label: 结果}"""
+        futures = {
+            label: self.executor.submit(func, data)
+            for label, data in self.roots.items()
+        }
+        return {label: future.result() for label, future in futures.items()}
+
+    @property
+    def claude_dirs(self) -> list:
+        return [data.claude_dir for data in self.roots.values()]
+
+    @property
+    def sessions(self) -> list:
+        """所有目录的 history 记录"""
+        return [s for data in self.roots.values() for s in data.sessions]
+
+    @property
+    def generation(self) -> tuple:
+        return tuple(data.generation for data in self.roots.values())
+
+    format_size = SessionData.format_size
+    format_timestamp = SessionData.format_timestamp
+
+    # ---------- 加载 ----------
+
+    def load_sessions(self):
+        self._map(lambda data: data.load_sessions())
+        return self.sessions
+
+    def invalidate_cache(self):
+        for data in self.roots.values():
+            data.invalidate_cache()
+
+    def get_active_sessions(self, minutes: int = 10,
+                            mode: str = 'tail') -> set:
+        results = self._map(
+            lambda data: data.get_active_sessions(minutes, mode))
+        self.active_session_ids = {
+            self.make_key(label, sid)
+            for label, active in results.items() for sid in active
+        }
+        return self.active_session_ids
+
+    def refresh_active(self) -> set:
+        changed = set()
+        for label, data in self.roots.items():
+            changed |= {
+                self.make_key(label, sid)
+                for sid in data.refresh_active()
+            }
+        self._collect_active()
+        return changed
+
+    def _collect_active(self):
+        self.active_session_ids = {
+            self.make_key(label, sid)
+            for label, data in self.roots.items()
+            for sid in data.active_session_ids
+        }
+
+    def get_unique_sessions(self) -> list:
+        """合并各目录去重后的会话，排序规则与 SessionData 相同"""
+        generation = self.generation
+        if self._unique_cache is not None and self._unique_cache[
+                0] == generation:
+            return self._unique_cache[1]
+
+        per_root = self._map(lambda data: data.get_unique_sessions())
+        entries = []
+        file_info = {}
+        for order, (label, sessions) in enumerate(per_root.items()):
+            data = self.roots[label]
+            for index, session in enumerate(sessions):
+                sid = session.get('sessionId')
+                key = self.make_key(label, sid)
+                info = data.file_info.get(sid, {'has_file': False, 'size': 0})
+                file_info[key] = info
+                display = session.get('display', '')
+                sort_key = (not info['has_file'],
+                            display.startswith('/') if display else False,
+                            -session.get('timestamp', 0), order, index)
+                entries.append(
+                    (sort_key, dict(session, sessionId=key, root=label)))
+        entries.sort(key=lambda entry: entry[0])
+
+        unique = [session for _, session in entries]
+        self.file_info = file_info
+        self.sessions_by_id = {s['sessionId']: s for s in unique}
+        self._unique_cache = (self.generation, unique)
+        return unique
+
+    def get_session(self, key: str):
+        """按会话键查找；不带前缀的 sessionId 在多个目录中都存在时抛出 ValueError"""
+        self.get_unique_sessions()
+        session = self.sessions_by_id.get(key)
+        if session is not None:
+            return session
+        labels = [
+            label for label in self.roots
+            if self.make_key(label, key) in self.sessions_by_id
+        ]
+        if len(labels) > 1:
+            raise self._ambiguous_error(key, labels)
+        return self.sessions_by_id[self.make_key(labels[0], key)] if labels else None
+
+    def get_file_info(self, key: str) -> dict:
+        self.get_unique_sessions()
+        return self.file_info.get(key, {'has_file': False, 'size': 0})
+
+    def get_all_session_ids(self) -> set:
+        return {
+            self.make_key(label, sid)
+            for label, data in self.roots.items()
+            for sid in data.get_all_session_ids()
+        }
+
+    # ---------- 单个会话（按会话键转交对应目录） ----------
+
+    def get_conversation_file(self, key: str, project_path: str) -> Path:
+        data, sid = self.resolve(key)
+        return data.get_conversation_file(sid, project_path)
+
+    def get_conversation_file_size(self, key: str, project_path: str) -> int:
+        data, sid = self.resolve(key)
+        return data.get_conversation_file_size(sid, project_path)
+
+    def get_debug_file(self, key: str) -> Path:
+        data, sid = self.resolve(key)
+        return data.get_debug_file(sid)
+
+    def get_session_data_size(self, key: str, project_path: str) -> int:
+        data, sid = self.resolve(key)
+        return data.get_session_data_size(sid, project_path)
+
+    def is_archived(self, key: str) -> bool:
+        data, sid = self.resolve(key)
+        return data.is_archived(sid)
+
+    def get_archive_meta(self, key: str) -> dict:
+        data, sid = self.resolve(key)
+        return data.get_archive_meta(sid)
+
+    def load_conversation(self, key: str, project_path: str) -> list:
+        data, sid = self.resolve(key)
+        return data.load_conversation(sid, project_path)
+
+    def iter_conversation(self, key: str, project_path: str):
+        data, sid = self.resolve(key)
+        return data.iter_conversation(sid, project_path)
+
+    def get_message_count(self, key: str, project_path: str) -> int:
+        data, sid = self.resolve(key)
+        return data.get_message_count(sid, project_path)
+
+    def open_conversation(self, key: str,
+                          project_path: str) -> ConversationPager:
+        data, sid = self.resolve(key)
+        return data.open_conversation(sid, project_path)
+
+    def get_viewable_conversation_file(self, key: str,
+                                       project_path: str) -> Path:
+        data, sid = self.resolve(key)
+        return data.get_viewable_conversation_file(sid, project_path)
+
+    def open_debug_log(self, key: str) -> DebugLogIndex:
+        data, sid = self.resolve(key)
+        return data.open_debug_log(sid)
+
+    def get_session_meta(self, key: str, project_path: str) -> dict:
+        data, sid = self.resolve(key)
+        return data.get_session_meta(sid, project_path)
+
+    def get_session_title(self, key: str, project_path: str) -> str:
+        data, sid = self.resolve(key)
+        return data.get_session_title(sid, project_path)
+
+    def save_metadata_index(self):
+        for data in self.roots.values():
+            data.save_metadata_index()
+
+    # ---------- 全文搜索 ----------
+
+    def update_fulltext_index(self, progress_callback=None) -> dict:
+        result = {'indexed': 0, 'removed': 0, 'total': 0}
+        for data in self.roots.values():
+            part = data.update_fulltext_index(progress_callback)
+            for key in result:
+                result[key] += part[key]
+        return result
+
+    def search_fulltext(self, query: str, limit: int = 50) -> list:
+        """各目录分别搜索，按相关度交替合并"""
+        per_root = [[
+            dict(hit, session_id=self.make_key(label, hit['session_id']))
+            for hit in data.search_fulltext(query, limit)
+        ] for label, data in self.roots.items()]
+        merged = []
+        for rank in range(limit):
+            for hits in per_root:
+                if rank < len(hits):
+                    merged.append(hits[rank])
+        return merged[:limit]
+
+    # ---------- 存储清单 ----------
+
+    @property
+    def inventory(self) -> StorageInventory:
+        """合并各目录的存储清单（任一目录尚未扫描时为 None）"""
+        parts = {label: data.inventory for label, data in self.roots.items()}
+        if any(part is None for part in parts.values()):
+            return None
+        merged = self._inventory
+        if merged is None or any(merged.parts[label] is not part
+                                 for label, part in parts.items()):
+            merged = self._merge_inventories(parts)
+            self._inventory = merged
+        return merged
+
+    def _merge_inventories(self, parts: dict) -> StorageInventory:
+        """各目录清单合并为一个，条目的 session_id 换成会话键"""
+        merged = StorageInventory()
+        merged.parts = parts
+        for label, part in parts.items():
+            merged.history_size += part.history_size
+            merged.project_dirs.extend(part.project_dirs)
+            merged.complete = merged.complete and part.complete
+            for kind, items in part.by_kind.items():
+                for item in items:
+                    merged.add(kind, self.make_key(label, item['session_id']),
+                               item['path'], item['size'], item['is_dir'])
+        return merged
+
+    def scan_storage(self,
+                     on_item=None,
+                     on_progress=None,
+                     cancel_event: threading.Event = None) -> StorageInventory:
+        """并发扫描所有目录，回调中的 session_id 为会话键"""
+        progress = {}
+        progress_lock = threading.Lock()
+
+        def scan(label, data):
+            def item_callback(kind, item):
+                on_item(kind,
+                        dict(item,
+                             session_id=self.make_key(label,
+                                                      item['session_id'])))
+
+            def progress_callback(done, total):
+                with progress_lock:
+                    progress[label] = (done, total)
+                    done_sum = sum(d for d, _ in progress.values())
+                    total_sum = sum(t for _, t in progress.values())
+                on_progress(done_sum, total_sum)
+
+            return data.scan_storage(
+                on_item=item_callback if on_item else None,
+                on_progress=progress_callback if on_progress else None,
+                cancel_event=cancel_event)
+
+        futures = {
+            label: self.executor.submit(scan, label, data)
+            for label, data in self.roots.items()
+        }
+        parts = {label: future.result() for label, future in futures.items()}
+        merged = self._merge_inventories(parts)
+        if merged.complete:
+            self._inventory = merged
+        return merged
+
+    def get_inventory(self) -> StorageInventory:
+        if self.inventory is None:
+            self._map(lambda data: data.get_inventory())
+        return self.inventory
+
+    def collect_orphaned_files(self,
+                               inventory: StorageInventory = None) -> dict:
+        if inventory is None:
+            inventory = self.get_inventory()
+        return inventory.get_orphans(self.get_all_session_ids())
+
+    # ---------- 删除和清理（按目录依次执行） ----------
+
+    def _group_by_root(self, batch: list) -> dict:
+        groups = {}
+        for key, project_path in batch:
+            data, sid = self.resolve(key)
+            groups.setdefault(data.label, []).append((key, sid, project_path))
+        return groups
+
+    def delete_session(self, key: str, project_path: str,
+                       progress_callback=None) -> dict:
+        batch_result = self.delete_sessions([(key, project_path)],
+                                            progress_callback)
+        return batch_result['sessions'][key]
+
+    def delete_sessions(self, batch: list, progress_callback=None) -> dict:
+        batch_result = {
+            'sessions': {},
+            'deleted': 0,
+            'failed': 0,
+            'history_entries': 0,
+            'success': True
+        }
+        for label, items in self._group_by_root(batch).items():
+            part = self.roots[label].delete_sessions(
+                [(sid, project_path) for _, sid, project_path in items],
+                progress_callback)
+            for key, sid, _ in items:
+                batch_result['sessions'][key] = part['sessions'][sid]
+            for field in ('deleted', 'failed', 'history_entries'):
+                batch_result[field] += part[field]
+            batch_result['success'] = batch_result['success'] and part[
+                'success']
+            if 'error' in part:
+                batch_result['error'] = f"{label}: {part['error']}"
+        return batch_result
+
+    def archive_sessions(self, batch: list, progress_callback=None) -> dict:
+        batch_result = {
+            'sessions': {},
+            'archived': 0,
+            'failed': 0,
+            'original_size': 0,
+            'archive_size': 0,
+            'success': True
+        }
+        for label, items in self._group_by_root(batch).items():
+            part = self.roots[label].archive_sessions(
+                [(sid, project_path) for _, sid, project_path in items],
+                progress_callback)
+            for key, sid, _ in items:
+                batch_result['sessions'][key] = part['sessions'][sid]
+            for field in ('archived', 'failed', 'original_size',
+                          'archive_size'):
+                batch_result[field] += part[field]
+            batch_result['success'] = batch_result['success'] and part[
+                'success']
+        return batch_result
+
+    def restore_sessions(self, keys: list, progress_callback=None) -> dict:
+        batch_result = {
+            'sessions': {},
+            'restored': 0,
+            'failed': 0,
+            'success': True
+        }
+        groups = self._group_by_root([(key, None) for key in keys])
+        for label, items in groups.items():
+            part = self.roots[label].restore_sessions(
+                [sid for _, sid, _ in items], progress_callback)
+            for key, sid, _ in items:
+                batch_result['sessions'][key] = part['sessions'][sid]
+            for field in ('restored', 'failed'):
+                batch_result[field] += part[field]
+            batch_result['success'] = batch_result['success'] and part[
+                'success']
+        return batch_result
+
+    def cleanup_orphaned_files(self,
+                               progress_callback=None,
+                               inventory: StorageInventory = None) -> dict:
+        result = {
+            'debug_files': 0,
+            'session_envs': 0,
+            'conversation_files': 0,
+            'file_histories': 0,
+            'todos': 0,
+            'total_size_freed': 0,
+            'details': []
+        }
+        for label, data in self.roots.items():
+            part_inventory = inventory.parts[label] if inventory else None
+            part = data.cleanup_orphaned_files(progress_callback,
+                                               inventory=part_inventory)
+            for field, value in part.items():
+                if field == 'details':
+                    result['details'].extend(f"[{label}] {detail}"
+                                             for detail in value)
+                elif field == 'error':
+                    result['error'] = f"{label}: {value}"
+                else:
+                    result[field] += value
+        return result
+
+    def cleanup_old_snapshots(self,
+                              keep_count: int = 5,
+                              dry_run: bool = False,
+                              policy: SnapshotRetentionPolicy = None) -> dict:
+        result = {
+            'total_snapshots': 0,
+            'deleted_snapshots': 0,
+            'kept_snapshots': 0,
+            'total_size_freed': 0,
+            'deleted_files': [],
+            'kept_files': [],
+            'active_preserved': [],
+            'dry_run': dry_run
+        }
+        for label, data in self.roots.items():
+            part = data.cleanup_old_snapshots(keep_count, dry_run, policy)
+            for field in ('total_snapshots', 'deleted_snapshots',
+                          'kept_snapshots', 'total_size_freed'):
+                result[field] += part[field]
+            for field in ('deleted_files', 'kept_files'):
+                result[field].extend(
+                    dict(f, root=label) for f in part[field])
+            result['active_preserved'].extend(part['active_preserved'])
+            if 'error' in part:
+                result['error'] = f"{label}: {part['error']}"
+        return result
+
+    def plan_storage_budget(self, policy: EvictionPolicy) -> dict:
+        """各目录并发计算，预算针对每个目录分别生效"""
+        parts = self._map(lambda data: data.plan_storage_budget(policy))
+        plan = {
+            'dry_run': True,
+            'action': policy.action,
+            'order': policy.order,
+            'budget': policy.max_total_size,
+            'total_size': 0,
+            'projected_size': 0,
+            'reachable': True,
+            'evicted': [],
+            'kept': 0,
+            'protected': {}
+        }
+        for label, part in parts.items():
+            for field in ('total_size', 'projected_size', 'kept'):
+                plan[field] += part[field]
+            plan['reachable'] = plan['reachable'] and part['reachable']
+            plan['evicted'].extend(
+                dict(item,
+                     session_id=self.make_key(label, item['session_id']),
+                     root=label) for item in part['evicted'])
+            for reason, count in part['protected'].items():
+                plan['protected'][reason] = plan['protected'].get(reason,
+                                                                  0) + count
+        return plan
+
+    apply_eviction_plan = SessionData.apply_eviction_plan
+    enforce_storage_budget = SessionData.enforce_storage_budget
+
+    # ---------- 文件监视 ----------
+
+    def apply_storage_events(self, events: set) -> dict:
+        """按路径把事件分给对应目录，合并各目录的变化"""
+        changes = {
+            'reload': False,
+            'sessions': False,
+            'meta': {},
+            'active_changed': set(),
+            'snapshots': False
+        }
+        grouped = {}
+        for kind, path in events:
+            if kind == 'overflow':
+                changes['reload'] = True
+                return changes
+            for label, data in self.roots.items():
+                if path.startswith(str(data.claude_dir) + os.sep):
+                    grouped.setdefault(label, set()).add((kind, path))
+                    break
+
+        for label, data in self.roots.items():
+            if label in grouped:
+                part = data.apply_storage_events(grouped[label])
+            else:
+                part = {
+                    'reload': False,
+                    'sessions': False,
+                    'meta': {},
+                    'active_changed': data.refresh_active(),
+                    'snapshots': False
+                }
+            changes['reload'] = changes['reload'] or part['reload']
+            changes['sessions'] = changes['sessions'] or part['sessions']
+            changes['snapshots'] = changes['snapshots'] or part['snapshots']
+            changes['meta'].update({
+                self.make_key(label, sid): meta
+                for sid, meta in part['meta'].items()
+            })
+            changes['active_changed'] |= {
+                self.make_key(label, sid)
+                for sid in part['active_changed']
+            }
+        self._collect_active()
+        return changes
+
+
+def create_session_data(claude_dirs: list = None):
+    """按数据目录数量创建 SessionData 或 MultiRootSessionData"""
+    if not claude_dirs:
+        return SessionData()
+    if len(claude_dirs) == 1:
+        return SessionData(claude_dir=claude_dirs[0])
+    return MultiRootSessionData(claude_dirs)
@@ -0,0 +1,3225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Claude 会话管理器 - 图形界面
+主窗口、全文搜索、调试日志和对话查看器（依赖 tkinter）
+"""
+
+import re
+import threading
+import queue
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext
+
+from claude_session_data import (SessionData, FullTextIndex, DebugLogIndex,
+                                 EvictionPolicy, SnapshotRetentionPolicy,
+                                 StorageInventory, StorageWatcher, count_lines,
+                                 create_session_data, extract_message_text,
+                                 parse_size)
+
+# 存储清单中各类文件的显示名称
+KIND_LABELS = {
+    'conversation_files': '对话文件',
+    'debug_files': 'Debug 日志',
+    'session_envs': 'Session 环境',
+    'file_histories': '文件历史',
+    'todos': 'Todo 记录',
+    'archives': '归档',
+}
+
+# ============ GUI 界面 ============
+
+
+class SessionManagerApp:
+    """会话管理器主窗口"""
+
+    def __init__(self,
+                 root,
+                 app_title="Claude 会话管理器",
+                 window_geometry="1200x700",
+                 developer="Qzjzl20000",
+                 version="v1.0.0",
+                 footer_hint="💡 双击对话可查看详情",
+                 virtual_threshold=2000,
+                 watch_storage=True,
+                 claude_dirs=None):
+        self.root = root
+        self.app_title = app_title
+        self.window_geometry = window_geometry
+        self.developer = developer
+        self.version = version
+        self.footer_hint = footer_hint
+        # 会话数达到该值时切换为虚拟列表模式（只保留可见行）
+        self.virtual_threshold = virtual_threshold
+
+        # 一个或多个 Claude 数据目录（多个时聚合显示，并增加"来源"列）
+        self.data = create_session_data(claude_dirs)
+
+        title = self.app_title
+        if self.data.multi_root:
+            title += f" ({len(self.data.claude_dirs)} 个数据目录)"
+        self.root.title(title)
+        self.root.geometry(self.window_geometry)
+        self.all_sessions = []  # 去重后的全部会话（后台线程加载）
+        self.sessions_by_id = {}  # {session_id: session}
+        self.session_meta = {}  # {session_id: 元数据}，未计算的不在字典中
+        self.active_sessions = set()
+        self.current_sessions = []
+        self.checked_sessions = set()  # 勾选的 session_id（独立于 Tk 行）
+        self.item_by_sid = {}  # {session_id: item_id}
+        self.row_numbers = {}  # {session_id: 行号}
+        self.search_keys = {}  # {session_id: 小写的 display/标题/项目/ID}
+        self.filter_text = ""
+        self.search_after_id = None
+
+        # 虚拟列表状态
+        self.virtual_mode = False
+        self.view_offset = 0  # 可见窗口第一行在 current_sessions 中的下标
+        self.visible_rows = 30
+        self.virtual_items = []  # 复用的 Tk 行
+        self.selected_sid = None
+        self.distribution_sid = None  # 文件大小分布面板当前显示的会话
+
+        # 后台加载状态
+        self.loading = False
+        self.polling = False
+        self.load_generation = 0
+        self.render_generation = 0
+        self.load_queue = queue.Queue()
+        # 加载、文件监视、预览和删除等所有访问数据层的后台线程都持有此锁
+        self.load_lock = threading.Lock()
+        # 清理/删除预览和删除类操作在单线程池中执行，多次提交排队而不是同时扫盘
+        self.preview_executor = ThreadPoolExecutor(max_workers=1)
+        self.busy = None  # 正在后台执行的删除类操作名称
+        # 上次填写的存储预算设置（本次运行内记住）
+        self.budget_settings = {
+            'max_size': "2G",
+            'keep_days': "30",
+            'order': 'largest',
+            'action': 'archive',
+            'protect_titled': True
+        }
+        # 上次填写的快照保留设置，留空的规则不生效
+        self.snapshot_settings = {
+            'keep_count': "5",
+            'keep_per_shell': "",
+            'max_age_days': "",
+            'max_size': ""
+        }
+
+        self.search_var = tk.StringVar()
+        self.search_var.trace('w', self.on_search)
+
+        # 文件监视：增量更新列表和活跃状态（每个数据目录一个监视器）
+        self.watchers = []
+        self.watch_queue = queue.Queue()
+
+        self.setup_ui()
+        self.load_data()
+        if watch_storage:
+            self.start_watcher()
+
+    def setup_ui(self):
+        """设置界面"""
+        # 顶部工具栏
+        toolbar = ttk.Frame(self.root, padding=10)
+        toolbar.pack(fill=tk.X)
+
+        # 标题
+        title_label = ttk.Label(toolbar,
+                                text=self.app_title,
+                                font=("", 16, "bold"))
+        title_label.pack(side=tk.LEFT, padx=5)
+
+        # 搜索框
+        search_frame = ttk.Frame(toolbar)
+        search_frame.pack(side=tk.RIGHT, padx=5)
+
+        ttk.Label(search_frame, text="🔍 搜索:").pack(side=tk.LEFT, padx=5)
+        search_entry = ttk.Entry(search_frame,
+                                 textvariable=self.search_var,
+                                 width=30)
+        search_entry.pack(side=tk.LEFT)
+
+        # 刷新按钮
+        refresh_btn = ttk.Button(toolbar, text="🔄 刷新", command=self.load_data)
+        refresh_btn.pack(side=tk.RIGHT, padx=5)
+
+        # 全文搜索按钮
+        ttk.Button(toolbar, text="🔎 全文搜索",
+                   command=self.open_fulltext_search).pack(side=tk.RIGHT,
+                                                           padx=5)
+
+        # 统计信息栏
+        self.stats_label = ttk.Label(self.root, text="", padding=(10, 5))
+        self.stats_label.pack(fill=tk.X)
+
+        # 操作栏（全选、删除等）
+        action_bar = ttk.Frame(self.root, padding=(10, 5))
+        action_bar.pack(fill=tk.X)
+
+        self.select_all_btn = ttk.Button(action_bar,
+                                         text="☑️ 全选",
+                                         command=self.select_all)
+        self.select_all_btn.pack(side=tk.LEFT, padx=5)
+
+        self.deselect_all_btn = ttk.Button(action_bar,
+                                           text="☐ 取消全选",
+                                           command=self.deselect_all)
+        self.deselect_all_btn.pack(side=tk.LEFT, padx=5)
+
+        self.delete_selected_btn = ttk.Button(action_bar,
+                                              text="🗑️ 删除选中的会话",
+                                              command=self.delete_selected,
+                                              state="disabled")
+        self.delete_selected_btn.pack(side=tk.LEFT, padx=5)
+
+        self.archive_selected_btn = ttk.Button(action_bar,
+                                               text="🗄️ 归档选中",
+                                               command=self.archive_selected,
+                                               state="disabled")
+        self.archive_selected_btn.pack(side=tk.LEFT, padx=5)
+
+        self.restore_selected_btn = ttk.Button(action_bar,
+                                               text="♻️ 恢复归档",
+                                               command=self.restore_selected,
+                                               state="disabled")
+        self.restore_selected_btn.pack(side=tk.LEFT, padx=5)
+
+        self.selected_count_label = ttk.Label(action_bar, text="已选: 0")
+        self.selected_count_label.pack(side=tk.LEFT, padx=15)
+
+        ttk.Separator(action_bar, orient=tk.VERTICAL).pack(side=tk.LEFT,
+                                                           fill=tk.Y,
+                                                           padx=10)
+
+        ttk.Button(action_bar, text="🧹 清理无索引数据",
+                   command=self.cleanup_orphaned).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(action_bar, text="📸 清理旧快照",
+                   command=self.cleanup_old_snapshots).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(action_bar, text="📏 存储预算",
+                   command=self.enforce_storage_budget).pack(side=tk.LEFT,
+                                                             padx=5)
+
+        # 页脚（需要在主内容之前 pack，以固定在底部）
+        footer_frame = ttk.Frame(self.root)
+        footer_frame.pack(side=tk.BOTTOM, fill=tk.X)
+
+        ttk.Label(footer_frame,
+                  text=self.footer_hint,
+                  font=("", 12),
+                  foreground="#666666").pack(side=tk.LEFT, padx=10, pady=5)
+
+        ttk.Label(footer_frame,
+                  text=f"{self.developer} {self.version}",
+                  font=("", 12),
+                  foreground="#999999").pack(side=tk.RIGHT, padx=10, pady=5)
+
+        # 主内容区域（使用 PanedWindow 分割）
+        paned = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL)
+        paned.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        # 左侧：会话列表
+        left_frame = ttk.Frame(paned)
+        paned.add(left_frame, weight=3)
+
+        # 表格
+        columns = ("check", "row_id", "status", "display", "file_type", "time",
+                   "filesize", "project", "session_id")
+        if self.data.multi_root:
+            columns = columns[:7] + ("root", ) + columns[7:]
+        self.tree = ttk.Treeview(left_frame,
+                                 columns=columns,
+                                 show="headings",
+                                 selectmode="browse")
+
+        # 设置列
+        self.tree.heading("check", text="✓")
+        self.tree.heading("row_id", text="行号")
+        self.tree.heading("status", text="状态")
+        self.tree.heading("display", text="对话")
+        self.tree.heading("file_type", text="文件类型")
+        self.tree.heading("time", text="时间")
+        self.tree.heading("filesize", text="文件大小")
+        self.tree.heading("project", text="项目路径")
+        self.tree.heading("session_id", text="Session ID")
+        if self.data.multi_root:
+            self.tree.heading("root", text="来源")
+            self.tree.column("root", width=90)
+
+        self.tree.column("check", width=40, anchor="center")
+        self.tree.column("row_id", width=50, anchor="center")
+        self.tree.column("status", width=90, anchor="center")
+        self.tree.column("display", width=230)
+        self.tree.column("file_type", width=90, anchor="center")
+        self.tree.column("time", width=140)
+        self.tree.column("filesize", width=90, anchor="center")
+        self.tree.column("project", width=180)
+        self.tree.column("session_id", width=150)
+
+        # 设置标签颜色
+        self.tree.tag_configure("has_data", foreground="black")
+        self.tree.tag_configure("no_data", foreground="#999")
+        self.tree.tag_configure("local_command", foreground="#228B22")  # 绿色
+        self.tree.tag_configure("archived", foreground="#8B6914")  # 棕色
+        self.tree.tag_configure("active_session", foreground="#0066cc",
+                                background="#e6f3ff")  # 蓝色文字，浅蓝背景
+
+        # 滚动条（虚拟模式下由应用自己换算滚动位置）
+        self.scrollbar_y = ttk.Scrollbar(left_frame,
+                                         orient=tk.VERTICAL,
+                                         command=self.on_yscroll)
+        scrollbar_x = ttk.Scrollbar(left_frame,
+                                    orient=tk.HORIZONTAL,
+                                    command=self.tree.xview)
+        self.tree.configure(yscrollcommand=self.on_tree_yscroll,
+                            xscrollcommand=scrollbar_x.set)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar_y.grid(row=0, column=1, sticky="ns")
+        scrollbar_x.grid(row=1, column=0, sticky="ew")
+
+        left_frame.grid_rowconfigure(0, weight=1)
+        left_frame.grid_columnconfigure(0, weight=1)
+
+        # 绑定事件
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<Double-1>", self.on_double_click)
+        self.tree.bind("<Button-1>", self.on_click)
+        self.tree.bind("<Configure>", self.on_tree_configure)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_mouse_wheel)
+        for sequence in ("<Up>", "<Down>", "<Prior>", "<Next>"):
+            self.tree.bind(sequence, self.on_virtual_key)
+
+        # 右键菜单
+        self.context_menu = tk.Menu(self.tree, tearoff=0)
+        self.context_menu.add_command(label="查看对话",
+                                      command=self.view_conversation)
+        self.context_menu.add_command(label="切换选中", command=self.toggle_check)
+        self.tree.bind("<Button-2>", self.show_context_menu)
+        self.tree.bind("<Button-3>", self.show_context_menu)
+
+        # 右侧：预览和统计面板
+        right_frame = ttk.Frame(paned, padding=10)
+        paned.add(right_frame, weight=1)
+
+        # 上半部分：对话预览
+        preview_group = ttk.LabelFrame(right_frame, text="对话预览", padding=10)
+        preview_group.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        self.info_text = scrolledtext.ScrolledText(preview_group,
+                                                   font=("", 12),
+                                                   wrap=tk.WORD,
+                                                   padx=5,
+                                                   pady=5)
+        self.info_text.pack(fill=tk.BOTH, expand=True)
+
+        # 配置预览标签样式
+        self.info_text.tag_config("user_msg",
+                                  foreground="#0066cc",
+                                  font=("", 12, "bold"))
+        self.info_text.tag_config("assistant_msg",
+                                  foreground="#008800",
+                                  font=("", 11))
+        self.info_text.tag_config("system_msg",
+                                  foreground="#666666",
+                                  font=("", 10))
+        self.info_text.tag_config("tool_msg",
+                                  foreground="#aa6600",
+                                  font=("", 10))
+        self.info_text.tag_config("placeholder",
+                                  foreground="#999999",
+                                  font=("", 10))
+        self.info_text.tag_config("error", foreground="#cc0000", font=("", 11))
+
+        # 下半部分：文件大小统计
+        stats_group = ttk.LabelFrame(right_frame, text="文件大小分布", padding=10)
+        stats_group.pack(fill=tk.X, pady=5)
+
+        self.stats_text = scrolledtext.ScrolledText(stats_group,
+                                                    font=("Courier", 11),
+                                                    wrap=tk.WORD,
+                                                    padx=10,
+                                                    pady=10,
+                                                    height=12)
+        self.stats_text.pack(fill=tk.BOTH, expand=True)
+
+        # 配置统计标签样式
+        self.stats_text.tag_config("title",
+                                   foreground="#333333",
+                                   font=("", 12, "bold"))
+        self.stats_text.tag_config("label",
+                                   foreground="#666666",
+                                   font=("", 10))
+        self.stats_text.tag_config("value",
+                                   foreground="#0066cc",
+                                   font=("Courier", 11, "bold"))
+        self.stats_text.tag_config("total",
+                                   foreground="#008800",
+                                   font=("Courier", 12, "bold"))
+        self.stats_text.tag_config("separator", foreground="#cccccc")
+        self.stats_text.tag_config("placeholder",
+                                   foreground="#999999",
+                                   font=("", 10))
+
+    def load_data(self):
+        """加载数据
+
+        所有 I/O 都在后台线程执行，结果经队列交给界面线程，
+        由 root.after 轮询分批渲染，窗口在加载期间保持响应。
+        """
+        self.load_generation += 1
+        self.loading = True
+        self.stats_label.config(text="⏳ 正在加载会话数据...")
+
+        worker = threading.Thread(target=self._load_worker,
+                                  args=(self.load_generation, ),
+                                  daemon=True)
+        worker.start()
+        if not self.polling:
+            self.polling = True
+            self.root.after(50, self._poll_load_queue)
+
+    def _load_worker(self, generation: int):
+        """后台线程：解析 history、检测活跃会话、计算标题/大小、扫描存储"""
+        with self.load_lock:
+            # 排队期间已有更新的加载请求，直接放弃
+            if generation == self.load_generation:
+                self._load(generation)
+        self.load_queue.put((generation, 'done', None))
+
+    def _load(self, generation: int):
+        """执行一轮加载，结果逐步放入队列"""
+        data = self.data
+        post = self.load_queue.put
+        try:
+            # history 未变化时沿用缓存的去重结果，
+            # 对话文件的增删由 StorageWatcher 事件更新 file_info
+            data.load_sessions()
+            # 检测活跃的 Session
+            active = data.get_active_sessions(minutes=10)
+            sessions = data.get_unique_sessions()
+            post((generation, 'sessions',
+                  (sessions, data.sessions_by_id, active)))
+
+            # 标题和文件大小分批计算，边算边填入列表
+            chunk = []
+            for session in sessions:
+                if generation != self.load_generation:
+                    return
+                sid = session.get('sessionId')
+                meta = data.get_session_meta(sid, session.get('project', 'N/A'))
+                chunk.append((sid, meta or {}))
+                if len(chunk) >= 100:
+                    post((generation, 'meta', chunk))
+                    chunk = []
+            if chunk:
+                post((generation, 'meta', chunk))
+            data.save_metadata_index()
+
+            # 扫描一次存储，统计、预览、清理都从清单读取
+            data.scan_storage()
+            post((generation, 'stats', None))
+        except Exception as e:
+            post((generation, 'error', str(e)))
+
+    def _poll_load_queue(self):
+        """界面线程：处理后台加载线程发来的结果"""
+        # 每次最多处理一部分消息，避免阻塞界面
+        for _ in range(20):
+            try:
+                generation, kind, payload = self.load_queue.get_nowait()
+            except queue.Empty:
+                break
+            # 忽略已被新一轮加载取代的结果
+            if generation != self.load_generation:
+                continue
+
+            if kind == 'sessions':
+                sessions, sessions_by_id, active = payload
+                self.all_sessions = sessions
+                self.sessions_by_id = sessions_by_id
+                self.active_sessions = active
+                self.session_meta = {}
+                self.search_keys = {
+                    s.get('sessionId'): self.build_search_key(s)
+                    for s in sessions
+                }
+                self.update_session_list(self.search_var.get())
+            elif kind == 'meta':
+                self.apply_session_meta(payload)
+            elif kind == 'stats':
+                self.update_stats()
+                # 选中会话时清单还没扫描完，现在补上文件大小分布
+                session = self.sessions_by_id.get(self.distribution_sid)
+                if session is not None:
+                    self.update_file_size_distribution(session)
+            elif kind == 'error':
+                self.stats_label.config(text=f"❌ 加载失败: {payload}")
+            elif kind == 'done':
+                self.loading = False
+
+        if self.loading or not self.load_queue.empty():
+            self.root.after(50, self._poll_load_queue)
+        else:
+            self.polling = False
+
+    def check_not_loading(self) -> bool:
+        """加载或删除类操作执行期间禁止删除/清理等操作"""
+        if self.loading:
+            messagebox.showinfo("请稍候", "⏳ 数据正在加载中，请稍候再试。")
+            return False
+        if self.busy:
+            messagebox.showinfo("请稍候", f"⏳ 正在{self.busy}，请稍候再试。")
+            return False
+        return True
+
+    def update_session_list(self, filter_text=""):
+        """重建会话列表
+
+        会话较少时第一屏立即插入、其余分批插入，搜索过滤只对已有的行做
+        detach/reattach；会话数超过 virtual_threshold 时改用虚拟列表，
+        只保留可见窗口内的行。
+        """
+        # 保留仍然存在且非活跃的勾选
+        self.checked_sessions = {
+            sid for sid in self.checked_sessions
+            if sid in self.sessions_by_id and sid not in self.active_sessions
+        }
+        self.item_by_sid = {}
+        self.virtual_items = []
+        self.filter_text = filter_text.lower()
+
+        # 清空列表
+        self.tree.delete(*self.tree.get_children())
+
+        sessions = self.all_sessions
+        self.current_sessions = self.filter_sessions(self.filter_text)
+        self.row_numbers = {
+            s.get('sessionId', ''): idx + 1
+            for idx, s in enumerate(sessions)
+        }
+
+        # 旧的插入任务在列表重建后自动失效
+        self.render_generation += 1
+        generation = self.render_generation
+
+        self.virtual_mode = len(sessions) >= self.virtual_threshold
+        if self.virtual_mode:
+            self.view_offset = 0
+            self.render_virtual_window()
+            self.update_selected_count()
+            return
+
+        def insert_chunk(start, chunk_size):
+            if generation != self.render_generation:
+                return
+            end = min(start + chunk_size, len(sessions))
+            for idx in range(start, end):
+                session = sessions[idx]
+                values, tags = self.build_row(idx + 1, session)
+                item_id = self.tree.insert("", tk.END, values=values, tags=tags)
+                session_id = session.get('sessionId', '')
+                self.item_by_sid[session_id] = item_id
+
+                # 不符合当前搜索条件的行插入后立即隐藏
+                if not self.matches_filter(session_id):
+                    self.tree.detach(item_id)
+
+            self.update_selected_count()
+            if end < len(sessions):
+                self.root.after(1, insert_chunk, end, 500)
+
+        insert_chunk(0, 200)
+
+    # ============ 虚拟列表 ============
+
+    def render_virtual_window(self):
+        """把 current_sessions[view_offset:] 的可见部分填入复用的 Tk 行"""
+        total = len(self.current_sessions)
+        max_offset = max(0, total - self.visible_rows)
+        self.view_offset = max(0, min(self.view_offset, max_offset))
+        window = self.current_sessions[self.view_offset:self.view_offset +
+                                       self.visible_rows]
+
+        # 行池大小与可见行数一致，多退少补
+        while len(self.virtual_items) < len(window):
+            self.virtual_items.append(self.tree.insert("", tk.END))
+        while len(self.virtual_items) > len(window):
+            self.tree.delete(self.virtual_items.pop())
+
+        self.item_by_sid = {}
+        selected_item = None
+        for item_id, session in zip(self.virtual_items, window):
+            session_id = session.get('sessionId', '')
+            values, tags = self.build_row(self.row_numbers.get(session_id, 0),
+                                          session)
+            self.tree.item(item_id, values=values, tags=tags)
+            self.item_by_sid[session_id] = item_id
+            if session_id == self.selected_sid:
+                selected_item = item_id
+
+        # 行被复用后，选中状态跟随会话而不是 Tk 行
+        if selected_item is not None:
+            self.tree.selection_set(selected_item)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        if total > 0:
+            first = self.view_offset / total
+            last = (self.view_offset + len(window)) / total
+        else:
+            first, last = 0.0, 1.0
+        self.scrollbar_y.set(first, last)
+
+    def scroll_virtual(self, offset: int):
+        """把可见窗口移动到指定下标"""
+        if offset == self.view_offset:
+            return
+        self.view_offset = offset
+        self.render_virtual_window()
+
+    def on_yscroll(self, *args):
+        """滚动条回调：虚拟模式下把滚动位置换算为 current_sessions 下标"""
+        if not self.virtual_mode:
+            self.tree.yview(*args)
+            return
+
+        total = len(self.current_sessions)
+        if args[0] == "moveto":
+            self.scroll_virtual(int(float(args[1]) * total))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible_rows
+            self.scroll_virtual(self.view_offset + step)
+
+    def on_tree_yscroll(self, first, last):
+        """Treeview 自身的滚动位置只在普通模式下同步到滚动条"""
+        if not self.virtual_mode:
+            self.scrollbar_y.set(first, last)
+
+    def on_mouse_wheel(self, event):
+        """鼠标滚轮：虚拟模式下移动可见窗口"""
+        if not self.virtual_mode:
+            return None
+        if event.num == 4:
+            step = -3
+        elif event.num == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self.scroll_virtual(self.view_offset + step)
+        return "break"
+
+    def on_virtual_key(self, event):
+        """方向键/翻页键：虚拟模式下移动选中行，到达窗口边缘时滚动"""
+        if not self.virtual_mode or not self.current_sessions:
+            return None
+
+        step = {"Up": -1, "Down": 1,
+                "Prior": -self.visible_rows,
+                "Next": self.visible_rows}.get(event.keysym)
+        if step is None:
+            return None
+
+        position = self.view_offset
+        focus = self.tree.focus()
+        if focus in self.virtual_items:
+            position += self.virtual_items.index(focus)
+        position = max(0, min(position + step, len(self.current_sessions) - 1))
+
+        if position < self.view_offset:
+            self.view_offset = position
+        elif position >= self.view_offset + self.visible_rows:
+            self.view_offset = position - self.visible_rows + 1
+
+        self.selected_sid = self.current_sessions[position].get('sessionId')
+        self.render_virtual_window()
+        item_id = self.item_by_sid.get(self.selected_sid)
+        if item_id is not None:
+            self.tree.focus(item_id)
+            self.tree.see(item_id)
+        return "break"
+
+    def on_tree_configure(self, event):
+        """窗口大小变化时重新计算可见行数"""
+        rows = max(1, (event.height - 25) // 20)  # 表头约 25px，行高约 20px
+        if rows == self.visible_rows:
+            return
+        self.visible_rows = rows
+        if self.virtual_mode:
+            self.render_virtual_window()
+
+    def build_search_key(self, session: dict) -> str:
+        """生成会话的搜索键（display、标题、项目路径、Session ID 的小写拼接）"""
+        session_id = session.get('sessionId', '')
+        meta = self.session_meta.get(session_id)
+        title = ''
+        if meta:
+            title = meta.get('title') or meta.get('first_user_message') or ''
+        return '\n'.join((session.get('display', ''), title,
+                          session.get('project', ''), session_id)).lower()
+
+    def matches_filter(self, session_id: str) -> bool:
+        """判断会话是否符合当前搜索条件"""
+        if not self.filter_text:
+            return True
+        return self.filter_text in self.search_keys.get(session_id, '')
+
+    def filter_sessions(self, filter_text: str) -> list:
+        """按搜索键表过滤会话（纯内存操作）"""
+        if not filter_text:
+            return self.all_sessions
+        return [
+            s for s in self.all_sessions
+            if filter_text in self.search_keys.get(s.get('sessionId'), '')
+        ]
+
+    def apply_filter(self, filter_text: str):
+        """应用搜索条件：只对已插入的行做 detach/reattach，不重建列表"""
+        self.search_after_id = None
+        self.filter_text = filter_text.lower()
+        self.current_sessions = self.filter_sessions(self.filter_text)
+
+        if self.virtual_mode:
+            self.view_offset = 0
+            self.render_virtual_window()
+            return
+
+        # 尚未插入的行会在插入时自行判断是否隐藏
+        items = [
+            self.item_by_sid[s.get('sessionId')]
+            for s in self.current_sessions
+            if s.get('sessionId') in self.item_by_sid
+        ]
+        self.tree.set_children("", *items)
+
+    def build_row(self, idx: int, session: dict) -> tuple:
+        """生成会话行的 (values, tags)，标题和大小取自已计算的元数据"""
+        session_id = session.get('sessionId', '')
+        display = session.get('display', 'N/A')
+        timestamp = session.get('timestamp', 0)
+        project_full = session.get('project', 'N/A')  # 完整路径用于计算文件大小
+
+        # 检查是否是活跃会话
+        is_active = session_id in self.active_sessions
+
+        # 元数据由后台线程计算，尚未算出时先显示 history 中的内容
+        meta = self.session_meta.get(session_id)
+
+        # 优先显示会话名称（customTitle），如果没有则使用 display
+        session_title = None
+        if meta:
+            session_title = meta.get('title') or meta.get('first_user_message')
+        if session_title:
+            display = session_title
+        else:
+            # 简化显示
+            if len(display) > 40:
+                display = display[:37] + "..."
+        project_display = project_full
+        if len(project_display) > 30:
+            project_display = "..." + project_display[-27:]
+
+        file_size = meta.get('size', 0) if meta else 0
+
+        # 检查是否是本地命令
+        is_local_command = self.is_local_command(display)
+
+        is_archived = bool(meta and meta.get('archived'))
+
+        # 状态列显示
+        if is_active:
+            status = "🟢 运行中"
+        elif is_archived:
+            status = "🗄️ 已归档"
+        else:
+            status = ""
+
+        # 文件类型和文件大小显示
+        if is_local_command:
+            file_type = "本地命令"
+            size_str = "-"
+            tags = ("local_command", )
+        elif file_size > 0:
+            file_type = "对话文件"
+            size_str = self.data.format_size(file_size)
+            tags = ("has_data", )
+        else:
+            file_type = "对话文件"
+            size_str = "-" if meta is not None else "…"
+            tags = ("no_data", )
+        if is_archived:
+            tags = ("archived", )
+
+        # 活跃会话使用特殊标签
+        if is_active:
+            tags = ("active_session", )
+
+        check = "🚫" if is_active else "☐"
+        if session_id in self.checked_sessions:
+            check = "☑"
+
+        values = (check, idx, status, display, file_type,
+                  self.data.format_timestamp(timestamp), size_str,
+                  project_display, session_id)
+        if self.data.multi_root:
+            values = values[:7] + (session.get('root', ''), ) + values[7:]
+        return values, tags
+
+    def apply_session_meta(self, metas: list):
+        """后台算出的标题和大小填入已插入的行"""
+        for session_id, meta in metas:
+            self.session_meta[session_id] = meta
+            session = self.sessions_by_id.get(session_id)
+            if session is None:
+                continue
+            self.search_keys[session_id] = self.build_search_key(session)
+            item_id = self.item_by_sid.get(session_id)
+            if item_id is None:
+                continue
+            values, tags = self.build_row(self.row_numbers.get(session_id, 0),
+                                          session)
+            self.tree.item(item_id, values=values, tags=tags)
+
+        # 标题变化可能影响搜索结果
+        if self.filter_text:
+            self.schedule_filter()
+
+    # ============ 文件监视 ============
+
+    WATCH_POLL_MS = 300
+    ACTIVE_TICK_MS = 30000  # 活跃状态过期检查间隔
+
+    def start_watcher(self):
+        """启动存储监视线程，文件变化时只更新受影响的行"""
+        self.watchers = [
+            StorageWatcher(claude_dir, self._on_storage_events)
+            for claude_dir in self.data.claude_dirs
+        ]
+        for watcher in self.watchers:
+            watcher.start()
+        self.root.after(self.WATCH_POLL_MS, self._poll_watch_queue)
+        self.root.after(self.ACTIVE_TICK_MS, self._tick_active)
+
+    def stop_watcher(self):
+        """停止存储监视"""
+        for watcher in self.watchers:
+            watcher.stop()
+        self.watchers = []
+
+    def _on_storage_events(self, events: set):
+        """监视线程：把文件事件增量应用到数据层，结果交给界面线程"""
+        with self.load_lock:
+            changes = self.data.apply_storage_events(events)
+            if changes['sessions']:
+                changes['session_list'] = (self.data.get_unique_sessions(),
+                                           self.data.sessions_by_id)
+            changes['active'] = set(self.data.active_session_ids)
+        self.watch_queue.put(changes)
+
+    def _poll_watch_queue(self):
+        """界面线程：应用监视线程送来的变化（完整加载期间暂缓）"""
+        if not self.watchers:
+            return
+        if not self.loading:
+            while True:
+                try:
+                    changes = self.watch_queue.get_nowait()
+                except queue.Empty:
+                    break
+                self.apply_storage_changes(changes)
+                if self.loading:
+                    break
+        self.root.after(self.WATCH_POLL_MS, self._poll_watch_queue)
+
+    def _tick_active(self):
+        """定时让超过时限没有活动的会话退出运行中状态（不读文件）"""
+        if not self.watchers:
+            return
+        if not self.loading and self.load_lock.acquire(blocking=False):
+            try:
+                changed = self.data.refresh_active()
+                active = set(self.data.active_session_ids)
+            finally:
+                self.load_lock.release()
+            if changed:
+                self.set_active_sessions(active, changed)
+        self.root.after(self.ACTIVE_TICK_MS, self._tick_active)
+
+    def apply_storage_changes(self, changes: dict):
+        """把数据层的增量变化反映到列表、状态和统计栏"""
+        if changes['reload']:
+            self.load_data()
+            return
+
+        # 先更新活跃状态，后面重建的行直接使用新状态
+        self.set_active_sessions(
+            changes['active'],
+            changes['active_changed'] - changes['meta'].keys())
+
+        if 'session_list' in changes:
+            self.apply_session_list(*changes['session_list'])
+
+        metas = [(sid, meta or {}) for sid, meta in changes['meta'].items()
+                 if sid in self.sessions_by_id]
+        if metas:
+            self.apply_session_meta(metas)
+
+        # 清单由上次扫描得到；尚未扫描时不在界面线程补扫
+        if self.data.inventory is not None:
+            self.update_stats()
+
+    def apply_session_list(self, sessions: list, sessions_by_id: dict):
+        """history 追加了记录：顺序不变时只刷新变化的行，否则重建列表"""
+        old_by_id = self.sessions_by_id
+        same_order = (len(sessions) == len(self.all_sessions) and all(
+            a.get('sessionId') == b.get('sessionId')
+            for a, b in zip(sessions, self.all_sessions)))
+
+        self.all_sessions = sessions
+        self.sessions_by_id = sessions_by_id
+        changed = [
+            sid for sid, session in sessions_by_id.items()
+            if old_by_id.get(sid) is not session
+        ]
+        for sid in changed:
+            self.search_keys[sid] = self.build_search_key(sessions_by_id[sid])
+
+        if not same_order:
+            self.update_session_list(self.search_var.get())
+            return
+        for sid in changed:
+            self.refresh_row(sid)
+        if self.filter_text:
+            self.schedule_filter()
+
+    def set_active_sessions(self, active: set, changed):
+        """更新活跃会话集合，并刷新状态变化的行"""
+        self.active_sessions = active
+        # 运行中的会话不能被勾选删除
+        if self.checked_sessions & active:
+            self.checked_sessions -= active
+            self.update_selected_count()
+        for sid in changed:
+            self.refresh_row(sid)
+
+    def refresh_row(self, session_id: str):
+        """按当前数据重新生成一行（行不在列表中时忽略）"""
+        item_id = self.item_by_sid.get(session_id)
+        session = self.sessions_by_id.get(session_id)
+        if item_id is None or session is None:
+            return
+        values, tags = self.build_row(self.row_numbers.get(session_id, 0),
+                                      session)
+        self.tree.item(item_id, values=values, tags=tags)
+
+    def update_stats(self):
+        """更新统计信息"""
+        total = len(self.data.sessions)
+        unique = len(self.all_sessions)
+
+        # 统计所有相关文件（清单由加载线程扫描，界面线程不补扫）
+        inventory = self.data.inventory
+        if inventory is None:
+            self.stats_label.config(
+                text=f"📊 会话记录: {total} 条 | 🎯 独立会话: {unique} 个 | "
+                f"⏳ 正在扫描存储...")
+            return
+        debug_count, debug_size = inventory.get_kind_totals('debug_files')
+
+        total_conv_size = 0
+        conv_count = 0
+        for session in self.all_sessions:
+            sid = session.get('sessionId')
+            size = inventory.get_kind_size(sid, 'conversation_files')
+            if size > 0:
+                conv_count += 1
+                total_conv_size += size
+
+        archive_count, archive_size = inventory.get_kind_totals('archives')
+
+        history_size = inventory.history_size
+        total_size = history_size + debug_size + total_conv_size + archive_size
+
+        text = (
+            f"📊 会话记录: {total} 条 | 🎯 独立会话: {unique} 个 | "
+            f"💬 对话文件: {conv_count} 个 ({self.data.format_size(total_conv_size)}) | "
+            f"🐛 Debug: {debug_count} 个 ({self.data.format_size(debug_size)}) | ")
+        if archive_count:
+            text += (f"🗄️ 归档: {archive_count} 个 "
+                     f"({self.data.format_size(archive_size)}) | ")
+        text += f"💾 总存储: {self.data.format_size(total_size)}"
+
+        self.stats_label.config(text=text)
+
+    TASK_POLL_MS = 100
+
+    def run_data_task(self, action: str, task, on_done):
+        """在后台线程中持有 load_lock 执行会修改数据层的操作
+
+        task(progress_callback) 的返回值交给界面线程的 on_done(result)，
+        进度显示在统计栏；出错时弹出提示并重新加载。
+        """
+        self.busy = action
+        self.stats_label.config(text=f"⏳ {action}中...")
+        task_queue = queue.Queue()
+
+        def progress(done, total, outcome=None):
+            task_queue.put(('progress', (done, total)))
+
+        def worker():
+            try:
+                with self.load_lock:
+                    result = task(progress)
+                task_queue.put(('done', result))
+            except Exception as e:
+                task_queue.put(('error', str(e)))
+
+        def poll():
+            last_progress = None
+            while True:
+                try:
+                    kind, payload = task_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == 'progress':
+                    last_progress = payload
+                    continue
+                self.busy = None
+                if kind == 'error':
+                    self.load_data()
+                    messagebox.showerror(f"{action}失败", f"❌ {payload}")
+                else:
+                    on_done(payload)
+                return
+            if last_progress:
+                self.stats_label.config(
+                    text=f"⏳ {action}中... {last_progress[0]}/{last_progress[1]}")
+            self.root.after(self.TASK_POLL_MS, poll)
+
+        self.preview_executor.submit(worker)
+        self.root.after(self.TASK_POLL_MS, poll)
+
+    def update_selected_count(self):
+        """更新选中计数"""
+        count = len(self.checked_sessions)
+        self.selected_count_label.config(text=f"已选: {count}")
+        state = "normal" if count > 0 else "disabled"
+        self.delete_selected_btn.config(state=state)
+        self.archive_selected_btn.config(state=state)
+        self.restore_selected_btn.config(state=state)
+
+    def update_file_size_distribution(self, session):
+        """更新右侧文件大小分布面板（针对选中会话）"""
+        self.stats_text.config(state="normal")
+        self.stats_text.delete(1.0, tk.END)
+
+        session_id = session.get('sessionId', '')
+        self.distribution_sid = session_id
+
+        # 统计该会话的文件大小（从存储清单读取）；清单尚未扫描完时先显示占位，
+        # 加载线程送来 'stats' 消息后再填入
+        inventory = self.data.inventory
+        if inventory is None:
+            self.stats_text.insert(tk.END, f"📁 会话文件分布\n\n", "title")
+            self.stats_text.insert(tk.END, "⏳ 扫描中…\n", "placeholder")
+            self.stats_text.config(state="disabled")
+            return
+        conv_size = inventory.get_kind_size(session_id, 'conversation_files')
+        debug_size = inventory.get_kind_size(session_id, 'debug_files')
+        session_env_size = inventory.get_kind_size(session_id, 'session_envs')
+        file_hist_size = inventory.get_kind_size(session_id, 'file_histories')
+        todo_size = inventory.get_kind_size(session_id, 'todos')
+        todo_count = len(
+            inventory.get_artifacts(session_id).get('todos', []))
+        archive_size = inventory.get_kind_size(session_id, 'archives')
+
+        # 总计
+        total = (conv_size + debug_size + session_env_size + file_hist_size +
+                 todo_size + archive_size)
+
+        # 显示统计
+        self.stats_text.insert(tk.END, f"📁 会话文件分布\n\n", "title")
+        self.stats_text.insert(tk.END, f"Session ID: {session_id[:12]}...\n\n",
+                               "label")
+
+        # 对话文件
+        if conv_size > 0:
+            self.stats_text.insert(tk.END, "💬 对话文件\n", "label")
+            self.stats_text.insert(
+                tk.END, f"  大小: {self.data.format_size(conv_size)}\n", "value")
+            pct = (conv_size / total * 100) if total > 0 else 0
+            self.stats_text.insert(tk.END, f"  占比: {pct:.1f}%\n\n", "value")
+        else:
+            self.stats_text.insert(tk.END, "💬 对话文件\n", "label")
+            self.stats_text.insert(tk.END, "  (无文件)\n\n", "placeholder")
+
+        # Debug 文件
+        if debug_size > 0:
+            self.stats_text.insert(tk.END, "🐛 Debug 日志\n", "label")
+            self.stats_text.insert(
+                tk.END, f"  大小: {self.data.format_size(debug_size)}\n",
+                "value")
+            pct = (debug_size / total * 100) if total > 0 else 0
+            self.stats_text.insert(tk.END, f"  占比: {pct:.1f}%\n\n", "value")
+        else:
+            self.stats_text.insert(tk.END, "🐛 Debug 日志\n", "label")
+            self.stats_text.insert(tk.END, "  (无文件)\n\n", "placeholder")
+
+        # Session-env
+        if session_env_size > 0:
+            self.stats_text.insert(tk.END, "📦 Session 环境\n", "label")
+            self.stats_text.insert(
+                tk.END, f"  大小: {self.data.format_size(session_env_size)}\n",
+                "value")
+            pct = (session_env_size / total * 100) if total > 0 else 0
+            self.stats_text.insert(tk.END, f"  占比: {pct:.1f}%\n\n", "value")
+
+        # File-history
+        if file_hist_size > 0:
+            self.stats_text.insert(tk.END, "📜 文件历史\n", "label")
+            self.stats_text.insert(
+                tk.END, f"  大小: {self.data.format_size(file_hist_size)}\n",
+                "value")
+            pct = (file_hist_size / total * 100) if total > 0 else 0
+            self.stats_text.insert(tk.END, f"  占比: {pct:.1f}%\n\n", "value")
+
+        # Todos
+        if todo_count > 0:
+            self.stats_text.insert(tk.END, "📝 Todo 记录\n", "label")
+            self.stats_text.insert(tk.END, f"  数量: {todo_count} 个\n", "label")
+            self.stats_text.insert(
+                tk.END, f"  大小: {self.data.format_size(todo_size)}\n", "value")
+            pct = (todo_size / total * 100) if total > 0 else 0
+            self.stats_text.insert(tk.END, f"  占比: {pct:.1f}%\n\n", "value")
+
+        # 归档（对话、日志等已压缩到一个文件中）
+        if archive_size > 0:
+            self.stats_text.insert(tk.END, "🗄️ 归档文件\n", "label")
+            self.stats_text.insert(
+                tk.END, f"  大小: {self.data.format_size(archive_size)}\n",
+                "value")
+            pct = (archive_size / total * 100) if total > 0 else 0
+            self.stats_text.insert(tk.END, f"  占比: {pct:.1f}%\n\n", "value")
+
+        # 分隔线
+        self.stats_text.insert(tk.END, "─" * 25 + "\n\n", "separator")
+
+        # 总计
+        self.stats_text.insert(tk.END, "💾 该会话总大小\n", "label")
+        self.stats_text.insert(tk.END, f"  {self.data.format_size(total)}\n",
+                               "total")
+
+        self.stats_text.config(state="disabled")
+
+    def on_search(self, *args):
+        """搜索事件（防抖：停止输入一段时间后才过滤）"""
+        self.schedule_filter()
+
+    def schedule_filter(self, delay: int = 150):
+        """延迟执行过滤，期间的新输入会重新计时"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(
+            delay, lambda: self.apply_filter(self.search_var.get()))
+
+    def on_click(self, event):
+        """点击事件 - 处理勾选框"""
+        region = self.tree.identify_region(event.x, event.y)
+        if region != "cell":
+            return
+
+        column = self.tree.identify_column(event.x)
+        if column != "#1":
+            return
+
+        item = self.tree.identify_row(event.y)
+        if not item:
+            return
+
+        self.toggle_check_for_item(item)
+
+    def toggle_check_for_item(self, item):
+        """切换指定项的选中状态"""
+        current = self.tree.set(item, "check")
+        session_id = self.tree.set(item, "session_id")
+        status = self.tree.set(item, "status")
+
+        # 活跃会话不允许选中
+        if "运行中" in status:
+            messagebox.showwarning("操作限制",
+                "⚠️ 该会话正在运行中，无法选中或删除。\n\n"
+                "请等待会话结束后再进行此操作。")
+            return
+
+        if current == "☐":
+            self.tree.set(item, "check", "☑")
+            self.checked_sessions.add(session_id)
+        else:
+            self.tree.set(item, "check", "☐")
+            self.checked_sessions.discard(session_id)
+
+        self.update_selected_count()
+
+    def on_select(self, event):
+        """选择事件"""
+        selection = self.tree.selection()
+        if selection:
+            item = selection[0]
+            session_id = self.tree.set(item, "session_id")
+            # 虚拟模式下滚动会重新选中同一会话，无需重复刷新预览
+            if self.virtual_mode and session_id == self.selected_sid:
+                return
+            self.selected_sid = session_id
+
+            session = self.sessions_by_id.get(session_id)
+            if session:
+                self.show_session_info(session)
+
+    def on_double_click(self, event):
+        """双击事件 - 查看对话"""
+        selection = self.tree.selection()
+        if not selection:
+            return
+
+        item = selection[0]
+        session_id = self.tree.set(item, "session_id")
+        display = self.tree.set(item, "display")
+
+        # 从会话索引中获取完整的 project 路径
+        session = self.sessions_by_id.get(session_id)
+
+        if not session:
+            messagebox.showwarning("错误", "未找到会话信息")
+            return
+
+        project = session.get('project', 'N/A')
+
+        # 检查是否是本地命令
+        if self.is_local_command(display):
+            if (not self.data.get_debug_file(session_id).exists()
+                    and self.data.is_archived(session_id)):
+                messagebox.showinfo(
+                    "已归档", f"该会话的调试日志已归档，恢复后查看\n\nSession ID: {session_id}")
+                return
+            DebugLogViewer(self.root, session_id, display, self.data)
+            return
+
+        conv_file = self.data.get_conversation_file(session_id, project)
+        if not conv_file.exists() and not self.data.is_archived(session_id):
+            messagebox.showwarning(
+                "无法查看",
+                f"该会话没有对话数据文件\n\nSession ID: {session_id}\n项目路径: {project}")
+            return
+
+        ConversationViewer(self.root, session_id, project, display, self.data)
+
+    def open_fulltext_search(self):
+        """打开全文搜索窗口"""
+        if not FullTextIndex.is_available():
+            messagebox.showwarning("全文搜索",
+                                   "❌ 当前 Python 的 sqlite3 不支持 FTS5，无法使用全文搜索。")
+            return
+        FullTextSearchWindow(self.root, self.data, self.open_session)
+
+    def open_session(self, session_id: str, keyword: str = None):
+        """按 Session ID 打开对话查看器，可选地定位到关键词"""
+        session = self.sessions_by_id.get(session_id)
+        if not session:
+            messagebox.showwarning(
+                "无法查看", f"该会话不在 history.jsonl 索引中\n\nSession ID: {session_id}")
+            return
+
+        project = session.get('project', 'N/A')
+        meta = self.session_meta.get(session_id)
+        name = session.get('display', 'N/A')
+        if meta:
+            name = meta.get('title') or meta.get('first_user_message') or name
+
+        viewer = ConversationViewer(self.root, session_id, project, name,
+                                    self.data)
+        if keyword:
+            viewer.search_var.set(keyword)
+            viewer.search_text()
+
+    def show_context_menu(self, event):
+        """显示右键菜单"""
+        item = self.tree.identify_row(event.y)
+        if item:
+            self.tree.selection_set(item)
+            self.context_menu.post(event.x_root, event.y_root)
+
+    def view_conversation(self):
+        """查看对话"""
+        self.on_double_click(None)
+
+    def toggle_check(self):
+        """切换选中项的勾选状态"""
+        selection = self.tree.selection()
+        if selection:
+            self.toggle_check_for_item(selection[0])
+
+    def select_all(self):
+        """全选当前搜索结果（跳过活跃会话）"""
+        for session in self.current_sessions:
+            session_id = session.get('sessionId', '')
+            # 跳过活跃会话
+            if session_id not in self.active_sessions:
+                self.checked_sessions.add(session_id)
+        self.refresh_check_marks()
+
+    def deselect_all(self):
+        """取消全选（包括被搜索隐藏的已选会话）"""
+        self.checked_sessions.clear()
+        self.refresh_check_marks()
+
+    def refresh_check_marks(self):
+        """按 checked_sessions 刷新已插入行的勾选列"""
+        for session_id, item_id in self.item_by_sid.items():
+            if session_id in self.active_sessions:
+                continue
+            check = "☑" if session_id in self.checked_sessions else "☐"
+            self.tree.set(item_id, "check", check)
+        self.update_selected_count()
+
+    def collect_deletion_preview(self, session_id: str, project_path: str,
+                                 inventory) -> dict:
+        """从存储清单收集会话删除预览信息"""
+        preview = {
+            'session_id': session_id,
+            'project_path': project_path,
+            'files': [],
+            'dirs': [],
+            'total_size': 0
+        }
+
+        # 从存储清单读取该会话的关联文件
+        artifacts = inventory.get_artifacts(session_id)
+        for kind, type_label in KIND_LABELS.items():
+            for item in artifacts.get(kind, []):
+                entry = {
+                    'path': str(item['path']),
+                    'size': item['size'],
+                    'type': type_label
+                }
+                preview['dirs' if item['is_dir'] else 'files'].append(entry)
+                preview['total_size'] += item['size']
+
+        return preview
+
+    def show_deletion_preview_dialog(self, to_delete: list) -> bool:
+        """显示删除预览对话框（预览在后台计算，逐个会话显示）"""
+        dialog = ScanPreviewDialog(self, "删除预览", "⚠️ 即将删除以下文件")
+        dialog.text.tag_config("session_header",
+                               foreground="#0066cc",
+                               font=("", 11, "bold"))
+        dialog.text.tag_config("dir_path", foreground="#008800")
+
+        totals = {'sessions': 0, 'files': 0, 'dirs': 0, 'size': 0}
+
+        def worker(post, cancel_event):
+            # 存储清单尚未就绪时在后台扫描
+            inventory = self.data.inventory
+            if inventory is None:
+                inventory = self.data.scan_storage(
+                    on_progress=lambda done, total: post(
+                        ('progress', (done, total))),
+                    cancel_event=cancel_event)
+            for done, (session_id, project_path) in enumerate(to_delete, 1):
+                if cancel_event.is_set():
+                    return
+                post(('preview',
+                      self.collect_deletion_preview(session_id, project_path,
+                                                    inventory)))
+                post(('progress', (done, len(to_delete))))
+
+        def on_message(kind, preview):
+            if kind != 'preview':
+                return
+            totals['sessions'] += 1
+            totals['files'] += len(preview['files'])
+            totals['dirs'] += len(preview['dirs'])
+            totals['size'] += preview['total_size']
+            dialog.set_stats(
+                f"会话数: {totals['sessions']}/{len(to_delete)} | "
+                f"文件数: {totals['files']} | 目录数: {totals['dirs']} | "
+                f"总大小: {self.data.format_size(totals['size'])}")
+
+            size_text = self.data.format_size(preview['total_size'])
+            dialog.write(f"\n{'='*80}\n\n", "session_header",
+                         f"会话 {totals['sessions']}/{len(to_delete)}\n",
+                         "session_header",
+                         f"Session ID: {preview['session_id']}\n", "file_path",
+                         f"项目路径: {preview['project_path']}\n", "file_path",
+                         f"总大小: {size_text}\n\n", "file_size")
+            if preview['files']:
+                dialog.write("  📄 文件:\n", "file_path")
+                for f in preview['files']:
+                    dialog.add_entry(f"    [{f['type']}] {f['path']}",
+                                     "file_path",
+                                     f" ({self.data.format_size(f['size'])})\n",
+                                     "file_size")
+            if preview['dirs']:
+                dialog.write("  📁 目录:\n", "dir_path")
+                for d in preview['dirs']:
+                    dialog.add_entry(f"    [{d['type']}] {d['path']}",
+                                     "dir_path",
+                                     f" ({self.data.format_size(d['size'])})\n",
+                                     "file_size")
+
+        return dialog.run(worker, on_message)
+
+    def delete_selected(self):
+        """删除选中的会话"""
+        if not self.checked_sessions:
+            return
+        if not self.check_not_loading():
+            return
+
+        # 收集所有要删除的会话信息，并检查是否有活跃会话
+        to_delete = []
+        active_sessions = []
+        for session_id in list(self.checked_sessions):
+            session = self.sessions_by_id.get(session_id)
+            if not session:
+                continue
+            # 检查是否是活跃会话
+            if session_id in self.active_sessions:
+                active_sessions.append(session_id)
+            else:
+                to_delete.append((session_id, session.get('project', 'N/A')))
+
+        # 如果有活跃会话被选中，显示警告
+        if active_sessions:
+            messagebox.showwarning("操作限制",
+                f"⚠️ 检测到 {len(active_sessions)} 个活跃会话无法删除：\n\n" +
+                "\n".join([f"  • {sid[:20]}..." for sid in active_sessions[:3]]) +
+                (f"\n  ... 还有 {len(active_sessions) - 3} 个" if len(active_sessions) > 3 else "") +
+                "\n\n请等待会话结束后再进行删除操作。")
+
+        # 如果没有可删除的会话，直接返回
+        if not to_delete:
+            return
+
+        # 显示预览对话框（后台收集删除预览信息）
+        if not self.show_deletion_preview_dialog(to_delete):
+            return
+
+        # 在后台执行删除（history.jsonl 只重写一次）
+        def on_done(batch_result):
+            deleted = batch_result['deleted']
+            failed = batch_result['failed']
+
+            self.checked_sessions.clear()
+            self.load_data()
+
+            messagebox.showinfo(
+                "删除完成",
+                f"成功删除: {deleted} 个\n" + (f"失败: {failed} 个" if failed > 0 else ""))
+
+        self.run_data_task(
+            "删除会话",
+            lambda progress: self.data.delete_sessions(
+                to_delete, progress_callback=progress), on_done)
+
+    def archive_selected(self):
+        """把选中的会话压缩归档（运行中和已归档的会话跳过）"""
+        if not self.checked_sessions:
+            return
+        if not self.check_not_loading():
+            return
+
+        to_archive = []
+        skipped = 0
+        for session_id in list(self.checked_sessions):
+            session = self.sessions_by_id.get(session_id)
+            if not session:
+                continue
+            if (session_id in self.active_sessions
+                    or self.data.is_archived(session_id)):
+                skipped += 1
+            else:
+                to_archive.append((session_id, session.get('project', 'N/A')))
+
+        if not to_archive:
+            messagebox.showinfo("归档", "选中的会话都在运行中或已归档，没有需要归档的会话。")
+            return
+
+        if not messagebox.askyesno(
+                "确认归档",
+                f"将 {len(to_archive)} 个会话的对话、Debug 日志、Session 环境、"
+                f"文件历史和 Todo 记录压缩为归档，并删除原文件。\n\n"
+                f"归档后的会话仍显示在列表中，可以查看对话，需要时可一键恢复。" +
+                (f"\n\n（跳过 {skipped} 个运行中或已归档的会话）" if skipped else "")):
+            return
+
+        # 在后台压缩（xz 压缩较慢，不能阻塞界面）
+        def on_done(batch_result):
+            self.checked_sessions.clear()
+            self.load_data()
+
+            errors = [
+                f"  • {sid[:20]}...: {result['error']}"
+                for sid, result in batch_result['sessions'].items()
+                if 'error' in result
+            ]
+            messagebox.showinfo(
+                "归档完成",
+                f"成功归档: {batch_result['archived']} 个\n"
+                f"原大小: {self.data.format_size(batch_result['original_size'])} → "
+                f"归档大小: {self.data.format_size(batch_result['archive_size'])}" +
+                (f"\n\n失败: {batch_result['failed']} 个\n" + "\n".join(errors[:5])
+                 if errors else ""))
+
+        self.run_data_task(
+            "归档会话",
+            lambda progress: self.data.archive_sessions(
+                to_archive, progress_callback=progress), on_done)
+
+    def restore_selected(self):
+        """把选中的已归档会话解压回原位置"""
+        if not self.checked_sessions:
+            return
+        if not self.check_not_loading():
+            return
+
+        to_restore = [
+            session_id for session_id in self.checked_sessions
+            if self.data.is_archived(session_id)
+        ]
+        if not to_restore:
+            messagebox.showinfo("恢复归档", "选中的会话中没有已归档的会话。")
+            return
+
+        def on_done(batch_result):
+            self.checked_sessions.clear()
+            self.load_data()
+
+            errors = [
+                f"  • {sid[:20]}...: {result['error']}"
+                for sid, result in batch_result['sessions'].items()
+                if 'error' in result
+            ]
+            messagebox.showinfo(
+                "恢复完成", f"成功恢复: {batch_result['restored']} 个" +
+                (f"\n\n失败: {batch_result['failed']} 个\n" + "\n".join(errors[:5])
+                 if errors else ""))
+
+        # 在后台解压
+        self.run_data_task(
+            "恢复归档",
+            lambda progress: self.data.restore_sessions(
+                to_restore, progress_callback=progress), on_done)
+
+    def show_cleanup_preview_dialog(self, valid_session_ids: set):
+        """显示清理预览对话框
+
+        在后台重新扫描存储，无索引文件边扫描边显示。
+        确认后返回本次扫描的存储清单（预览和实际清理使用同一份），
+        取消时返回 None。
+        """
+        warning_text = ("❗ 重要安全警告：\n"
+                        "  • 此操作将删除所有不在 history.jsonl 索引中的文件\n"
+                        "  • 如果您之前手动编辑过 history.jsonl，可能误删正在使用的会话\n"
+                        "  • 建议先备份 ~/.claude 目录\n"
+                        "  • 删除后将无法恢复文件")
+        dialog = ScanPreviewDialog(self,
+                                   "清理无索引数据 - 预览",
+                                   "⚠️ 危险操作 - 即将删除无索引文件",
+                                   geometry="1000x700",
+                                   warning=warning_text,
+                                   final_confirm="⚠️ 您确定要删除这些文件吗？\n\n"
+                                   "此操作不可撤销！")
+        dialog.text.tag_config("session_id", foreground="#666666")
+
+        totals = {'items': 0, 'size': 0}
+        scanned = {}
+
+        def worker(post, cancel_event):
+            def on_item(kind, item):
+                if (kind in StorageInventory.ORPHAN_KINDS
+                        and item['session_id'] not in valid_session_ids):
+                    post(('item', (kind, item)))
+
+            inventory = self.data.scan_storage(
+                on_item=on_item,
+                on_progress=lambda done, total: post(
+                    ('progress', (done, total))),
+                cancel_event=cancel_event)
+            post(('inventory', inventory))
+
+        def on_message(kind, payload):
+            if kind == 'inventory':
+                scanned['inventory'] = payload
+                return
+            if kind != 'item':
+                return
+            item_kind, item = payload
+            totals['items'] += 1
+            totals['size'] += item['size']
+            dialog.set_stats(
+                f"有效索引会话: {len(valid_session_ids)} 个 | "
+                f"将删除: {totals['items']} 项 | "
+                f"总大小: {self.data.format_size(totals['size'])}")
+            dialog.add_entry(f"  [{KIND_LABELS[item_kind]}] ", "category",
+                             f"[{item['session_id'][:20]}...]", "session_id",
+                             f" {item['path']}", "file_path",
+                             f" ({self.data.format_size(item['size'])})\n",
+                             "file_size")
+
+        def can_confirm():
+            if totals['items'] == 0:
+                dialog.set_stats("✅ 没有发现需要清理的无索引文件，"
+                                 "所有文件都有有效的索引记录。")
+                return False
+            return True
+
+        if not dialog.run(worker, on_message, can_confirm):
+            return None
+        return scanned.get('inventory')
+
+    def cleanup_orphaned(self):
+        """清理无索引数据"""
+        if not self.check_not_loading():
+            return
+        valid_session_ids = self.data.get_all_session_ids()
+
+        # 显示预览对话框（后台重新扫描存储，预览和实际清理使用同一份清单）
+        inventory = self.show_cleanup_preview_dialog(valid_session_ids)
+        if inventory is None:
+            return
+
+        # 在后台执行清理
+        self.run_data_task(
+            "清理无索引数据",
+            lambda progress: self.data.cleanup_orphaned_files(
+                progress_callback=progress, inventory=inventory),
+            self.show_cleanup_result)
+
+    def show_cleanup_result(self, cleanup_result: dict):
+        """显示清理无索引数据的结果"""
+        details = cleanup_result.get('details', [])
+        max_details = 30
+        details_text = "\n".join(details[:max_details])
+        if len(details) > max_details:
+            details_text += f"\n... 还有 {len(details) - max_details} 项"
+
+        summary = f"""清理完成！
+
+已删除:
+  - Debug 文件: {cleanup_result['debug_files']} 个
+  - 对话文件: {cleanup_result['conversation_files']} 个
+  - Session 环境: {cleanup_result['session_envs']} 个
+  - 文件历史: {cleanup_result['file_histories']} 个
+  - Todo 文件: {cleanup_result['todos']} 个
+
+释放空间: {self.data.format_size(cleanup_result['total_size_freed'])}
+
+详情:
+{details_text if details_text else '无文件需要清理'}
+"""
+
+        self.load_data()
+        messagebox.showinfo("清理完成", summary)
+
+    def cleanup_old_snapshots(self):
+        """清理旧的 shell-snapshot 文件：填写保留策略，后台试运行后确认删除"""
+        if not self.check_not_loading():
+            return
+
+        # 先检查 snapshot 目录是否存在
+        snapshots_dirs = [
+            claude_dir / 'shell-snapshots' for claude_dir in self.data.claude_dirs
+        ]
+        if not any(d.exists() for d in snapshots_dirs):
+            messagebox.showinfo("清理旧快照",
+                "✅ 没有发现 shell-snapshot 文件。\n\n目录不存在: " +
+                ", ".join(str(d) for d in snapshots_dirs))
+            return
+
+        policy = SnapshotPolicyDialog(self.root, self.snapshot_settings).show()
+        if policy is None:
+            return
+
+        def on_plan(plan: dict):
+            total_snapshots = plan['total_snapshots']
+            if total_snapshots == 0:
+                messagebox.showinfo("清理旧快照",
+                    "✅ 没有发现需要清理的 snapshot 文件。")
+                return
+            if plan['deleted_snapshots'] == 0:
+                messagebox.showinfo("清理旧快照",
+                    f"✅ 按当前策略全部 {total_snapshots} 个快照都会保留，"
+                    f"没有需要删除的快照。")
+                return
+
+            rules = "\n".join(f"  • {rule}"
+                              for rule in self.describe_snapshot_policy(policy))
+            # 显示确认对话框
+            result = messagebox.askyesno(
+                "清理旧快照",
+                f"📸 Shell Snapshot 清理\n\n"
+                f"当前状态:\n"
+                f"  总快照数: {total_snapshots} 个\n"
+                f"  活跃会话快照: {len(plan['active_preserved'])} 个（将保留）\n\n"
+                f"清理规则:\n{rules}\n\n"
+                f"将删除: {plan['deleted_snapshots']} 个"
+                f"（{self.data.format_size(plan['total_size_freed'])}）\n\n"
+                f"⚠️ 删除后的快照无法恢复，确定要继续吗？",
+                icon="question"
+            )
+            if not result:
+                return
+
+            # 在后台执行清理
+            self.run_data_task(
+                "清理旧快照",
+                lambda progress: self.data.cleanup_old_snapshots(
+                    policy=policy), self.show_snapshot_cleanup_result)
+
+        # 先在后台按保留策略试运行，得到将删除的快照
+        self.run_data_task(
+            "分析快照",
+            lambda progress: self.data.cleanup_old_snapshots(
+                dry_run=True, policy=policy), on_plan)
+
+    def describe_snapshot_policy(self, policy: SnapshotRetentionPolicy) -> list:
+        """快照保留策略的文字说明（每条规则一行）"""
+        rules = ["保留所有活跃会话的快照"]
+        keep_rules = []
+        if policy.keep_count is not None:
+            keep_rules.append(f"最新的 {policy.keep_count} 个")
+        if policy.keep_per_shell is not None:
+            keep_rules.append(f"每种 shell 最新的 {policy.keep_per_shell} 个")
+        if policy.max_age_days is not None:
+            keep_rules.append(f"{policy.max_age_days:g} 天以内的")
+        if keep_rules:
+            rules.append("其余快照保留" + "、".join(keep_rules) + "（满足任一即保留）")
+        else:
+            rules.append("其余快照全部删除")
+        if policy.max_total_size is not None:
+            rules.append(
+                f"保留的快照超过 {self.data.format_size(policy.max_total_size)}"
+                f" 时从最旧的开始删除" +
+                ("（每个目录分别计算）" if self.data.multi_root else ""))
+        return rules
+
+    def show_snapshot_cleanup_result(self, cleanup_result: dict):
+        """显示清理旧快照的结果"""
+        # 构建结果消息
+        if cleanup_result.get('deleted_snapshots', 0) == 0:
+            messagebox.showinfo("清理完成",
+                f"✅ 没有需要清理的快照。\n\n"
+                f"当前快照: {cleanup_result.get('total_snapshots', 0)} 个\n"
+                f"全部保留: {cleanup_result.get('kept_snapshots', 0)} 个")
+            return
+
+        # 显示删除详情
+        deleted = cleanup_result.get('deleted_files', [])
+        details = ""
+        for f in deleted[:10]:
+            details += f"  • {f['date']} - {self.data.format_size(f['size'])}\n"
+        if len(deleted) > 10:
+            details += f"  ... 还有 {len(deleted) - 10} 个\n"
+
+        summary = f"""清理完成！
+
+已删除: {cleanup_result['deleted_snapshots']} 个快照
+保留: {cleanup_result['kept_snapshots']} 个快照
+  （包括 {len(cleanup_result.get('active_preserved', []))} 个活跃会话快照）
+
+释放空间: {self.data.format_size(cleanup_result['total_size_freed'])}
+
+删除详情:
+{details if details else '无'}
+"""
+
+        messagebox.showinfo("清理完成", summary)
+
+    def ask_budget_policy(self) -> EvictionPolicy:
+        """弹出存储预算设置，返回策略（取消时返回 None）"""
+        return BudgetPolicyDialog(self.root, self.budget_settings).show()
+
+    def enforce_storage_budget(self):
+        """按存储预算淘汰会话：先在后台计算淘汰计划并预览，确认后执行"""
+        if not self.check_not_loading():
+            return
+        policy = self.ask_budget_policy()
+        if policy is None:
+            return
+
+        action = "归档" if policy.action == 'archive' else "删除"
+        dialog = ScanPreviewDialog(
+            self,
+            "存储预算 - 预览",
+            f"📏 超出预算时将{action}以下会话",
+            warning=("运行中的会话始终保留。" +
+                     ("多个数据目录时预算对每个目录分别生效。" if self.data.multi_root else "")),
+            final_confirm=(f"确定要{action}这些会话吗？" +
+                           ("\n\n删除后无法恢复！" if policy.action == 'delete' else "")))
+        icon = "🗄️" if policy.action == 'archive' else "🗑️"
+        dialog.confirm_btn.config(text=f"{icon} 确认{action}")
+        result = {}
+
+        def worker(post, cancel_event):
+            post(('plan', self.data.plan_storage_budget(policy)))
+
+        def on_message(kind, plan):
+            if kind != 'plan':
+                return
+            result['plan'] = plan
+            protected = "，".join(
+                f"{EvictionPolicy.REASON_LABELS.get(reason, reason)} {count}"
+                for reason, count in plan['protected'].items())
+            dialog.set_stats(
+                f"当前: {self.data.format_size(plan['total_size'])} | "
+                f"预算: {self.data.format_size(plan['budget'])} | "
+                f"将{action}: {len(plan['evicted'])} 个 | "
+                f"预计降至: {self.data.format_size(plan['projected_size'])}")
+            dialog.write(f"保留 {plan['kept']} 个会话（{protected or '无'}）\n\n",
+                         "category")
+            if not plan['reachable']:
+                dialog.write("⚠️ 受保护的会话较多，淘汰所有可淘汰的会话后仍超出预算\n\n",
+                             "warning")
+            for item in plan['evicted']:
+                last_used = datetime.fromtimestamp(
+                    item['last_used']).strftime('%Y-%m-%d %H:%M')
+                dialog.add_entry(f"  {last_used}  ", "file_size",
+                                 f"{item['session_id']}", "file_path",
+                                 f"  {item['project']}",
+                                 "file_size",
+                                 f"  ({self.data.format_size(item['size'])})\n",
+                                 "category")
+
+        def can_confirm():
+            plan = result.get('plan')
+            if plan is None:
+                return False
+            if not plan['evicted']:
+                dialog.set_stats(
+                    f"✅ 当前 {self.data.format_size(plan['total_size'])}，"
+                    f"没有需要{action}的会话。")
+                return False
+            return True
+
+        if not dialog.run(worker, on_message, can_confirm):
+            return
+
+        def on_done(plan):
+            self.checked_sessions.clear()
+            self.load_data()
+
+            errors = [
+                f"  • {item['session_id'][:20]}...: {item['error']}"
+                for item in plan['evicted'] if 'error' in item
+            ]
+            messagebox.showinfo(
+                "存储预算",
+                f"已{action}: {plan['done']} 个会话\n"
+                f"{self.data.format_size(plan['total_size'])} → "
+                f"{self.data.format_size(plan['size_after'])}" +
+                (f"\n\n跳过: {plan['skipped']} 个（预览后变为运行中或文件有变化）"
+                 if plan['skipped'] else "") +
+                (f"\n\n失败: {plan['failed']} 个\n" + "\n".join(errors[:5])
+                 if errors else ""))
+
+        # 在后台按预览时的计划执行；数据层会重新检测活跃会话和文件大小，
+        # 预览之后有变化的会话跳过
+        self.run_data_task(
+            f"{action}会话",
+            lambda progress: self.data.apply_eviction_plan(
+                result['plan'], progress_callback=progress), on_done)
+
+    def is_local_command(self, display: str) -> bool:
+        """判断是否是本地命令"""
+        if not display:
+            return False
+        # 检查是否以 / 开头的命令
+        if display.startswith('/'):
+            return True
+        return False
+
+    def show_session_info(self, session):
+        """显示对话预览"""
+        session_id = session.get('sessionId', '')
+        project = session.get('project', 'N/A')
+        display = session.get('display', 'N/A')
+
+        # 清空文本框
+        self.info_text.config(state="normal")
+        self.info_text.delete(1.0, tk.END)
+
+        # 检查是否是本地命令
+        if self.is_local_command(display):
+            self.show_debug_log_preview(session_id)
+            self.info_text.config(state="disabled")
+            # 更新文件大小分布
+            self.update_file_size_distribution(session)
+            return
+
+        # 显示对话标识（消息数取自缓存或换行计数，不解析整个文件）
+        total = self.data.get_message_count(session_id, project)
+        self.info_text.insert(tk.END, f"💬 对话预览 ({total} 条消息)\n\n",
+                              "system_msg")
+
+        if total == 0:
+            self.info_text.insert(tk.END, "❌ 该会话没有对话数据\n\n", "error")
+            self.info_text.insert(tk.END, f"Session ID: {session_id}\n",
+                                  "placeholder")
+            self.info_text.insert(tk.END, f"项目: {project}\n", "placeholder")
+            self.info_text.config(state="disabled")
+            # 更新文件大小分布
+            self.update_file_size_distribution(session)
+            return
+
+        # 显示对话预览（最多显示前20条消息，显示够了就停止读取文件）
+        max_messages = 20
+        count = 0
+        for msg in self.data.iter_conversation(session_id, project):
+            if count >= max_messages:
+                break
+            # 与对话查看器相同的提取规则，用户消息只清理到预览长度为止
+            extracted = extract_message_text(msg, limit=200)
+            if not extracted:
+                continue
+            role, text = extracted
+
+            if role == 'user':
+                self.info_text.insert(tk.END, f"\n你:\n", "user_msg")
+                self.info_text.insert(tk.END, f"{text}\n")
+                count += 1
+            elif role == 'assistant':
+                # 限制长度
+                if len(text) > 300:
+                    text = text[:300] + "..."
+                self.info_text.insert(tk.END, f"\nClaude:\n", "assistant_msg")
+                self.info_text.insert(tk.END, f"{text}\n")
+                count += 1
+
+        if count == 0:
+            self.info_text.insert(tk.END, "⚠️ 没有找到可显示的对话内容\n", "error")
+            self.info_text.insert(tk.END, f"(共 {total} 条记录)\n",
+                                  "placeholder")
+        elif total > max_messages:
+            self.info_text.insert(
+                tk.END, f"\n... 还有 {total - max_messages} 条消息\n",
+                "placeholder")
+
+        self.info_text.see(1.0)
+        self.info_text.config(state="disabled")
+
+        # 更新文件大小分布
+        self.update_file_size_distribution(session)
+
+    def show_debug_log_preview(self, session_id: str):
+        """显示调试日志预览"""
+        debug_file = self.data.get_debug_file(session_id)
+
+        self.info_text.insert(tk.END, "📋 本地命令 - 调试日志预览\n\n", "system_msg")
+
+        if not debug_file.exists():
+            self.info_text.insert(tk.END, "❌ 未找到调试日志文件\n", "error")
+            return
+
+        try:
+            # 只读取前 50 行，总行数按块统计换行符
+            max_lines = 50
+            with open(debug_file, 'r', encoding='utf-8') as f:
+                lines = list(islice(f, max_lines))
+            total = count_lines(debug_file)
+
+            for line in lines:
+                # 简化显示，移除时间戳等
+                line = line.rstrip()
+                if '[DEBUG]' in line:
+                    # 只显示 DEBUG 行的主要内容
+                    parts = line.split('[DEBUG] ', 1)
+                    if len(parts) > 1:
+                        content = parts[1]
+                        # 截断过长的行
+                        if len(content) > 150:
+                            content = content[:150] + "..."
+                        self.info_text.insert(tk.END, f"{content}\n")
+                elif '[WARN]' in line or '[ERROR]' in line:
+                    if len(line) > 150:
+                        line = line[:150] + "..."
+                    self.info_text.insert(tk.END, f"{line}\n", "error")
+
+            if total > max_lines:
+                self.info_text.insert(
+                    tk.END, f"\n... 还有 {total - max_lines} 行日志\n",
+                    "placeholder")
+
+            self.info_text.see(1.0)
+
+        except Exception as e:
+            self.info_text.insert(tk.END, f"❌ 读取日志失败: {e}\n", "error")
+
+
+# ============ 存储预算对话框 ============
+
+
+class BudgetPolicyDialog:
+    """填写存储预算策略的对话框，确认后 policy 为 EvictionPolicy，取消时为 None"""
+
+    ORDER_LABELS = {'largest': "最大的优先", 'lru': "最久未用的优先"}
+    ACTION_LABELS = {'delete': "删除", 'archive': "压缩归档"}
+
+    def __init__(self, parent, settings: dict):
+        self.settings = settings
+        self.policy = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("存储预算")
+        self.window.geometry("420x300")
+        self.window.transient(parent)
+        self.setup_ui()
+        self.window.grab_set()
+
+    def setup_ui(self):
+        """创建界面"""
+        form = ttk.Frame(self.window, padding=15)
+        form.pack(fill=tk.BOTH, expand=True)
+
+        self.size_var = tk.StringVar(value=self.settings['max_size'])
+        self.days_var = tk.StringVar(value=self.settings['keep_days'])
+        self.order_var = tk.StringVar(
+            value=self.ORDER_LABELS[self.settings['order']])
+        self.action_var = tk.StringVar(
+            value=self.ACTION_LABELS[self.settings['action']])
+        self.titled_var = tk.BooleanVar(value=self.settings['protect_titled'])
+
+        rows = [
+            ("总大小上限（如 2G、500M）:",
+             ttk.Entry(form, textvariable=self.size_var, width=16)),
+            ("保留最近几天用过的会话:",
+             ttk.Entry(form, textvariable=self.days_var, width=16)),
+            ("淘汰顺序:",
+             ttk.Combobox(form,
+                          textvariable=self.order_var,
+                          values=list(self.ORDER_LABELS.values()),
+                          state="readonly",
+                          width=14)),
+            ("淘汰方式:",
+             ttk.Combobox(form,
+                          textvariable=self.action_var,
+                          values=list(self.ACTION_LABELS.values()),
+                          state="readonly",
+                          width=14)),
+        ]
+        for row, (label, widget) in enumerate(rows):
+            ttk.Label(form, text=label).grid(row=row,
+                                             column=0,
+                                             sticky=tk.W,
+                                             pady=5)
+            widget.grid(row=row, column=1, sticky=tk.W, pady=5)
+
+        ttk.Checkbutton(form,
+                        text="保留 /rename 命名过的会话",
+                        variable=self.titled_var).grid(row=len(rows),
+                                                       column=0,
+                                                       columnspan=2,
+                                                       sticky=tk.W,
+                                                       pady=5)
+        ttk.Label(form,
+                  text="运行中的会话始终保留；天数留空表示不按时间保留。",
+                  foreground="#666666").grid(row=len(rows) + 1,
+                                             column=0,
+                                             columnspan=2,
+                                             sticky=tk.W,
+                                             pady=5)
+
+        button_frame = ttk.Frame(self.window, padding=10)
+        button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text="取消",
+                   command=self.window.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="👁️ 预览",
+                   command=self.on_ok).pack(side=tk.RIGHT, padx=5)
+
+    def on_ok(self):
+        """校验输入，生成策略并记住本次设置"""
+        try:
+            max_size = parse_size(self.size_var.get())
+            days_text = self.days_var.get().strip()
+            keep_days = float(days_text) if days_text else None
+        except ValueError:
+            messagebox.showwarning("输入错误",
+                                   "请输入有效的大小（如 2G）和天数",
+                                   parent=self.window)
+            return
+
+        order = next(key for key, label in self.ORDER_LABELS.items()
+                     if label == self.order_var.get())
+        action = next(key for key, label in self.ACTION_LABELS.items()
+                      if label == self.action_var.get())
+        self.settings.update(max_size=self.size_var.get().strip(),
+                             keep_days=days_text,
+                             order=order,
+                             action=action,
+                             protect_titled=self.titled_var.get())
+        self.policy = EvictionPolicy(max_total_size=max_size,
+                                     min_age_days=keep_days,
+                                     protect_titled=self.titled_var.get(),
+                                     order=order,
+                                     action=action)
+        self.window.destroy()
+
+    def show(self) -> EvictionPolicy:
+        """等待窗口关闭，返回填写的策略"""
+        self.window.wait_window()
+        return self.policy
+
+
+class SnapshotPolicyDialog:
+    """填写快照保留策略的对话框，确认后 policy 为 SnapshotRetentionPolicy，取消时为 None"""
+
+    def __init__(self, parent, settings: dict):
+        self.settings = settings
+        self.policy = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("快照保留策略")
+        self.window.geometry("420x280")
+        self.window.transient(parent)
+        self.setup_ui()
+        self.window.grab_set()
+
+    def setup_ui(self):
+        """创建界面"""
+        form = ttk.Frame(self.window, padding=15)
+        form.pack(fill=tk.BOTH, expand=True)
+
+        self.count_var = tk.StringVar(value=self.settings['keep_count'])
+        self.per_shell_var = tk.StringVar(value=self.settings['keep_per_shell'])
+        self.days_var = tk.StringVar(value=self.settings['max_age_days'])
+        self.size_var = tk.StringVar(value=self.settings['max_size'])
+
+        rows = [
+            ("保留最新的快照数:", self.count_var),
+            ("每种 shell 保留最新的:", self.per_shell_var),
+            ("保留最近几天的快照:", self.days_var),
+            ("总大小上限（如 50M）:", self.size_var),
+        ]
+        for row, (label, var) in enumerate(rows):
+            ttk.Label(form, text=label).grid(row=row,
+                                             column=0,
+                                             sticky=tk.W,
+                                             pady=5)
+            ttk.Entry(form, textvariable=var, width=16).grid(row=row,
+                                                             column=1,
+                                                             sticky=tk.W,
+                                                             pady=5)
+
+        ttk.Label(form,
+                  text="活跃会话的快照始终保留；满足任一数量或天数规则即保留，\n"
+                  "留空表示该规则不生效。",
+                  foreground="#666666").grid(row=len(rows),
+                                             column=0,
+                                             columnspan=2,
+                                             sticky=tk.W,
+                                             pady=5)
+
+        button_frame = ttk.Frame(self.window, padding=10)
+        button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text="取消",
+                   command=self.window.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="👁️ 预览",
+                   command=self.on_ok).pack(side=tk.RIGHT, padx=5)
+
+    def on_ok(self):
+        """校验输入，生成策略并记住本次设置"""
+        texts = {
+            'keep_count': self.count_var.get().strip(),
+            'keep_per_shell': self.per_shell_var.get().strip(),
+            'max_age_days': self.days_var.get().strip(),
+            'max_size': self.size_var.get().strip()
+        }
+        try:
+            keep_count = int(texts['keep_count']) if texts['keep_count'] else None
+            keep_per_shell = (int(texts['keep_per_shell'])
+                              if texts['keep_per_shell'] else None)
+            max_age_days = (float(texts['max_age_days'])
+                            if texts['max_age_days'] else None)
+            max_size = parse_size(texts['max_size']) if texts['max_size'] else None
+            if any(value is not None and value < 0
+                   for value in (keep_count, keep_per_shell, max_age_days)):
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("输入错误",
+                                   "请输入有效的数量、天数和大小（如 50M）",
+                                   parent=self.window)
+            return
+
+        self.settings.update(texts)
+        self.policy = SnapshotRetentionPolicy(keep_count=keep_count,
+                                              max_age_days=max_age_days,
+                                              keep_per_shell=keep_per_shell,
+                                              max_total_size=max_size)
+        self.window.destroy()
+
+    def show(self) -> SnapshotRetentionPolicy:
+        """等待窗口关闭，返回填写的策略"""
+        self.window.wait_window()
+        return self.policy
+
+
+# ============ 扫描预览对话框 ============
+
+
+class ScanPreviewDialog:
+    """删除/清理预览对话框
+
+    预览在后台线程池中计算，结果经队列流式写入列表，
+    同时显示累计统计和进度，可随时取消；扫描完成后才能确认删除。
+    """
+
+    POLL_MS = 50
+    BATCH_MESSAGES = 500  # 每次轮询最多处理的消息数
+    MAX_ENTRIES = 2000  # 列表最多显示的条目数
+
+    def __init__(self,
+                 app,
+                 title: str,
+                 header: str,
+                 geometry: str = "900x600",
+                 warning: str = None,
+                 final_confirm: str = None):
+        self.app = app
+        self.final_confirm = final_confirm
+        self.queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.confirmed = False
+        self.finished = False
+        self.failed = None  # 扫描失败时的错误信息
+        self.closed = False
+        self.shown = 0
+        self.hidden = 0
+        self.on_message = None
+        self.can_confirm = None
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title(title)
+        self.window.geometry(geometry)
+        self.window.transient(app.root)
+        self.window.protocol("WM_DELETE_WINDOW", self.on_cancel)
+        self.setup_ui(header, warning)
+        self.window.grab_set()
+
+    def setup_ui(self, header: str, warning: str):
+        """创建界面"""
+        header_frame = ttk.Frame(self.window, padding=10)
+        header_frame.pack(fill=tk.X)
+        ttk.Label(header_frame,
+                  text=header,
+                  font=("", 14, "bold"),
+                  foreground="#cc0000").pack()
+
+        # 统计信息和进度
+        stats_frame = ttk.Frame(self.window, padding=10)
+        stats_frame.pack(fill=tk.X)
+        self.stats_label = ttk.Label(stats_frame,
+                                     text="⏳ 正在扫描...",
+                                     font=("", 11))
+        self.stats_label.pack()
+        self.progress = ttk.Progressbar(stats_frame,
+                                        mode="indeterminate",
+                                        maximum=100)
+        self.progress.pack(fill=tk.X, pady=(5, 0))
+        self.progress.start(10)
+        self.status_label = ttk.Label(stats_frame,
+                                      text="",
+                                      foreground="#666666")
+        self.status_label.pack()
+
+        if warning:
+            warning_frame = ttk.Frame(self.window, padding=10)
+            warning_frame.pack(fill=tk.X)
+            ttk.Label(warning_frame,
+                      text=warning,
+                      foreground="#cc6600",
+                      justify=tk.LEFT).pack()
+
+        # 文件列表
+        text_frame = ttk.Frame(self.window, padding=10)
+        text_frame.pack(fill=tk.BOTH, expand=True)
+        self.text = scrolledtext.ScrolledText(text_frame,
+                                              font=("Courier", 10),
+                                              wrap=tk.NONE,
+                                              padx=10,
+                                              pady=10,
+                                              state="disabled")
+        self.text.pack(fill=tk.BOTH, expand=True)
+        self.text.tag_config("category",
+                             foreground="#0066cc",
+                             font=("", 11, "bold"))
+        self.text.tag_config("file_path", foreground="#333333")
+        self.text.tag_config("file_size", foreground="#999999")
+        self.text.tag_config("warning", foreground="#cc0000")
+
+        # 底部按钮：扫描完成前不能确认
+        button_frame = ttk.Frame(self.window, padding=10)
+        button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text="❌ 取消",
+                   command=self.on_cancel).pack(side=tk.RIGHT, padx=5)
+        self.confirm_btn = ttk.Button(button_frame,
+                                      text="🗑️ 确认删除",
+                                      command=self.on_confirm,
+                                      state="disabled")
+        self.confirm_btn.pack(side=tk.RIGHT, padx=5)
+
+    def run(self, worker, on_message, can_confirm=None) -> bool:
+        """提交后台任务并等待窗口关闭，返回用户是否确认
+
+        worker(post, cancel_event) 在线程池中执行，用 post((kind, payload))
+        发送结果；('progress', (done, total)) 更新进度条，其余消息交给
+        on_message(kind, payload)。can_confirm() 在扫描完成后决定能否确认。
+        """
+        self.on_message = on_message
+        self.can_confirm = can_confirm
+        self.app.preview_executor.submit(self._run_worker, worker)
+        self.window.after(self.POLL_MS, self.poll)
+        self.window.wait_window()
+        return self.confirmed
+
+    def _run_worker(self, worker):
+        """线程池中执行：持有 load_lock，捕获异常并在结束时通知界面线程
+
+        预览会扫描并替换数据层的存储清单，需要与加载、文件监视线程互斥。
+        """
+        try:
+            with self.app.load_lock:
+                if not self.cancel_event.is_set():
+                    worker(self.queue.put, self.cancel_event)
+        except Exception as e:
+            self.queue.put(('error', str(e)))
+        self.queue.put(('done', None))
+
+    def poll(self):
+        """界面线程：处理后台发来的结果"""
+        if self.closed:
+            return
+        self.text.config(state="normal")
+        try:
+            for _ in range(self.BATCH_MESSAGES):
+                try:
+                    kind, payload = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == 'progress':
+                    self.set_progress(*payload)
+                elif kind == 'error':
+                    self.failed = payload
+                    self.write(f"\n❌ 扫描失败: {payload}\n", "warning")
+                    self.status_label.config(text=f"❌ 扫描失败: {payload}")
+                elif kind == 'done':
+                    self.finish()
+                    return
+                else:
+                    self.on_message(kind, payload)
+        finally:
+            if not self.closed:
+                self.text.config(state="disabled")
+        self.window.after(self.POLL_MS, self.poll)
+
+    def set_progress(self, done: int, total: int):
+        """更新进度条和进度文字"""
+        if self.progress.cget("mode") != "determinate":
+            self.progress.stop()
+            self.progress.config(mode="determinate")
+        self.progress.config(value=done * 100 / total if total else 100)
+        self.status_label.config(text=f"⏳ 正在扫描... {done}/{total}")
+
+    def set_stats(self, text: str):
+        """更新累计统计"""
+        self.stats_label.config(text=text)
+
+    def write(self, *chunks):
+        """追加文本，参数为 (文本, 标签) 交替排列"""
+        self.text.insert(tk.END, *chunks)
+
+    def add_entry(self, *chunks):
+        """追加一个文件条目，超过显示上限后只计数"""
+        if self.shown >= self.MAX_ENTRIES:
+            self.hidden += 1
+            return
+        self.shown += 1
+        self.write(*chunks)
+
+    def finish(self):
+        """扫描结束：停止进度条，成功时允许确认"""
+        self.finished = True
+        self.progress.stop()
+        self.progress.config(mode="determinate", value=100)
+        if self.hidden:
+            self.write(f"\n  ... 还有 {self.hidden} 项未显示\n", "warning")
+        self.text.config(state="disabled")
+        if self.failed is not None:
+            # 扫描不完整，预览结果不可信，保持确认按钮禁用
+            self.status_label.config(text=f"❌ 扫描失败: {self.failed}")
+            return
+        self.status_label.config(text="✅ 扫描完成")
+        if self.can_confirm is None or self.can_confirm():
+            self.confirm_btn.config(state="normal")
+
+    def on_confirm(self):
+        if not self.finished or self.failed is not None:
+            return
+        if self.final_confirm and not messagebox.askyesno(
+                "最后确认", self.final_confirm, icon="warning"):
+            return
+        self.confirmed = True
+        self.close()
+
+    def on_cancel(self):
+        self.confirmed = False
+        self.close()
+
+    def close(self):
+        """关闭窗口并通知后台任务停止"""
+        self.cancel_event.set()
+        self.closed = True
+        self.window.destroy()
+
+
+# ============ 全文搜索窗口 ============
+
+
+class FullTextSearchWindow:
+    """全文搜索窗口：跨所有对话文件搜索关键词"""
+
+    def __init__(self, parent, data: SessionData, open_session):
+        self.data = data
+        self.open_session = open_session  # open_session(session_id, keyword)
+        self.results = {}  # {item_id: hit}
+        self.last_query = ""
+        self.index_queue = queue.Queue()
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("全文搜索")
+        self.window.geometry("1000x600")
+
+        self.setup_ui()
+        self.start_indexing()
+
+    def setup_ui(self):
+        """设置界面"""
+        # 顶部搜索栏
+        top_frame = ttk.Frame(self.window, padding=10)
+        top_frame.pack(fill=tk.X)
+
+        ttk.Label(top_frame, text="🔍 关键词:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(top_frame,
+                                 textvariable=self.search_var,
+                                 width=40)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<Return>", self.do_search)
+        search_entry.focus_set()
+
+        ttk.Button(top_frame, text="搜索",
+                   command=self.do_search).pack(side=tk.LEFT, padx=5)
+
+        self.status_label = ttk.Label(top_frame, text="", foreground="#666666")
+        self.status_label.pack(side=tk.RIGHT, padx=5)
+
+        # 结果列表
+        list_frame = ttk.Frame(self.window, padding=(10, 0))
+        list_frame.pack(fill=tk.BOTH, expand=True)
+
+        columns = ("session_id", "project", "role", "hits", "snippet")
+        self.tree = ttk.Treeview(list_frame,
+                                 columns=columns,
+                                 show="headings",
+                                 selectmode="browse")
+        self.tree.heading("session_id", text="Session ID")
+        self.tree.heading("project", text="项目目录")
+        self.tree.heading("role", text="来源")
+        self.tree.heading("hits", text="命中数")
+        self.tree.heading("snippet", text="片段")
+
+        self.tree.column("session_id", width=140)
+        self.tree.column("project", width=160)
+        self.tree.column("role", width=60, anchor="center")
+        self.tree.column("hits", width=60, anchor="center")
+        self.tree.column("snippet", width=560)
+
+        scrollbar_y = ttk.Scrollbar(list_frame,
+                                    orient=tk.VERTICAL,
+                                    command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar_y.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar_y.grid(row=0, column=1, sticky="ns")
+        list_frame.grid_rowconfigure(0, weight=1)
+        list_frame.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind("<Double-1>", self.on_double_click)
+
+        # 底部工具栏
+        bottom_frame = ttk.Frame(self.window, padding=10)
+        bottom_frame.pack(fill=tk.X)
+
+        ttk.Label(bottom_frame,
+                  text="💡 双击结果打开对话并定位到关键词",
+                  foreground="#666666").pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(bottom_frame, text="关闭",
+                   command=self.window.destroy).pack(side=tk.RIGHT, padx=5)
+
+    def start_indexing(self):
+        """后台增量更新全文索引"""
+        self.status_label.config(text="⏳ 正在更新索引...")
+
+        def worker():
+            try:
+                result = self.data.update_fulltext_index(
+                    progress_callback=lambda done, total: self.index_queue.
+                    put(('progress', (done, total))))
+                self.index_queue.put(('done', result))
+            except Exception as e:
+                self.index_queue.put(('error', str(e)))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.window.after(100, self.poll_index_queue)
+
+    def poll_index_queue(self):
+        """界面线程：显示索引进度"""
+        finished = False
+        progress = None
+        while True:
+            try:
+                kind, payload = self.index_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                progress = payload
+            elif kind == 'done':
+                finished = True
+                self.status_label.config(
+                    text=f"✅ 索引就绪: {payload['total']} 个对话文件"
+                    f"（更新 {payload['indexed']} 个）")
+                # 索引期间发起的搜索用完整索引重新执行
+                if self.last_query:
+                    self.do_search()
+            elif kind == 'error':
+                finished = True
+                self.status_label.config(text=f"❌ 索引失败: {payload}")
+
+        if not self.window.winfo_exists():
+            return
+        if not finished:
+            if progress:
+                self.status_label.config(
+                    text=f"⏳ 正在更新索引... {progress[0]}/{progress[1]}")
+            self.window.after(100, self.poll_index_queue)
+
+    def do_search(self, event=None):
+        """执行搜索并显示结果"""
+        query = self.search_var.get().strip()
+        self.last_query = query
+        self.tree.delete(*self.tree.get_children())
+        self.results = {}
+        if not query:
+            return
+
+        role_labels = {'user': '你', 'assistant': 'Claude'}
+        for hit in self.data.search_fulltext(query, limit=200):
+            item_id = self.tree.insert(
+                "",
+                tk.END,
+                values=(hit['session_id'], Path(hit['path']).parent.name,
+                        role_labels.get(hit['role'], hit['role']), hit['hits'],
+                        hit['snippet']))
+            self.results[item_id] = hit
+
+        if not self.results:
+            self.tree.insert("", tk.END, values=("", "", "", "", f"未找到: {query}"))
+
+    def on_double_click(self, event):
+        """打开选中的会话"""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        hit = self.results.get(selection[0])
+        if hit:
+            self.open_session(hit['session_id'], self.last_query)
+
+
+# ============ 调试日志查看器窗口 ============
+
+
+class DebugLogViewer:
+    """调试日志查看器
+
+    日志通过 DebugLogIndex 映射到内存，文本框中只保留可见位置附近的几块行，
+    滚动到边缘时再加载相邻的块。
+    """
+
+    CHUNK_LINES = 500  # 每次加载的行数
+    MAX_CHUNKS = 4  # 文本框中最多同时保留的块数
+
+    # 级别过滤选项 -> 需要显示的级别（None 表示全部）
+    LEVEL_FILTERS = {
+        "全部": None,
+        "WARN + ERROR": ('WARN', 'ERROR'),
+        "仅 ERROR": ('ERROR', ),
+    }
+
+    LEVEL_TAGS = {'ERROR': "error", 'WARN': "warn", 'DEBUG': "debug"}
+
+    def __init__(self, parent, session_id: str, session_name: str,
+                 data: SessionData):
+        self.session_id = session_id
+        self.session_name = session_name
+        self.data = data
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(f"调试日志 - {session_name[:50]}")
+        self.window.geometry("1000x700")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.index = None
+        self.closed = False
+        self.rows = range(0)  # 当前显示的行号序列（过滤后为行号列表）
+        self.window_start = 0  # 文本框中第一行对应 rows 的下标
+        self.window_end = 0
+        self.rendered = False
+        self.loading_chunk = False
+        self.current_line = None  # 最近一次定位到的日志行号
+
+        self.setup_ui()
+        self.load_debug_log()
+
+    def setup_ui(self):
+        """设置界面"""
+        # 顶部信息栏
+        top_frame = ttk.Frame(self.window, padding=10)
+        top_frame.pack(fill=tk.X)
+
+        ttk.Label(top_frame,
+                  text=f"Session: {self.session_id}",
+                  font=("Courier", 12)).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(top_frame,
+                   text="📄 复制 Session ID",
+                   command=lambda: self.window.clipboard_clear() or self.window
+                   .clipboard_append(self.session_id)).pack(side=tk.RIGHT,
+                                                            padx=5)
+
+        # 级别过滤
+        self.level_var = tk.StringVar(value="全部")
+        level_box = ttk.Combobox(top_frame,
+                                 textvariable=self.level_var,
+                                 values=list(self.LEVEL_FILTERS),
+                                 state="readonly",
+                                 width=14)
+        level_box.pack(side=tk.RIGHT, padx=5)
+        level_box.bind("<<ComboboxSelected>>", self.on_level_change)
+        ttk.Label(top_frame, text="级别:").pack(side=tk.RIGHT)
+
+        # 主文本区域
+        self.text = scrolledtext.ScrolledText(self.window,
+                                              font=("Courier", 12),
+                                              wrap=tk.NONE,
+                                              padx=10,
+                                              pady=10)
+        self.text.pack(fill=tk.BOTH, expand=True)
+        self.text.configure(yscrollcommand=self.on_text_scroll)
+
+        # 配置标签样式
+        self.text.tag_config("debug", foreground="#333333")
+        self.text.tag_config("warn", foreground="#cc6600")
+        self.text.tag_config("error", foreground="#cc0000")
+        self.text.tag_config("timestamp", foreground="#999999")
+        self.text.tag_config("current", background="#fff3b0")
+
+        # 底部工具栏
+        bottom_frame = ttk.Frame(self.window, padding=10)
+        bottom_frame.pack(fill=tk.X)
+
+        ttk.Label(bottom_frame, text="🔍 搜索:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(bottom_frame,
+                                 textvariable=self.search_var,
+                                 width=30)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<Return>", self.search_text)
+
+        self.regex_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(bottom_frame, text="正则",
+                        variable=self.regex_var).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(bottom_frame, text="查找下一个",
+                   command=self.search_next).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(bottom_frame, text="⏭ 下一个错误",
+                   command=self.jump_next_error).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(bottom_frame, text="关闭",
+                   command=self.close).pack(side=tk.RIGHT, padx=5)
+
+        self.info_label = ttk.Label(bottom_frame, text="",
+                                    foreground="#999999")
+        self.info_label.pack(side=tk.RIGHT, padx=10)
+
+    def close(self):
+        """关闭窗口并释放内存映射"""
+        self.closed = True
+        if self.index is not None:
+            self.index.close()
+        self.window.destroy()
+
+    def load_debug_log(self):
+        """加载调试日志：映射文件后分批建立行索引，第一块就绪后立即显示"""
+        debug_file = self.data.get_debug_file(self.session_id)
+        self.index = self.data.open_debug_log(self.session_id)
+        try:
+            self.index.open()
+        except OSError:
+            self.text.insert(1.0, "❌ 调试日志文件不存在\n\n")
+            self.text.insert(tk.END, f"文件路径: {debug_file}")
+            return
+        except ValueError as e:
+            self.text.insert(1.0, f"❌ 读取日志失败: {e}")
+            return
+
+        self.index_step()
+
+    def index_step(self):
+        """建立一批行索引（每批 8MB），完成后预先定位 ERROR/WARN 行"""
+        if self.closed:
+            return
+        done = self.index.index_more(max_bytes=8 * 1024 * 1024)
+
+        if self.level_var.get() == "全部":
+            self.rows = range(self.index.get_line_count())
+            if not self.rendered and (done or
+                                      len(self.rows) >= self.CHUNK_LINES):
+                self.render_from(0)
+                self.text.see(1.0)
+            elif (self.window_end < len(self.rows)
+                  and float(self.text.yview()[1]) > 0.9):
+                self.append_chunk()
+
+        if done:
+            for level in DebugLogIndex.LEVELS:
+                self.index.get_level_lines(level)
+        self.update_info_label()
+
+        if not done:
+            self.window.after(1, self.index_step)
+
+    def update_info_label(self):
+        """显示总行数和各级别行数"""
+        text = f"共 {self.index.get_line_count()} 行"
+        if not self.index.complete:
+            text += "（索引中…）"
+        else:
+            errors = len(self.index.get_level_lines('ERROR'))
+            warnings = len(self.index.get_level_lines('WARN'))
+            text += f" | ❌ {errors} 错误 | ⚠️ {warnings} 警告"
+        self.info_label.config(text=text)
+
+    def on_level_change(self, event=None):
+        """切换级别过滤：用预先定位的行号列表作为显示的行序列"""
+        if self.index is None or self.index.buffer is None:
+            return
+        levels = self.LEVEL_FILTERS.get(self.level_var.get())
+        if levels is None:
+            self.index.index_more()
+            self.rows = range(self.index.get_line_count())
+        else:
+            lines = set()
+            for level in levels:
+                lines.update(self.index.get_level_lines(level))
+            self.rows = sorted(lines)
+        self.update_info_label()
+        self.render_from(0)
+
+    def render_rows(self, start: int, stop: int) -> list:
+        """把 rows[start:stop] 转成 Text.insert 的 (文本, 标签, ...) 参数序列"""
+        chunks = []
+        for line_no in self.rows[start:stop]:
+            line = self.index.get_line(line_no)
+            if not line:
+                chunks.extend(("\n", ()))
+                continue
+            # 根据日志级别设置颜色
+            tag = self.LEVEL_TAGS[DebugLogIndex.get_level(line)]
+            chunks.extend((line + "\n", tag))
+        return chunks
+
+    def render_from(self, row: int):
+        """清空文本框，从 row 所在的块开始显示"""
+        self.text.delete(1.0, tk.END)
+        self.rendered = True
+        self.window_start = row - row % self.CHUNK_LINES
+        self.window_end = self.window_start
+        self.append_chunk()
+        if not self.rows:
+            self.text.insert(1.0, "（没有符合条件的日志行）", "timestamp")
+
+    def append_chunk(self):
+        """在末尾加载下一块，超出上限时丢弃第一块"""
+        stop = min(self.window_end + self.CHUNK_LINES, len(self.rows))
+        chunks = self.render_rows(self.window_end, stop)
+        if chunks:
+            self.text.insert(tk.END, *chunks)
+        self.window_end = stop
+
+        if (self.window_end - self.window_start >
+                self.MAX_CHUNKS * self.CHUNK_LINES):
+            self.keep_view(lambda: self.text.delete(
+                1.0, f"{self.CHUNK_LINES + 1}.0"))
+            self.window_start += self.CHUNK_LINES
+
+    def prepend_chunk(self):
+        """在开头加载上一块，超出上限时丢弃末尾的行"""
+        start = max(0, self.window_start - self.CHUNK_LINES)
+        chunks = self.render_rows(start, self.window_start)
+        if chunks:
+            self.keep_view(lambda: self.text.insert(1.0, *chunks))
+        self.window_start = start
+
+        keep = self.MAX_CHUNKS * self.CHUNK_LINES
+        if self.window_end - self.window_start > keep:
+            self.text.delete(f"{keep + 1}.0", tk.END)
+            self.window_end = self.window_start + keep
+
+    def keep_view(self, modify):
+        """修改视口上方的内容时保持可见位置不变"""
+        self.text.mark_set("view_top", "@0,0")
+        modify()
+        self.text.yview("view_top")
+
+    def on_text_scroll(self, first, last):
+        """滚动回调：同步滚动条，接近边缘时加载相邻块"""
+        self.text.vbar.set(first, last)
+        if not self.rendered or self.loading_chunk:
+            return
+
+        if float(last) > 0.9 and self.window_end < len(self.rows):
+            action = self.append_chunk
+        elif float(first) < 0.1 and self.window_start > 0:
+            action = self.prepend_chunk
+        else:
+            return
+
+        # 在回调之外修改文本，避免在布局过程中重入
+        def load():
+            self.loading_chunk = False
+            if not self.closed:
+                action()
+
+        self.loading_chunk = True
+        self.window.after_idle(load)
+
+    def get_top_line(self) -> int:
+        """视口顶部对应的日志行号"""
+        text_line = int(self.text.index("@0,0").split('.')[0])
+        row = self.window_start + text_line - 1
+        if 0 <= row < len(self.rows):
+            return self.rows[row]
+        return 0
+
+    def find_row(self, line_no: int) -> int:
+        """日志行号在当前行序列中的下标，不在序列中返回 -1"""
+        if isinstance(self.rows, range):
+            return line_no if line_no < len(self.rows) else -1
+        row = bisect_left(self.rows, line_no)
+        if row < len(self.rows) and self.rows[row] == line_no:
+            return row
+        return -1
+
+    def show_line(self, line_no: int):
+        """定位并高亮一行日志（必要时重新加载所在的块）"""
+        row = self.find_row(line_no)
+        if row < 0:
+            return
+        if not self.window_start <= row < self.window_end:
+            self.render_from(row)
+        text_line = row - self.window_start + 1
+        self.text.tag_remove("current", 1.0, tk.END)
+        self.text.tag_add("current", f"{text_line}.0", f"{text_line}.end")
+        self.text.see(f"{text_line}.0")
+        self.current_line = line_no
+
+    def jump_next_error(self):
+        """跳到当前位置之后的下一条 ERROR（到末尾后从头开始）"""
+        if self.index is None or self.index.buffer is None:
+            return
+        errors = self.index.get_level_lines('ERROR')
+        if not errors:
+            messagebox.showinfo("调试日志", "没有 ERROR 日志")
+            return
+        current = (self.current_line
+                   if self.current_line is not None else self.get_top_line() - 1)
+        position = bisect_right(errors, current)
+        self.show_line(errors[position % len(errors)])
+
+    def search_text(self, event=None):
+        """在映射的缓冲区上搜索（支持正则），结果必须在当前过滤的行中"""
+        keyword = self.search_var.get()
+        if not keyword or self.index is None or self.index.buffer is None:
+            return
+
+        source = keyword if self.regex_var.get() else re.escape(keyword)
+        try:
+            pattern = re.compile(source.encode('utf-8'), re.IGNORECASE)
+        except re.error as e:
+            messagebox.showwarning("搜索", f"正则表达式无效: {e}")
+            return
+
+        start = (self.current_line + 1
+                 if self.current_line is not None else self.get_top_line())
+        wrapped = False
+        while True:
+            line_no = self.index.search(pattern, start)
+            if line_no < 0:
+                if wrapped or start == 0:
+                    messagebox.showinfo("搜索", f"未找到: {keyword}")
+                    return
+                # 从头再找一遍
+                wrapped = True
+                start = 0
+                continue
+            if self.find_row(line_no) >= 0:
+                self.show_line(line_no)
+                self.text.focus_set()
+                return
+            start = line_no + 1
+
+    def search_next(self):
+        """查找下一个"""
+        self.search_text()
+
+
+# ============ 对话查看器窗口 ============
+
+
+class ConversationViewer:
+    """对话内容查看器"""
+
+    # extract_message_text 返回的角色 -> (显示名称, 文本标签)
+    ROLE_STYLES = {
+        'user': ("你", "user_msg"),
+        'assistant': ("Claude", "assistant_msg"),
+        'tool': ("工具结果", "tool_msg")
+    }
+
+    MAX_LOADED_PAGES = 5  # 文本框中最多同时保留的页数
+
+    def __init__(self, parent, session_id: str, project_path: str,
+                 session_name: str, data: SessionData):
+        self.session_id = session_id
+        self.project_path = project_path
+        self.session_name = session_name
+        self.data = data
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(f"对话内容 - {session_name[:50]}")
+        self.window.geometry("1100x750")
+
+        self.pager = None
+        self.open_queue = queue.Queue()
+        self.pending_search = False  # 对话打开前发起的搜索，打开后执行
+        self.first_page = 0  # 文本框中已加载的页范围 [first_page, last_page]
+        self.last_page = -1
+        self.loading_page = False
+
+        self.setup_ui()
+        self.load_conversation()
+
+    def setup_ui(self):
+        """设置界面"""
+        # 顶部信息栏
+        top_frame = ttk.Frame(self.window, padding=10)
+        top_frame.pack(fill=tk.X)
+
+        info_text = f"Session: {self.session_id}"
+        ttk.Label(top_frame, text=info_text,
+                  font=("Courier", 12)).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(top_frame,
+                   text="📄 复制 Session ID",
+                   command=lambda: self.window.clipboard_clear() or self.window
+                   .clipboard_append(self.session_id)).pack(side=tk.RIGHT,
+                                                            padx=5)
+
+        # 主文本区域
+        self.text = scrolledtext.ScrolledText(self.window,
+                                              font=("", 12),
+                                              wrap=tk.WORD,
+                                              padx=10,
+                                              pady=10)
+        self.text.pack(fill=tk.BOTH, expand=True)
+        # 滚动接近已加载内容的边缘时加载相邻页
+        self.text.configure(yscrollcommand=self.on_text_scroll)
+
+        self.setup_tags()
+
+        # 底部工具栏
+        bottom_frame = ttk.Frame(self.window, padding=10)
+        bottom_frame.pack(fill=tk.X)
+
+        ttk.Label(bottom_frame, text="🔍 搜索:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(bottom_frame,
+                                 textvariable=self.search_var,
+                                 width=30)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<Return>", self.search_text)
+
+        ttk.Button(bottom_frame, text="查找下一个",
+                   command=self.search_next).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(bottom_frame, text="关闭",
+                   command=self.window.destroy).pack(side=tk.RIGHT, padx=5)
+
+        self.page_label = ttk.Label(bottom_frame, text="", foreground="#999999")
+        self.page_label.pack(side=tk.RIGHT, padx=10)
+
+        self.search_pos = None
+
+    def setup_tags(self):
+        """设置文本标签样式"""
+        self.text.tag_config("user_msg",
+                             foreground="#0066cc",
+                             font=("", 12, "bold"),
+                             spacing1=10)
+        self.text.tag_config("assistant_msg",
+                             foreground="#008800",
+                             font=("", 12),
+                             spacing1=5)
+        self.text.tag_config("system_msg",
+                             foreground="#666666",
+                             font=("", 11),
+                             spacing1=3)
+        self.text.tag_config("tool_msg", foreground="#aa6600", font=("", 11))
+        self.text.tag_config("content",
+                             foreground="#333333",
+                             font=("", 12),
+                             lmargin1=20,
+                             lmargin2=20)
+        self.text.tag_config("meta", foreground="#999999", font=("", 10))
+
+    def load_conversation(self):
+        """在后台线程中打开对话文件（已归档的会话需要先解压）"""
+        self.text.insert(1.0, "⏳ 正在打开对话…", "meta")
+
+        def worker():
+            try:
+                self.open_queue.put(('done', self.data.open_conversation(
+                    self.session_id, self.project_path)))
+            except Exception as e:
+                self.open_queue.put(('error', str(e)))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.window.after(20, self.poll_open_queue)
+
+    def poll_open_queue(self):
+        """界面线程：对话打开后分批建立偏移索引，第一页就绪后立即显示"""
+        if not self.window.winfo_exists():
+            return
+        try:
+            kind, payload = self.open_queue.get_nowait()
+        except queue.Empty:
+            self.window.after(50, self.poll_open_queue)
+            return
+
+        self.text.delete(1.0, tk.END)
+        if kind == 'error':
+            self.text.insert(1.0, f"❌ 打开对话失败: {payload}")
+            return
+        self.pager = payload
+        if self.pager.file_size == 0:
+            self.text.insert(1.0, "❌ 对话数据文件不存在或为空")
+            return
+        self.index_step()
+        if self.pending_search:
+            self.pending_search = False
+            self.search_text()
+
+    def index_step(self):
+        """建立一批索引（每批 8MB），未完成时稍后继续"""
+        if not self.window.winfo_exists():
+            return
+        done = self.pager.index_more(max_bytes=8 * 1024 * 1024)
+
+        if done and self.pager.get_record_count() == 0:
+            self.text.insert(1.0, "❌ 对话数据文件不存在或为空")
+        elif self.last_page < 0 and self.pager.get_page_count() > 0:
+            self.show_page(0)
+            self.text.see(1.0)
+        elif (self.last_page + 1 < self.pager.get_page_count()
+              and float(self.text.yview()[1]) > 0.9):
+            # 已滚动到底部时，新索引出的页直接补上
+            self.append_page()
+        self.update_page_label()
+
+        if not done:
+            self.window.after(1, self.index_step)
+
+    def update_page_label(self):
+        """显示已加载的页范围"""
+        total = self.pager.get_page_count()
+        suffix = "" if self.pager.complete else "（索引中…）"
+        if self.last_page < 0:
+            self.page_label.config(text=f"共 {total} 页{suffix}")
+        else:
+            self.page_label.config(
+                text=f"第 {self.first_page + 1}-{self.last_page + 1} 页 / "
+                f"共 {total} 页{suffix}")
+
+    def render_page(self, page: int) -> list:
+        """把一页记录转成 Text.insert 的 (文本, 标签, ...) 参数序列"""
+        chunks = []
+        for msg in self.pager.read_page(page):
+            extracted = extract_message_text(msg)
+            if not extracted:
+                continue
+            role, content = extracted
+            if not content or content.isspace():
+                continue
+            label, tag = self.ROLE_STYLES[role]
+            chunks.extend((f"\n{label}:\n", tag, f"{content}\n", "content"))
+        return chunks
+
+    def show_page(self, page: int):
+        """清空文本框，只显示指定页（之后随滚动加载相邻页）"""
+        self.text.delete(1.0, tk.END)
+        for name in self.text.mark_names():
+            if name.startswith("page_"):
+                self.text.mark_unset(name)
+        self.search_pos = None
+        self.first_page = page
+        self.last_page = page - 1
+        self.append_page()
+        self.update_page_label()
+
+    def append_page(self):
+        """在末尾加载下一页（跳过没有可显示消息的页），超出上限时丢弃第一页"""
+        total = self.pager.get_page_count()
+        while self.last_page + 1 < total:
+            page = self.last_page + 1
+            chunks = self.render_page(page)
+            mark = f"page_{page}"
+            self.text.mark_set(mark, "end-1c")
+            self.text.mark_gravity(mark, tk.LEFT)
+            if chunks:
+                self.text.insert(tk.END, *chunks)
+            self.last_page = page
+            if chunks:
+                break
+
+        if self.last_page - self.first_page + 1 > self.MAX_LOADED_PAGES:
+            self.keep_view(self.drop_first_page)
+
+    def prepend_page(self):
+        """在开头加载上一页，超出上限时丢弃最后一页"""
+        while self.first_page > 0:
+            page = self.first_page - 1
+            chunks = self.render_page(page)
+            old_mark = f"page_{self.first_page}"
+
+            def insert():
+                # 插入期间让原第一页的标记随文本右移
+                self.text.mark_gravity(old_mark, tk.RIGHT)
+                if chunks:
+                    self.text.insert(1.0, *chunks)
+                self.text.mark_gravity(old_mark, tk.LEFT)
+                self.text.mark_set(f"page_{page}", 1.0)
+                self.text.mark_gravity(f"page_{page}", tk.LEFT)
+
+            self.keep_view(insert)
+            self.first_page = page
+            if chunks:
+                break
+
+        if self.last_page - self.first_page + 1 > self.MAX_LOADED_PAGES:
+            self.text.delete(f"page_{self.last_page}", tk.END)
+            self.text.mark_unset(f"page_{self.last_page}")
+            self.last_page -= 1
+
+    def drop_first_page(self):
+        """丢弃已加载的第一页"""
+        self.text.delete(1.0, f"page_{self.first_page + 1}")
+        self.text.mark_unset(f"page_{self.first_page}")
+        self.first_page += 1
+
+    def keep_view(self, modify):
+        """修改视口上方的内容时保持可见位置不变"""
+        self.text.mark_set("view_top", "@0,0")
+        modify()
+        self.text.yview("view_top")
+
+    def on_text_scroll(self, first, last):
+        """滚动回调：同步滚动条，接近边缘时加载相邻页"""
+        self.text.vbar.set(first, last)
+        if self.pager is None or self.last_page < 0 or self.loading_page:
+            return
+
+        if float(last) > 0.9 and self.last_page + 1 < self.pager.get_page_count():
+            action = self.append_page
+        elif float(first) < 0.1 and self.first_page > 0:
+            action = self.prepend_page
+        else:
+            return
+
+        # 在回调之外修改文本，避免在布局过程中重入
+        def load():
+            self.loading_page = False
+            action()
+            self.update_page_label()
+
+        self.loading_page = True
+        self.window.after_idle(load)
+
+    def search_text(self, event=None):
+        """搜索文本：先在已加载的页中查找，找不到时通过偏移索引定位后续页"""
+        keyword = self.search_var.get()
+        if not keyword:
+            return
+        if self.pager is None:
+            self.pending_search = True
+            return
+
+        start = "1.0" if self.search_pos is None else self.search_pos
+        pos = self.text.search(keyword, start, stopindex=tk.END, nocase=True)
+
+        if not pos:
+            # 搜索需要完整的索引
+            self.pager.index_more()
+            start_record = (self.last_page + 1) * self.pager.page_size
+            record = self.pager.find(keyword, start_record)
+            if record < 0:
+                # 从头再找一遍
+                record = self.pager.find(keyword, 0)
+            if record >= 0:
+                self.show_page(record // self.pager.page_size)
+                pos = self.text.search(keyword,
+                                       "1.0",
+                                       stopindex=tk.END,
+                                       nocase=True)
+
+        if pos:
+            # 用标记记录位置，加载/丢弃页时随文本移动
+            self.text.mark_set("search_end", f"{pos}+{len(keyword)}c")
+            self.search_pos = "search_end"
+            self.text.see(pos)
+            self.text.focus_set()
+        else:
+            messagebox.showinfo("搜索", f"未找到: {keyword}")
+
+    def search_next(self):
+        """查找下一个"""
+        self.search_text()
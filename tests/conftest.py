@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""测试夹具：在临时目录中构造最小的 ~/.claude 数据目录"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from claude_session_data import SessionData  # noqa: E402
+
+OLD_TS = time.time() - 30 * 86400  # 非活跃会话的文件时间
+
+SID_A = '11111111-1111-1111-1111-111111111111'
+SID_B = '22222222-2222-2222-2222-222222222222'
+SID_C = '33333333-3333-3333-3333-333333333333'
+
+
+def write_messages(path, texts, mode='w'):
+    """写入（或追加）若干条外部用户消息"""
+    with open(path, mode, encoding='utf-8') as f:
+        for text in texts:
+            f.write(json.dumps({'type': 'user', 'userType': 'external',
+                                'message': {'content': text}}) + '\n')
+
+
+def read_history_ids(tree) -> list:
+    with open(tree.claude_dir / 'history.jsonl', encoding='utf-8') as f:
+        return [json.loads(line)['sessionId'] for line in f]
+
+
+class ClaudeTree:
+    """在 claude_dir 下写入会话文件和 history 记录"""
+
+    def __init__(self, claude_dir: Path):
+        self.claude_dir = claude_dir
+        self.history = []
+        for name in ('projects', 'debug', 'session-env', 'file-history',
+                     'todos'):
+            (claude_dir / name).mkdir(parents=True, exist_ok=True)
+
+    def add_session(self,
+                    session_id: str,
+                    project: str = '/home/u/proj',
+                    messages: int = 5,
+                    padding: int = 0,
+                    last_used: float = OLD_TS,
+                    title: str = None,
+                    active: bool = False) -> str:
+        """写入一个会话的对话、debug、session-env、file-history 和 todos"""
+        conv_dir = self.claude_dir / 'projects' / project.replace('/', '-')
+        conv_dir.mkdir(parents=True, exist_ok=True)
+        iso = time.strftime('%Y-%m-%dT%H:%M:%S.000Z',
+                            time.gmtime(time.time() if active else last_used))
+        with open(conv_dir / f"{session_id}.jsonl", 'w',
+                  encoding='utf-8') as f:
+            if title:
+                f.write(json.dumps({'customTitle': title}) + '\n')
+            for i in range(messages):
+                f.write(
+                    json.dumps({
+                        'type': 'user',
+                        'userType': 'external',
+                        'timestamp': iso,
+                        'message': {
+                            'content': f"message {i} " + 'x' * padding
+                        }
+                    }) + '\n')
+        (self.claude_dir / 'debug' / f"{session_id}.txt").write_text(
+            '[DEBUG] start\n')
+        env_dir = self.claude_dir / 'session-env' / session_id
+        env_dir.mkdir()
+        (env_dir / 'env.sh').write_text('export A=1\n')
+        hist_dir = self.claude_dir / 'file-history' / session_id
+        hist_dir.mkdir()
+        (hist_dir / 'a.py@v1').write_text('print(1)\n')
+        (self.claude_dir / 'todos' /
+         f"{session_id}-agent-{session_id}.json").write_text('[]')
+
+        self.history.append({
+            'display': f"prompt {session_id}",
+            'timestamp': int(last_used * 1000),
+            'project': project,
+            'sessionId': session_id
+        })
+        self.write_history()
+        if not active:
+            self.age_files(session_id, last_used)
+        return session_id
+
+    def age_files(self, session_id: str, ts: float):
+        """把会话文件的修改时间改为 ts（活跃检测按 mtime 过滤）"""
+        for root, dirs, files in os.walk(self.claude_dir):
+            for name in files:
+                if session_id in name or session_id in root:
+                    os.utime(os.path.join(root, name), (ts, ts))
+
+    def write_history(self):
+        with open(self.claude_dir / 'history.jsonl', 'w',
+                  encoding='utf-8') as f:
+            for entry in self.history:
+                f.write(json.dumps(entry) + '\n')
+
+
+@pytest.fixture
+def tree(tmp_path) -> ClaudeTree:
+    return ClaudeTree(tmp_path / '.claude')
+
+
+@pytest.fixture
+def make_data(tree, tmp_path):
+    """创建指向临时数据目录和缓存目录的 SessionData（已加载并检测活跃会话）"""
+
+    def make() -> SessionData:
+        data = SessionData(claude_dir=tree.claude_dir,
+                           cache_dir=tmp_path / 'cache')
+        data.load_sessions()
+        data.get_active_sessions()
+        return data
+
+    return make
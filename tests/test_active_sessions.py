@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""活跃会话检测：从对话文件末尾读取最后的时间戳"""
+
+import json
+import os
+import time
+
+from claude_session_data import read_tail_records
+from conftest import SID_A, SID_B, SID_C
+
+
+def iso(ts: float) -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(ts))
+
+
+def test_read_tail_records_across_blocks(tmp_path):
+    path = tmp_path / 'conv.jsonl'
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(50):
+            f.write(json.dumps({'i': i, 'pad': 'x' * 100}) + '\n')
+        f.write('not json\n\n')
+
+    # 块比一行还小，行需要跨块拼接；无效行和空行被跳过
+    records = read_tail_records(path, max_records=3, block_size=64)
+
+    assert [r['i'] for r in records] == [49, 48, 47]
+
+
+def test_tail_and_full_modes_agree(tree, make_data):
+    now = time.time()
+    tree.add_session(SID_A, active=True)
+    tree.add_session(SID_B)
+    # C 的文件刚被修改，但最后一条消息很早：按消息时间判断为非活跃
+    tree.add_session(SID_C)
+    os.utime(tree.claude_dir / 'debug' / f"{SID_C}.txt",
+             (now - 3600, now - 3600))
+    conv_file = next(tree.claude_dir.glob(f"projects/*/{SID_C}.jsonl"))
+    os.utime(conv_file, (now, now))
+    data = make_data()
+
+    tail = data.get_active_sessions(minutes=10, mode='tail')
+    full = data.get_active_sessions(minutes=10, mode='full')
+
+    assert tail == full == {SID_A}
+    assert data.last_activity[SID_A] > now - 600
+
+
+def test_tail_mode_skips_files_not_modified_recently(tree, make_data):
+    tree.add_session(SID_A)
+    data = make_data()
+    # 文件 mtime 早于时限时不读取内容，即使其中的时间戳是新的
+    conv_file = next(tree.claude_dir.glob(f"projects/*/{SID_A}.jsonl"))
+    assert data._get_last_timestamp_tail(conv_file, time.time() - 600) == 0
+    with open(conv_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'timestamp': iso(time.time())}) + '\n')
+    assert data._get_last_timestamp_tail(conv_file,
+                                         time.time() - 600) > time.time() - 60
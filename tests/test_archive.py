@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""会话归档和恢复"""
+
+import os
+
+from conftest import SID_A, SID_B, SID_C
+
+
+def snapshot_files(root) -> dict:
+    """{相对路径: (内容, mtime)}"""
+    files = {}
+    for dirpath, dirs, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, root)] = (f.read(),
+                                                      int(os.path.getmtime(path)))
+    return files
+
+
+def test_archive_restore_round_trip(tree, make_data):
+    tree.add_session(SID_A, messages=20, padding=200)
+    tree.add_session(SID_B)
+    before = snapshot_files(tree.claude_dir)
+    data = make_data()
+    messages = list(data.iter_conversation(SID_A, '/home/u/proj'))
+
+    result = data.archive_sessions([(SID_A, '/home/u/proj')])
+
+    assert result['archived'] == 1
+    assert result['archive_size'] < result['original_size']
+    assert data.is_archived(SID_A)
+    assert not data.get_conversation_file(SID_A, '/home/u/proj').exists()
+    assert not (tree.claude_dir / 'file-history' / SID_A).exists()
+    # 会话仍在列表中，元数据和对话可以从归档读取
+    data.load_sessions()
+    assert data.get_session(SID_A) is not None
+    meta = data.get_session_meta(SID_A, '/home/u/proj')
+    assert meta['archived'] and meta['message_count'] == 20
+    assert list(data.iter_conversation(SID_A, '/home/u/proj')) == messages
+
+    result = data.restore_sessions([SID_A])
+
+    assert result['restored'] == 1
+    assert not data.is_archived(SID_A)
+    assert snapshot_files(tree.claude_dir) == before
+
+
+def test_restore_refuses_to_overwrite(tree, make_data):
+    tree.add_session(SID_A)
+    data = make_data()
+    data.archive_sessions([(SID_A, '/home/u/proj')])
+    debug_file = tree.claude_dir / 'debug' / f"{SID_A}.txt"
+    debug_file.write_text('new log\n')
+
+    result = data.restore_sessions([SID_A])
+
+    assert result['failed'] == 1
+    assert str(debug_file) in result['sessions'][SID_A]['conflicts']
+    assert debug_file.read_text() == 'new log\n'
+    assert data.is_archived(SID_A)
+    assert not data.get_conversation_file(SID_A, '/home/u/proj').exists()
+
+
+def test_failed_restore_rolls_back_files_and_dirs(tree, make_data,
+                                                  monkeypatch):
+    tree.add_session(SID_A, project='/home/u/solo')
+    data = make_data()
+    data.archive_sessions([(SID_A, '/home/u/solo')])
+    project_dir = data.get_conversation_file(SID_A, '/home/u/solo').parent
+    project_dir.rmdir()
+    before = snapshot_files(tree.claude_dir)
+    utime = os.utime
+
+    def fail_on_todos(path, *args, **kwargs):
+        if 'todos' in str(path):
+            raise OSError("disk full")
+        return utime(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, 'utime', fail_on_todos)
+    result = data.restore_sessions([SID_A])
+
+    assert result['failed'] == 1
+    assert data.is_archived(SID_A)
+    assert snapshot_files(tree.claude_dir) == before
+    for path in (project_dir, tree.claude_dir / 'session-env' / SID_A,
+                 tree.claude_dir / 'file-history' / SID_A):
+        assert not path.exists()
+    # 原本就存在的上级目录不受影响
+    assert (tree.claude_dir / 'session-env').is_dir()
+
+
+def test_archive_view_cache_evicts_least_recently_used(tree, make_data):
+    for sid in (SID_A, SID_B, SID_C):
+        tree.add_session(sid, messages=10, padding=100)
+    data = make_data()
+    data.archive_sessions([(sid, '/home/u/proj') for sid in (SID_A, SID_B,
+                                                             SID_C)])
+    view_dir = data.cache_dir / 'archive-view'
+
+    for i, sid in enumerate((SID_A, SID_B)):
+        pager = data.open_conversation(sid, '/home/u/proj')
+        pager.index_more()
+        assert pager.get_record_count() == 10
+        os.utime(pager.conv_file, (1000 + i, 1000 + i))
+    # 再次查看 A 时复用副本，并把它标记为最近使用
+    assert data.open_conversation(SID_A, '/home/u/proj').conv_file.parent == \
+        view_dir
+    view_size = (view_dir / f"{SID_A}.jsonl").stat().st_size
+
+    data._extract_archived_conversation(SID_C)
+    data._prune_archive_views(view_dir / f"{SID_C}.jsonl",
+                              max_bytes=2 * view_size)
+
+    assert sorted(p.name for p in view_dir.iterdir()) == [
+        f"{SID_A}.jsonl", f"{SID_C}.jsonl"
+    ]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""基准测试：模拟数据生成和测量结果字段"""
+
+from claude_session_bench import (PRESETS, generate_tree, measure,
+                                  parse_strace_summary)
+
+STRACE_OUTPUT = """\
+% time     seconds  usecs/call     calls    errors syscall
+------ ----------- ----------- --------- --------- ----------------
+ 60.00    0.000600           3       200           read
+ 40.00    0.000400           4       123        12 openat
+------ ----------- ----------- --------- --------- ----------------
+100.00    0.001000           3       323        12 total
+"""
+
+
+def test_parse_strace_summary():
+    assert parse_strace_summary(STRACE_OUTPUT) == 323
+    # errors 列为空
+    assert parse_strace_summary(
+        '100.00    0.001000           3       42           total\n') == 42
+    assert parse_strace_summary('strace: exec failed\n') is None
+
+
+def test_measure_reports_io_and_rusage_fields(tmp_path):
+    config = dict(PRESETS['small'], sessions=10, snapshots=3)
+    claude_dir = tmp_path / '.claude'
+    stats = generate_tree(claude_dir, config)
+
+    result = measure('load_sessions', claude_dir, tmp_path / 'cache')
+
+    assert result['items'] == stats['history_lines']
+    assert 'syscr' not in result
+    for key in ('read_calls', 'write_calls', 'block_in', 'block_out',
+                'voluntary_switches', 'involuntary_switches'):
+        assert key in result
+    assert result['peak_rss_kb'] >= result['baseline_rss_kb']
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""命令标签清理：单次预编译正则与原先逐个标签 re.sub 的结果一致"""
+
+import random
+import re
+
+import pytest
+
+from claude_session_data import clean_command_content
+
+COMMAND_TAGS = ('local-command-caveat', 'command-name', 'command-message',
+                'command-args', 'local-command-stdout')
+
+
+def old_clean_command_content(content: str, limit: int = None) -> str:
+    """原先的实现：每种命令标签一次 re.sub，再移除其余标签"""
+    for tag in COMMAND_TAGS:
+        content = re.sub(f"<{tag}>.*?</{tag}>", '', content, flags=re.DOTALL)
+    content = re.sub(r'<[^>]+>', '', content)
+    if limit is not None and len(content) > limit:
+        content = content[:limit] + "..."
+    return content.strip()
+
+
+def random_content(rng: random.Random) -> str:
+    """随机拼接文本、命令块和普通标签（标签完整且互不交叠）"""
+    words = ['hello', '  ', '\n', 'a > b', '中文输出', 'x' * 150, '/clear']
+    parts = []
+    for _ in range(rng.randint(0, 12)):
+        choice = rng.random()
+        if choice < 0.3:
+            tag = rng.choice(COMMAND_TAGS)
+            parts.append(f"<{tag}>{rng.choice(words)}\n{rng.choice(words)}"
+                         f"</{tag}>")
+        elif choice < 0.45:
+            parts.append(rng.choice(['<b>', '</b>', '<system-reminder>',
+                                     '<br/>']))
+        else:
+            parts.append(rng.choice(words))
+    return ''.join(parts)
+
+
+@pytest.mark.parametrize('content', [
+    '',
+    'plain text',
+    '<command-name>/clear</command-name>\n<command-message>clear'
+    '</command-message>\n<command-args></command-args>',
+    '<local-command-stdout>line1\nline2</local-command-stdout>done',
+    '<b>bold</b> and <command-args>--all</command-args> text',
+    'a < b',
+    '<unclosed',
+])
+def test_matches_old_implementation(content):
+    assert clean_command_content(content) == old_clean_command_content(
+        content)
+    assert clean_command_content(content, limit=200) == \
+        old_clean_command_content(content, limit=200)
+
+
+def test_matches_old_implementation_on_random_input():
+    rng = random.Random(16)
+    for _ in range(2000):
+        content = random_content(rng)
+        limit = rng.choice([None, 5, 50, 200])
+        assert clean_command_content(content, limit) == \
+            old_clean_command_content(content, limit), content
+
+
+def test_preview_stops_scanning_at_limit():
+    # 截断后的内容不受后面标签的影响
+    content = 'x' * 300 + '<command-args>' + 'y' * 10
+    assert clean_command_content(content, limit=200) == 'x' * 200 + '...'
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""对话分页读取：记录偏移索引、按页读取和查找"""
+
+import json
+
+from claude_session_data import ConversationPager
+from conftest import write_messages
+
+
+def test_offsets_skip_blank_lines_and_stop_at_open_size(tmp_path):
+    conv_file = tmp_path / 'conv.jsonl'
+    write_messages(conv_file, ['one'])
+    with open(conv_file, 'a', encoding='utf-8') as f:
+        f.write('\n')
+    write_messages(conv_file, ['two', 'three'], mode='a')
+    lines = conv_file.read_bytes().splitlines(keepends=True)
+
+    pager = ConversationPager(conv_file, page_size=2)
+    # 打开之后追加的内容不计入本次索引
+    write_messages(conv_file, ['four'], mode='a')
+    assert pager.index_more()
+
+    first, blank, second = (len(line) for line in lines[:3])
+    assert list(pager.offsets) == [0, first + blank, first + blank + second]
+    assert pager.get_record_count() == 3
+
+
+def test_index_more_is_incremental(tmp_path):
+    conv_file = tmp_path / 'conv.jsonl'
+    write_messages(conv_file, [f"message {i}" for i in range(10)])
+    pager = ConversationPager(conv_file, page_size=4)
+
+    assert not pager.index_more(max_bytes=1)
+    assert pager.get_record_count() == 1
+    # 未完成时只计算已满的页
+    assert pager.get_page_count() == 0
+    while not pager.index_more(max_bytes=100):
+        pass
+    assert pager.get_record_count() == 10
+    assert pager.get_page_count() == 3
+
+
+def test_read_page_and_find(tmp_path):
+    conv_file = tmp_path / 'conv.jsonl'
+    write_messages(conv_file, [f"message {i}" for i in range(5)])
+    with open(conv_file, 'a', encoding='utf-8') as f:
+        f.write('{broken\n')
+        f.write(json.dumps({'type': 'user', 'userType': 'external',
+                            'message': {'content': '含有"引号"的中文'}}) +
+                '\n')
+    pager = ConversationPager(conv_file, page_size=2)
+    pager.index_more()
+
+    assert [m['message']['content'] for m in pager.read_page(1)] == [
+        'message 2', 'message 3']
+    # 无法解析的记录占一个序号，但不出现在页面中
+    assert [m['message']['content'] for m in pager.read_page(2)] == [
+        'message 4']
+    assert pager.read_page(5) == []
+
+    assert pager.find('MESSAGE 3') == 3
+    assert pager.find('message 1', start=2) == -1
+    # 关键词在原始行中以 JSON 转义形式出现
+    assert pager.find('"引号"') == 6
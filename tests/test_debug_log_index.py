@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""调试日志索引：行偏移、级别过滤和正则搜索"""
+
+import re
+
+import pytest
+
+from claude_session_data import DebugLogIndex
+
+LOG = (b'[DEBUG] start\n'
+       b'[WARN] slow response\n'
+       b'[ERROR] failed [ERROR] twice\n'
+       b'\n'
+       b'[DEBUG] retry 42\n'
+       b'[ERROR] no newline at end')
+
+
+@pytest.fixture
+def index(tmp_path):
+    log_file = tmp_path / 'debug.txt'
+    log_file.write_bytes(LOG)
+    index = DebugLogIndex(log_file)
+    index.open()
+    yield index
+    index.close()
+
+
+def test_lines_are_indexed_in_chunks(index):
+    assert not index.index_more(max_bytes=20)
+    assert index.get_line_count() == 2
+    assert index.index_more()
+
+    assert index.get_line_count() == 6
+    assert [index.get_line(i) for i in range(6)] == LOG.decode().split('\n')
+
+
+def test_level_lines(index):
+    # 同一行出现两次标签只记录一次，最后一行没有换行符
+    assert index.get_level_lines('ERROR') == [2, 5]
+    assert index.get_level_lines('WARN') == [1]
+    assert DebugLogIndex.get_level(index.get_line(1)) == 'WARN'
+    assert DebugLogIndex.get_level(index.get_line(4)) == 'DEBUG'
+
+
+def test_search(index):
+    pattern = re.compile(rb'retry \d+')
+
+    assert index.search(pattern) == 4
+    assert index.search(pattern, start_line=5) == -1
+    assert index.search(re.compile(rb'(?i)error'), start_line=3) == 5
+
+
+def test_empty_file(tmp_path):
+    log_file = tmp_path / 'empty.txt'
+    log_file.write_bytes(b'')
+    index = DebugLogIndex(log_file)
+    index.open()
+    try:
+        assert index.index_more()
+        assert index.get_line_count() == 0
+        assert index.get_level_lines('ERROR') == []
+        assert index.search(re.compile(rb'x')) == -1
+    finally:
+        index.close()
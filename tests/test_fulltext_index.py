@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""全文索引：增量更新、删除文件、短查询回退"""
+
+import os
+import sqlite3
+
+import pytest
+
+from claude_session_data import FullTextIndex
+from conftest import SID_A, SID_B, write_messages
+
+pytestmark = pytest.mark.skipif(not FullTextIndex.is_available(),
+                                reason='sqlite3 不支持 FTS5')
+
+
+@pytest.fixture
+def index(tmp_path):
+    return FullTextIndex(tmp_path / 'cache' / 'fulltext.sqlite3')
+
+
+@pytest.fixture
+def projects_dir(tmp_path):
+    path = tmp_path / 'projects' / '-home-u-proj'
+    path.mkdir(parents=True)
+    return path.parent
+
+
+def message_rows(index, session_id) -> list:
+    conn = sqlite3.connect(str(index.db_file))
+    try:
+        return [row[0] for row in conn.execute(
+            'SELECT content FROM messages WHERE session_id = ?',
+            (session_id, ))]
+    finally:
+        conn.close()
+
+
+def test_update_indexes_new_and_appended_files(index, projects_dir):
+    conv_a = projects_dir / '-home-u-proj' / f"{SID_A}.jsonl"
+    write_messages(conv_a, ['refactor the parser', 'add logging'])
+    write_messages(projects_dir / '-home-u-proj' / f"{SID_B}.jsonl",
+                   ['fix the parser crash'])
+
+    assert index.update(projects_dir) == {'indexed': 2, 'removed': 0,
+                                          'total': 2}
+    assert sorted(hit['session_id'] for hit in index.search('parser')) == [
+        SID_A, SID_B]
+    # 文件未变化时不重新索引
+    assert index.update(projects_dir)['indexed'] == 0
+
+    write_messages(conv_a, ['benchmark the scanner'], mode='a')
+    assert index.update(projects_dir)['indexed'] == 1
+    # 追加时从上次偏移继续，已有的消息不重复索引
+    assert message_rows(index, SID_A) == [
+        'refactor the parser', 'add logging', 'benchmark the scanner'
+    ]
+    assert [hit['session_id'] for hit in index.search('scanner')] == [SID_A]
+
+
+def test_rewritten_file_is_reindexed(index, projects_dir):
+    conv_a = projects_dir / '-home-u-proj' / f"{SID_A}.jsonl"
+    write_messages(conv_a, ['first draft', 'second draft'])
+    index.update(projects_dir)
+
+    write_messages(conv_a, ['rewritten content'])
+    index.update(projects_dir)
+
+    assert message_rows(index, SID_A) == ['rewritten content']
+    assert index.search('draft') == []
+
+
+def test_replaced_file_is_reindexed(index, projects_dir, tmp_path):
+    conv_a = projects_dir / '-home-u-proj' / f"{SID_A}.jsonl"
+    write_messages(conv_a, ['alpha', 'omega'])
+    index.update(projects_dir)
+
+    # 替换成另一个文件：上次偏移前的末尾字节相同，但 inode 不同
+    replacement = tmp_path / 'replacement.jsonl'
+    write_messages(replacement, ['gamma', 'omega', 'delta'])
+    os.replace(replacement, conv_a)
+    index.update(projects_dir)
+
+    assert message_rows(index, SID_A) == ['gamma', 'omega', 'delta']
+
+
+def test_deleted_file_is_removed(index, projects_dir):
+    conv_a = projects_dir / '-home-u-proj' / f"{SID_A}.jsonl"
+    write_messages(conv_a, ['temporary notes'])
+    index.update(projects_dir)
+
+    conv_a.unlink()
+
+    assert index.update(projects_dir)['removed'] == 1
+    assert index.search('notes') == []
+
+
+def test_short_query_falls_back_to_substring_scan(index, projects_dir):
+    write_messages(projects_dir / '-home-u-proj' / f"{SID_A}.jsonl",
+                   ['修复 UI 卡顿', 'unrelated'])
+    index.update(projects_dir)
+
+    hits = index.search('ui')
+
+    assert [hit['session_id'] for hit in hits] == [SID_A]
+    assert '【UI】' in hits[0]['snippet']
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""增量加载 history.jsonl：只解析追加部分，文件被改写时完整重新解析"""
+
+import json
+
+from claude_session_data import SessionData
+from conftest import SID_A, SID_B, SID_C
+
+
+def history_line(session_id: str, timestamp: int = 1000) -> str:
+    return json.dumps({
+        'display': f"prompt {session_id}",
+        'timestamp': timestamp,
+        'project': '/home/u/proj',
+        'sessionId': session_id
+    }) + '\n'
+
+
+def count_parsed(monkeypatch) -> list:
+    """记录 _parse_history_line 解析过的行"""
+    parsed = []
+    original = SessionData._parse_history_line
+
+    def parse(raw):
+        parsed.append(raw)
+        return original(raw)
+
+    monkeypatch.setattr(SessionData, '_parse_history_line',
+                        staticmethod(parse))
+    return parsed
+
+
+def test_append_parses_only_new_lines(tree, make_data, monkeypatch):
+    tree.add_session(SID_A)
+    tree.add_session(SID_B)
+    data = make_data()
+    assert {s['sessionId'] for s in data.get_unique_sessions()} == {
+        SID_A, SID_B}
+
+    parsed = count_parsed(monkeypatch)
+    tree.add_session(SID_C)
+    data.load_sessions()
+
+    assert len(parsed) == 1
+    assert [s['sessionId'] for s in data.sessions] == [SID_A, SID_B, SID_C]
+    # 追加的会话合并进已缓存的去重结果
+    assert {s['sessionId'] for s in data.get_unique_sessions()} == {
+        SID_A, SID_B, SID_C}
+
+
+def test_rewritten_history_is_fully_reparsed(tree, make_data, monkeypatch):
+    tree.add_session(SID_A)
+    tree.add_session(SID_B)
+    data = make_data()
+    history_file = tree.claude_dir / 'history.jsonl'
+
+    # 原地改写成相同长度的内容：inode 和大小不变，但末尾字节变化
+    content = history_file.read_text(encoding='utf-8')
+    history_file.write_text(content.replace(SID_B, SID_C), encoding='utf-8')
+    parsed = count_parsed(monkeypatch)
+    data.load_sessions()
+    assert len(parsed) == 2
+    assert [s['sessionId'] for s in data.sessions] == [SID_A, SID_C]
+
+    # 截短
+    history_file.write_text(history_line(SID_A), encoding='utf-8')
+    data.load_sessions()
+    assert [s['sessionId'] for s in data.sessions] == [SID_A]
+
+
+def test_partial_last_line_is_read_once_complete(tree, make_data):
+    tree.add_session(SID_A)
+    data = make_data()
+    history_file = tree.claude_dir / 'history.jsonl'
+
+    line = history_line(SID_B)
+    with open(history_file, 'a', encoding='utf-8') as f:
+        f.write(line[:20])
+    data.load_sessions()
+    assert [s['sessionId'] for s in data.sessions] == [SID_A]
+
+    with open(history_file, 'a', encoding='utf-8') as f:
+        f.write(line[20:])
+    data.load_sessions()
+    assert [s['sessionId'] for s in data.sessions] == [SID_A, SID_B]
+
+
+def test_missing_history_clears_sessions(tree, make_data):
+    tree.add_session(SID_A)
+    data = make_data()
+
+    (tree.claude_dir / 'history.jsonl').unlink()
+
+    assert data.load_sessions() == []
+    assert data.get_unique_sessions() == []
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""多数据目录聚合：会话键解析"""
+
+import pytest
+
+from claude_session_data import MultiRootSessionData
+from conftest import SID_A, SID_B, SID_C, ClaudeTree
+
+
+def test_multi_root_rejects_ambiguous_session_id(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    alice = ClaudeTree(tmp_path / 'alice' / '.claude')
+    bob = ClaudeTree(tmp_path / 'bob' / '.claude')
+    alice.add_session(SID_A)
+    alice.add_session(SID_B)
+    bob.add_session(SID_A)
+    data = MultiRootSessionData([alice.claude_dir, bob.claude_dir])
+    data.load_sessions()
+
+    assert data.get_session(SID_B)['sessionId'] == f"alice:{SID_B}"
+    assert data.resolve(SID_B)[0] is data.roots['alice']
+    assert data.resolve(f"bob:{SID_A}") == (data.roots['bob'], SID_A)
+    with pytest.raises(ValueError, match=f"alice:{SID_A}"):
+        data.get_session(SID_A)
+    with pytest.raises(ValueError):
+        data.resolve(SID_A)
+    with pytest.raises(ValueError):
+        data.resolve(SID_C)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""批量删除：history 重写和关联文件删除"""
+
+import os
+
+import pytest
+
+from conftest import SID_A, SID_B, read_history_ids
+
+
+# ============ history 重写 ============
+
+
+def test_remove_history_entries_matches_exact_session_id(tree, make_data):
+    tree.add_session(SID_A)
+    tree.add_session(SID_B)
+    # sessionId 是另一个 ID 的前缀，或只在 display 中出现，都不能被误删
+    tree.history.append({
+        'display': f"see {SID_A}",
+        'timestamp': 1,
+        'project': '/p',
+        'sessionId': SID_A[:-1]
+    })
+    tree.write_history()
+    data = make_data()
+
+    removed = data._remove_history_entries({SID_A})
+
+    assert removed == {SID_A: 1}
+    assert read_history_ids(tree) == [SID_B, SID_A[:-1]]
+
+
+def test_remove_history_entries_replaces_atomically(tree, make_data,
+                                                    monkeypatch):
+    tree.add_session(SID_A)
+    tree.add_session(SID_B)
+    data = make_data()
+    history_file = tree.claude_dir / 'history.jsonl'
+    original = history_file.read_bytes()
+    inode = history_file.stat().st_ino
+
+    def fail_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, 'replace', fail_replace)
+    with pytest.raises(OSError):
+        data._remove_history_entries({SID_A})
+
+    # 失败时原文件不变，临时文件被清理
+    assert history_file.read_bytes() == original
+    assert sorted(p.name for p in tree.claude_dir.iterdir()
+                  if p.name.startswith('.history.')) == []
+
+    monkeypatch.undo()
+    data._remove_history_entries({SID_A})
+    # 成功时整体替换为新文件，而不是原地改写
+    assert history_file.stat().st_ino != inode
+    assert read_history_ids(tree) == [SID_B]
+
+
+def test_delete_sessions_removes_all_artifacts(tree, make_data):
+    tree.add_session(SID_A)
+    tree.add_session(SID_B)
+    data = make_data()
+
+    result = data.delete_sessions([(SID_A, '/home/u/proj')])
+
+    assert result['deleted'] == 1 and result['failed'] == 0
+    assert not (tree.claude_dir / 'debug' / f"{SID_A}.txt").exists()
+    assert not (tree.claude_dir / 'session-env' / SID_A).exists()
+    assert not (tree.claude_dir / 'file-history' / SID_A).exists()
+    assert list((tree.claude_dir / 'todos').glob(f"{SID_A}-*")) == []
+    assert (tree.claude_dir / 'session-env' / SID_B).exists()
+    assert read_history_ids(tree) == [SID_B]
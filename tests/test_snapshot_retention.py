@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""shell-snapshot 保留策略"""
+
+from claude_session_data import SnapshotRetentionPolicy
+
+DAY_MS = 86400 * 1000
+NOW_MS = 100 * DAY_MS
+
+
+def snapshot(name: str, shell: str, age_days: float, size: int = 100) -> dict:
+    return {
+        'name': name,
+        'shell': shell,
+        'timestamp': int(NOW_MS - age_days * DAY_MS),
+        'size': size
+    }
+
+
+SNAPSHOTS = [
+    snapshot('z1', 'zsh', 1),
+    snapshot('z2', 'zsh', 2),
+    snapshot('z3', 'zsh', 3),
+    snapshot('b1', 'bash', 10),
+    snapshot('z4', 'zsh', 20),
+    snapshot('b2', 'bash', 30),
+]
+
+
+def reasons(items: list) -> dict:
+    return {item['name']: item['reason'] for item in items}
+
+
+def test_keep_count_keeps_newest():
+    kept, deleted = SnapshotRetentionPolicy(keep_count=2).apply(
+        SNAPSHOTS, [], NOW_MS)
+
+    assert [s['name'] for s in kept] == ['z1', 'z2']
+    # 均按时间从新到旧排列
+    assert [s['name'] for s in deleted] == ['z3', 'b1', 'z4', 'b2']
+    assert set(reasons(deleted).values()) == {'expired'}
+
+
+def test_active_snapshots_are_always_kept():
+    active = sorted([SNAPSHOTS[5]['timestamp'] + 20000, NOW_MS + DAY_MS])
+    policy = SnapshotRetentionPolicy(keep_count=1, max_total_size=0)
+
+    kept, deleted = policy.apply(SNAPSHOTS, active, NOW_MS)
+
+    # 活跃快照既不占用 keep_count 名次，也不因超出预算被删除
+    assert reasons(kept) == {'b2': 'active'}
+    assert reasons(deleted)['z1'] == 'over_budget'
+    assert policy.is_active(SNAPSHOTS[5]['timestamp'], active)
+    assert not policy.is_active(SNAPSHOTS[5]['timestamp'] - 40000, active)
+
+
+def test_per_shell_and_age_rules():
+    policy = SnapshotRetentionPolicy(keep_count=None,
+                                     keep_per_shell=1,
+                                     max_age_days=2.5)
+
+    kept, deleted = policy.apply(SNAPSHOTS, [], NOW_MS)
+
+    assert reasons(kept) == {
+        'z1': 'keep_per_shell',
+        'z2': 'max_age',
+        'b1': 'keep_per_shell'
+    }
+    assert [s['name'] for s in deleted] == ['z3', 'z4', 'b2']
+
+
+def test_size_budget_removes_oldest_first():
+    snapshots = [
+        snapshot('new', 'zsh', 1, size=300),
+        snapshot('mid', 'zsh', 2, size=300),
+        snapshot('old', 'zsh', 3, size=300),
+    ]
+    policy = SnapshotRetentionPolicy(keep_count=3, max_total_size=650)
+
+    kept, deleted = policy.apply(snapshots, [], NOW_MS)
+
+    assert [s['name'] for s in kept] == ['new', 'mid']
+    assert reasons(deleted) == {'old': 'over_budget'}
+
+
+def test_cleanup_old_snapshots_dry_run(tree, make_data):
+    snapshots_dir = tree.claude_dir / 'shell-snapshots'
+    snapshots_dir.mkdir()
+    for i, ts in enumerate((1000, 2000, 3000)):
+        (snapshots_dir / f"snapshot-zsh-{ts}-id{i}.sh").write_text('x' * 10)
+    (snapshots_dir / 'notes.txt').write_text('ignored')
+    data = make_data()
+
+    result = data.cleanup_old_snapshots(
+        dry_run=True, policy=SnapshotRetentionPolicy(keep_count=1))
+
+    assert result['total_snapshots'] == 3
+    assert result['deleted_snapshots'] == 2
+    assert result['total_size_freed'] == 20
+    assert [f['name'] for f in result['kept_files']] == [
+        'snapshot-zsh-3000-id2.sh'
+    ]
+    assert len(list(snapshots_dir.iterdir())) == 4
+
+    data.cleanup_old_snapshots(policy=SnapshotRetentionPolicy(keep_count=1))
+    assert sorted(p.name for p in snapshots_dir.iterdir()) == [
+        'notes.txt', 'snapshot-zsh-3000-id2.sh'
+    ]
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""存储预算：淘汰顺序、受保护的会话和计划执行"""
+
+import os
+import time
+
+from claude_session_data import EvictionPolicy
+from conftest import SID_A, SID_B, SID_C, read_history_ids, write_messages
+
+
+def make_budget_tree(tree):
+    """A 最大、最近使用；B 中等、最久未用；C 最小、居中"""
+    now = time.time()
+    tree.add_session(SID_A, padding=4000, last_used=now - 10 * 86400)
+    tree.add_session(SID_B, padding=2000, last_used=now - 40 * 86400)
+    tree.add_session(SID_C, padding=500, last_used=now - 20 * 86400)
+
+
+def evicted_ids(plan) -> list:
+    return [item['session_id'] for item in plan['evicted']]
+
+
+def test_eviction_largest_first(tree, make_data):
+    make_budget_tree(tree)
+    data = make_data()
+    total = data.scan_storage().get_total_size()
+    size_a = data.inventory.get_session_size(SID_A)
+
+    plan = data.plan_storage_budget(EvictionPolicy(total - 1))
+    assert evicted_ids(plan) == [SID_A]
+
+    plan = data.plan_storage_budget(EvictionPolicy(total - size_a - 1))
+    assert evicted_ids(plan) == [SID_A, SID_B]
+    assert plan['reachable']
+
+
+def test_eviction_lru_first(tree, make_data):
+    make_budget_tree(tree)
+    data = make_data()
+    total = data.scan_storage().get_total_size()
+
+    plan = data.plan_storage_budget(EvictionPolicy(total - 1, order='lru'))
+    assert evicted_ids(plan) == [SID_B]
+
+    plan = data.plan_storage_budget(EvictionPolicy(0, order='lru'))
+    assert evicted_ids(plan) == [SID_B, SID_C, SID_A]
+    assert not plan['reachable']  # history.jsonl 本身也计入总大小
+
+
+def test_eviction_skips_active_titled_and_recent(tree, make_data):
+    make_budget_tree(tree)
+    tree.add_session('44444444-4444-4444-4444-444444444444',
+                     padding=9000,
+                     active=True)
+    tree.add_session('55555555-5555-5555-5555-555555555555',
+                     padding=9000,
+                     title='keep me')
+    data = make_data()
+
+    plan = data.plan_storage_budget(EvictionPolicy(0, min_age_days=15))
+
+    assert evicted_ids(plan) == [SID_B, SID_C]
+    assert plan['protected'] == {'active': 1, 'titled': 1, 'recent': 1}
+
+
+def test_enforce_budget_dry_run_and_delete(tree, make_data):
+    make_budget_tree(tree)
+    data = make_data()
+    total = data.scan_storage().get_total_size()
+
+    data.enforce_storage_budget(EvictionPolicy(total - 1), dry_run=True)
+    assert data.get_conversation_file(SID_A, '/home/u/proj').exists()
+
+    plan = data.enforce_storage_budget(EvictionPolicy(total - 1))
+    assert plan['done'] == 1
+    assert plan['size_after'] <= total - 1
+    assert not data.get_conversation_file(SID_A, '/home/u/proj').exists()
+    assert read_history_ids(tree) == [SID_B, SID_C]
+
+
+def test_apply_eviction_plan_skips_sessions_changed_since_plan(tree, make_data):
+    make_budget_tree(tree)
+    data = make_data()
+    plan = data.plan_storage_budget(EvictionPolicy(0))
+    assert evicted_ids(plan) == [SID_A, SID_B, SID_C]
+
+    # 预览之后 A 又被使用（变为运行中），B 的对话文件有追加
+    os.utime(tree.claude_dir / 'debug' / f"{SID_A}.txt")
+    write_messages(data.get_conversation_file(SID_B, '/home/u/proj'),
+                   ['later'], mode='a')
+
+    result = data.apply_eviction_plan(plan)
+
+    skipped = {item['session_id']: item.get('skipped')
+               for item in result['evicted']}
+    assert skipped == {SID_A: 'active', SID_B: 'changed', SID_C: None}
+    assert (result['done'], result['skipped'], result['failed']) == (1, 2, 0)
+    assert data.get_conversation_file(SID_A, '/home/u/proj').exists()
+    assert data.get_conversation_file(SID_B, '/home/u/proj').exists()
+    assert not data.get_conversation_file(SID_C, '/home/u/proj').exists()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""存储扫描：一次遍历生成按会话归类的清单，供统计、预览和孤立文件清理共用"""
+
+import threading
+
+from claude_session_data import StorageScanner, parse_todo_session_id
+from conftest import SID_A, SID_B, SID_C
+
+
+def test_parse_todo_session_id():
+    assert parse_todo_session_id(f"{SID_A}-agent-{SID_A}") == SID_A
+    # 子代理的 todo 文件：后半部分是另一个 ID
+    assert parse_todo_session_id(f"{SID_A}-agent-{SID_B}") == SID_A
+    # 非 UUID 的 ID 按 -agent- 分割
+    assert parse_todo_session_id('abc-agent-abc') == 'abc'
+
+
+def test_scan_groups_artifacts_by_session(tree):
+    tree.add_session(SID_A, padding=100)
+    tree.add_session(SID_B)
+    (tree.claude_dir / 'todos' / 'notes.json').write_text('[]')
+    (tree.claude_dir / 'debug' / 'readme.md').write_text('ignored')
+
+    inventory = StorageScanner(tree.claude_dir).scan()
+
+    assert inventory.complete
+    assert sorted(inventory.by_session) == [SID_A, SID_B]
+    artifacts = inventory.get_artifacts(SID_A)
+    assert sorted(artifacts) == ['conversation_files', 'debug_files',
+                                 'file_histories', 'session_envs', 'todos']
+    assert artifacts['session_envs'][0]['is_dir']
+    conv_file = next(tree.claude_dir.glob(f"projects/*/{SID_A}.jsonl"))
+    assert inventory.get_kind_size(
+        SID_A, 'conversation_files') == conv_file.stat().st_size
+    # 目录大小为其中文件大小之和
+    assert inventory.get_kind_size(SID_A, 'session_envs') == len(
+        'export A=1\n')
+    assert inventory.history_size == (tree.claude_dir /
+                                      'history.jsonl').stat().st_size
+    assert inventory.get_total_size() == inventory.history_size + sum(
+        inventory.get_session_size(sid) for sid in (SID_A, SID_B))
+
+
+def test_orphans_and_cleanup(tree, make_data):
+    tree.add_session(SID_A)
+    tree.add_session(SID_C)
+    # C 从 history 中移除后，它的文件都成为孤立文件
+    tree.history = [e for e in tree.history if e['sessionId'] != SID_C]
+    tree.write_history()
+    data = make_data()
+
+    inventory = data.scan_storage()
+    orphans = data.collect_orphaned_files(inventory)
+
+    assert {kind: [item['session_id'] for item in items]
+            for kind, items in orphans.items()} == {
+                'debug_files': [SID_C],
+                'conversation_files': [SID_C],
+                'session_envs': [SID_C],
+                'file_histories': [SID_C],
+                'todos': [SID_C]
+            }
+
+    result = data.cleanup_orphaned_files(inventory=inventory)
+
+    assert 'error' not in result
+    assert result['debug_files'] == result['todos'] == 1
+    assert sorted(data.scan_storage().by_session) == [SID_A]
+
+
+def test_cancelled_scan_is_incomplete_and_not_cached(tree, make_data):
+    tree.add_session(SID_A)
+    data = make_data()
+    cancel = threading.Event()
+    cancel.set()
+    seen = []
+
+    inventory = data.scan_storage(on_item=lambda kind, item: seen.append(kind),
+                                  cancel_event=cancel)
+
+    assert not inventory.complete
+    assert seen == []
+    assert data.inventory is None
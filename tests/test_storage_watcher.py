@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""文件监视的增量更新：元数据索引续读和文件事件的应用"""
+
+import os
+import time
+
+from claude_session_data import SessionMetadataIndex
+from conftest import SID_A, SID_B, SID_C, write_messages
+
+
+# ============ 元数据索引续读 ============
+
+
+def test_metadata_index_resumes_only_appended_files(tmp_path):
+    index = SessionMetadataIndex(tmp_path / 'index.json')
+    conv_file = tmp_path / 'conv.jsonl'
+    write_messages(conv_file, ['first', 'second'])
+    assert index.get(conv_file)['message_count'] == 2
+
+    write_messages(conv_file, ['third'], mode='a')
+    meta = index.get(conv_file)
+    assert meta['message_count'] == 3
+    assert meta['first_user_message'] == 'first'
+
+    # 原地把已解析的部分重写成相同长度再追加：偏移前的字节变了，需要完整重新解析
+    with open(conv_file, 'r+', encoding='utf-8') as f:
+        content = f.read().replace('first', 'FIRST').replace('third', 'THIRD')
+        f.seek(0)
+        f.write(content)
+    write_messages(conv_file, ['fourth'], mode='a')
+    meta = index.get(conv_file)
+    assert meta['message_count'] == 4
+    assert meta['first_user_message'] == 'FIRST'
+
+    # 替换为新文件（inode 变化）后即使更长也不能续读
+    replacement = tmp_path / 'new.jsonl'
+    write_messages(replacement, ['other'] * 5)
+    os.replace(replacement, conv_file)
+    meta = index.get(conv_file)
+    assert meta['message_count'] == 5
+    assert meta['first_user_message'] == 'other'
+
+
+# ============ 文件事件 ============
+
+PROJECT = '/home/u/proj'
+
+
+def test_history_append_adds_session(tree, make_data):
+    tree.add_session(SID_A)
+    data = make_data()
+    assert [s['sessionId'] for s in data.get_unique_sessions()] == [SID_A]
+
+    tree.add_session(SID_B)
+    changes = data.apply_storage_events({('history', str(data.history_file))})
+
+    assert changes['sessions'] and not changes['reload']
+    assert {s['sessionId'] for s in data.get_unique_sessions()} == {SID_A, SID_B}
+
+
+def test_conversation_append_updates_meta_size_and_activity(tree, make_data):
+    tree.add_session(SID_A, messages=3)
+    data = make_data()
+    inventory = data.scan_storage()
+    conv_file = data.get_conversation_file(SID_A, PROJECT)
+    assert SID_A not in data.active_session_ids
+
+    with open(conv_file, 'a', encoding='utf-8') as f:
+        f.write('{"type": "user", "userType": "external", "timestamp": "%s", '
+                '"message": {"content": "new"}}\n' % time.strftime(
+                    '%Y-%m-%dT%H:%M:%S.000Z', time.gmtime()))
+    changes = data.apply_storage_events({('conversation', str(conv_file))})
+
+    assert changes['meta'][SID_A]['message_count'] == 4
+    assert SID_A in changes['active_changed']
+    assert SID_A in data.active_session_ids
+    size = conv_file.stat().st_size
+    assert inventory.get_kind_size(SID_A, 'conversation_files') == size
+    assert data.get_file_info(SID_A) == {'has_file': True, 'size': size}
+
+
+def test_conversation_and_debug_removal_update_inventory(tree, make_data):
+    tree.add_session(SID_A)
+    tree.add_session(SID_B)
+    data = make_data()
+    inventory = data.scan_storage()
+    conv_file = data.get_conversation_file(SID_A, PROJECT)
+    debug_file = data.debug_dir / f"{SID_B}.txt"
+    conv_file.unlink()
+    debug_file.unlink()
+
+    changes = data.apply_storage_events({('conversation', str(conv_file)),
+                                         ('debug', str(debug_file))})
+
+    assert changes['meta'] == {SID_A: None}
+    assert inventory.get_kind_size(SID_A, 'conversation_files') == 0
+    assert inventory.get_kind_size(SID_B, 'debug_files') == 0
+    assert data.get_file_info(SID_A)['has_file'] is False
+
+
+def test_debug_write_marks_session_active(tree, make_data):
+    tree.add_session(SID_C)
+    data = make_data()
+    os.utime(data.debug_dir / f"{SID_C}.txt")
+
+    changes = data.apply_storage_events(
+        {('debug', str(data.debug_dir / f"{SID_C}.txt"))})
+
+    assert changes['active_changed'] == {SID_C}
+
+
+def test_overflow_requests_full_reload(tree, make_data):
+    tree.add_session(SID_A)
+    data = make_data()
+    changes = data.apply_storage_events({('overflow', ''),
+                                         ('history', str(data.history_file))})
+    assert changes['reload']